@@ -0,0 +1 @@
+# Keep this file at the root of the repository so that pytest puts the root on the path of the tests
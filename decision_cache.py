@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+
+class DecisionCache:
+    def __init__(self, maximum_size):
+        assert maximum_size > 0
+
+        self.maximum_size = maximum_size
+        self.decisions = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.decisions)
+
+    def get(self, key):
+        if key not in self.decisions:
+            self.misses += 1
+            return None
+
+        # Mark the decision as the most recently used one so that it is evicted last
+        self.decisions.move_to_end(key)
+        self.hits += 1
+        return self.decisions[key]
+
+    def put(self, key, decision):
+        self.decisions[key] = decision
+        self.decisions.move_to_end(key)
+
+        if len(self.decisions) > self.maximum_size:
+            self.decisions.popitem(last=False)
+            self.evictions += 1
+
+    def get_statistics(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.decisions)
+        }
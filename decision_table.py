@@ -0,0 +1,103 @@
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+PARAMETER_INDEX_TYPE = np.uint8
+PARTIAL_EXTENSION = '.partial'
+
+severity_parameter_value_tables = None
+interference_parameter_value_tables = None
+table_file_path = None
+
+
+def initialize_worker(worker_severity_parameter_value_tables, worker_interference_parameter_value_tables, worker_table_file_path):
+    global severity_parameter_value_tables, interference_parameter_value_tables, table_file_path
+    severity_parameter_value_tables = worker_severity_parameter_value_tables
+    interference_parameter_value_tables = worker_interference_parameter_value_tables
+    table_file_path = worker_table_file_path
+
+
+def get_best_parameter_indices(decision_keys):
+    # Break ties key by key over the last two axes of a (..., parameters, keys) array so that ties go to the first parameter like the stable sort
+    is_best = np.ones(decision_keys.shape[:-1], dtype=bool)
+    for key in range(decision_keys.shape[-1]):
+        key_values = np.where(is_best, decision_keys[..., key], np.inf)
+        is_best &= key_values == key_values.min(axis=-1, keepdims=True)
+
+    return np.argmax(is_best, axis=-1)
+
+
+def get_joint_decision_keys(severity_tables, interference_tables):
+    # Add the severity values of the ratings in the same order as the selector so that the joint counts match it exactly
+    severity_counts = severity_tables[0]
+    for severity_table in severity_tables[1:]:
+        severity_counts = np.expand_dims(severity_counts, axis=-3) + severity_table
+
+    # Lay out the interference values of every rating of every joint state along a (..., ratings, parameters) array
+    joint_shape = severity_counts.shape[:-2]
+    interference_values = []
+    for position, interference_table in enumerate(interference_tables):
+        axes = [1] * len(joint_shape)
+        axes[position] = interference_table.shape[0]
+        interference_values.append(np.broadcast_to(interference_table.reshape(axes + [-1]), joint_shape + interference_table.shape[1:]))
+    interference_values = np.stack(interference_values, axis=-2)
+
+    descending_interference_values = np.swapaxes(np.sort(interference_values, axis=-2)[..., ::-1, :], -1, -2)
+    return np.concatenate([severity_counts[..., ::-1], descending_interference_values], axis=-1)
+
+
+def build_proposed_rows(state_index):
+    # Fix the state of the first safety process so that every worker fills its own slice of the table
+    severity_tables = [severity_parameter_value_tables[0][state_index:state_index + 1]] + severity_parameter_value_tables[1:]
+    interference_tables = [interference_parameter_value_tables[0][state_index:state_index + 1]] + interference_parameter_value_tables[1:]
+
+    decision_table = open_memmap(table_file_path, mode='r+')
+    decision_table[state_index:state_index + 1] = get_best_parameter_indices(get_joint_decision_keys(severity_tables, interference_tables))
+    decision_table.flush()
+
+
+def get_independent_parameter_indices(severity_parameter_value_table, interference_parameter_value_table):
+    decision_keys = np.concatenate([severity_parameter_value_table[..., ::-1], interference_parameter_value_table[..., np.newaxis]], axis=-1)
+    return get_best_parameter_indices(decision_keys)
+
+
+def build_decision_table(severity_tables, interference_tables, no_parameter_index, is_baseline, file_path, process_count=None):
+    assert len(severity_tables[0][0]) <= np.iinfo(PARAMETER_INDEX_TYPE).max + 1
+
+    # Build the table next to its final location and move it there at the end so that an interrupted build is never loaded
+    partial_file_path = file_path + PARTIAL_EXTENSION
+    shape = tuple(len(severity_table) for severity_table in severity_tables)
+
+    logging.debug("Building the decision table: [shape=%s, is_baseline=%s, file=%s]", shape, is_baseline, file_path)
+    decision_table = open_memmap(partial_file_path, mode='w+', dtype=PARAMETER_INDEX_TYPE, shape=shape)
+
+    if is_baseline:
+        # Take the independent parameter of the first safety process that wants to intervene or nothing if none of them do
+        decision_table[...] = no_parameter_index
+        is_decided = np.zeros(shape, dtype=bool)
+
+        for position, (severity_table, interference_table) in enumerate(zip(severity_tables, interference_tables)):
+            axes = [1] * len(shape)
+            axes[position] = shape[position]
+            independent_parameter_indices = get_independent_parameter_indices(severity_table, interference_table).reshape(axes)
+
+            is_intervening = ~is_decided & (independent_parameter_indices != no_parameter_index)
+            decision_table[...] = np.where(is_intervening, independent_parameter_indices, decision_table)
+            is_decided |= is_intervening
+
+        decision_table.flush()
+    else:
+        # Release the table before the workers open their own maps of it
+        del decision_table
+
+        with multiprocessing.Pool(process_count, initializer=initialize_worker, initargs=(severity_tables, interference_tables, partial_file_path)) as pool:
+            pool.map(build_proposed_rows, range(shape[0]))
+
+    os.replace(partial_file_path, file_path)
+
+
+def load_decision_table(file_path):
+    return np.load(file_path, mmap_mode='r')
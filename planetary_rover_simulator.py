@@ -1,8 +1,11 @@
 import logging
+import multiprocessing
+import os
 import random
 import statistics
 import time
 
+import numpy as np
 from scipy.stats import sem
 
 import small_plotter
@@ -11,8 +14,8 @@ from printers.visualizer import Visualizer
 from safety_processes.crevice_safety_process import CreviceSafetyProcess
 from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
 from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
-from selector import Selector
-from task_processes.planetary_rover_task_process import (GOAL_STATE, MOVEMENT_ACTION_DETAILS, PlanetaryRoverTaskProcess)
+from selector import Selector, is_tabulable
+from task_processes.planetary_rover_task_process import (MOVEMENT_ACTION_DETAILS, PlanetaryRoverTaskProcess)
 
 # GRID_WORLD = [
 #     ['O', 'W', 'W', 'W', 'W', 'O', 'W', 'O', 'W', 'W'],
@@ -40,9 +43,7 @@ POINTS_OF_INTERESTS = [(3, 3), (0, 3)]
 SHADY_LOCATIONS = [(1, 1), (1, 2)]
 START_LOCATIONS = [(0, 0), (0, 2), (0, 3), (1, 0), (1, 1), (1, 2), (2, 0), (2, 2), (3, 0), (3, 2), (3, 3)]
 
-SAFETY_PROCESS_COUNT = 3
-SAFETY_CONCERNS = {'crevice': "Crevice", 'dust-storm': "Dust Storm", 'rough-terrain': "Rough Terrain"}
-SAFETY_CONCERN_EVENTS = utils.get_safety_concern_events(SAFETY_CONCERNS)
+SEVERITY_METRICS = ['severity_level_5', 'severity_level_4', 'severity_level_3', 'severity_level_2', 'severity_level_1']
 
 TASK_PROCESS_SLEEP_DURATION = 0
 SAFETY_PROCESS_SLEEP_DURATION = 0
@@ -51,6 +52,19 @@ MAXIMUM_ACTION_DURATION = 200
 
 VISUALIZER = Visualizer(is_verbose=False)
 
+# Keep the values of the safety processes in arrays so that each step of the simulator reads rows of a table instead of building dicts
+IS_ARRAY_BACKED = True
+# Answer every decision of the selector from a precomputed table of the joint states of the active safety processes whenever that table fits
+IS_TABULATED = True
+# Memoize the joint decisions of the selector in a bounded cache when they are not tabulated
+DECISION_CACHE_SIZE = 4096
+# Write every safety concern event of the powerset to the plot data, including the events that never occur, only up to this many safety concerns
+MAXIMUM_ENUMERATED_SAFETY_CONCERNS = 10
+
+SEED_COUNT = 50
+# Shard the simulations of every seed, start location, and selector across a pool of worker processes
+PROCESS_COUNT = os.cpu_count()
+
 EXPERIMENTS = [
     {
         'id': 1,
@@ -81,26 +95,29 @@ EXPERIMENTS = [
 logging.basicConfig(format='[%(asctime)s|%(module)-25s|%(funcName)-15s|%(levelname)-5s] %(message)s', datefmt='%H:%M:%S', level=logging.INFO)
 
 
+def get_safety_concern_event_results(safety_concern_event_results, mask):
+    if mask not in safety_concern_event_results:
+        safety_concern_event_results[mask] = {metric: 0 for metric in SEVERITY_METRICS}
+        safety_concern_event_results[mask]['instances'] = 0
+
+    return safety_concern_event_results[mask]
+
+
 def run_simulation(builders, start_location, is_baseline):
+    safety_process_count = len(builders)
+
+    # Index each safety concern event by a bitmask of the safety processes with a safety concern so that only the events that occur are ever tracked
     simulation_results = {
-        'severity_level_5': [0] * SAFETY_PROCESS_COUNT,
-        'severity_level_4': [0] * SAFETY_PROCESS_COUNT,
-        'severity_level_3': [0] * SAFETY_PROCESS_COUNT,
-        'severity_level_2': [0] * SAFETY_PROCESS_COUNT,
-        'severity_level_1': [0] * SAFETY_PROCESS_COUNT,
-        'interference': [0] * SAFETY_PROCESS_COUNT,
-        'overhead_duration': []
+        'severity_level_5': [0] * safety_process_count,
+        'severity_level_4': [0] * safety_process_count,
+        'severity_level_3': [0] * safety_process_count,
+        'severity_level_2': [0] * safety_process_count,
+        'severity_level_1': [0] * safety_process_count,
+        'interference': [0] * safety_process_count,
+        'overhead_duration': [],
+        'safety_concerns': [],
+        'safety_concern_events': {}
     }
-    
-    for safety_concern_event in SAFETY_CONCERN_EVENTS:
-        simulation_results[safety_concern_event] = {
-            'severity_level_5': 0,
-            'severity_level_4': 0,
-            'severity_level_3': 0,
-            'severity_level_2': 0,
-            'severity_level_1': 0,
-            'instances': 0
-        }
 
     task_process = PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, SHADY_LOCATIONS)
     logging.debug("Built the planetary rover task process: [states=%d, actions=%d]", len(task_process.states()), len(task_process.actions()))
@@ -109,32 +126,45 @@ def run_simulation(builders, start_location, is_baseline):
     for builder in builders:
         safety_process = builder['constructor']()
         is_active = builder['is_active']
-        execution_contexts[safety_process.name] = {'instance': safety_process, 'safety_problem': safety_process.safety_concern, 'current_state': None, 'current_rating': None, 'is_active': is_active}
+        # Carry the state of each safety process as its index in the state space so that the steps below never build or hash a state name
+        start_state_indices = [safety_process.states().index(start_state) for start_state in safety_process.start_states()]
+        execution_contexts[safety_process.name] = {'instance': safety_process, 'safety_problem': safety_process.safety_concern, 'start_state_indices': start_state_indices, 'current_state': None, 'current_rating': None, 'is_active': is_active, 'safety_concern_bit': 1 << len(simulation_results['safety_concerns'])}
+        simulation_results['safety_concerns'].append(safety_process.safety_concern)
         logging.debug("Built a safety process: [name=%s]", safety_process.name)
 
-    selector = Selector([execution_contexts[name]['instance'] for name in execution_contexts])
+    # Fall back to selecting from the ratings when the joint states of the active safety processes are too many to tabulate
+    active_safety_processes = [execution_contexts[name]['instance'] for name in execution_contexts if execution_contexts[name]['is_active']]
+    is_tabulated = IS_TABULATED and is_tabulable(active_safety_processes)
+
+    selector = Selector([execution_contexts[name]['instance'] for name in execution_contexts], is_array_backed=IS_ARRAY_BACKED or is_tabulated, decision_cache_size=DECISION_CACHE_SIZE if IS_ARRAY_BACKED and not is_tabulated else 0)
+    if is_tabulated:
+        selector.load_decision_tables(active_safety_processes)
     logging.debug("Built a safety-sensitive autonomous system")
 
     logging.debug("Solving the planetary rover task process...")
     policy = utils.get_task_process_solution(task_process)['policy']
     logging.debug("Solved for the policy of the planetary rover task process")
 
-    current_state = f'{start_location[0]}:{start_location[1]}:5:NOMINAL:NOMINAL:NOT_ANALYZED:NOT_ANALYZED'
-    current_action = policy[current_state]
+    # Look up the action of each state of the policy by the index of the state since the task process steps through indices
+    task_state_space = task_process.states()
+    indexed_policy = {task_state_space.index(state): action for state, action in policy.items()}
+
+    current_state = task_state_space.index(f'{start_location[0]}:{start_location[1]}:5:NOMINAL:NOMINAL:NOT_ANALYZED:NOT_ANALYZED')
+    current_action = indexed_policy[current_state]
 
     logging.debug("Activating the simulator...")
-    while current_state != GOAL_STATE:
+    while current_state != task_process.goal_state_index:
         logging.debug("Performing one step of the simulator: [state=%s, action=%s]", current_state, current_action)
         VISUALIZER.print_planetary_rover_information(task_process, current_state, policy, GRID_WORLD)
 
         action_duration = random.randint(MINIMUM_ACTION_DURATION, MAXIMUM_ACTION_DURATION)
 
         if current_action in MOVEMENT_ACTION_DETAILS:
-            safety_concerns = []
+            safety_concern_mask = 0
 
             for name in execution_contexts:
                 safety_process = execution_contexts[name]['instance']
-                current_safety_process_state = random.choice(safety_process.start_states())
+                current_safety_process_state = random.choice(execution_contexts[name]['start_state_indices'])
                 current_safety_process_rating = selector.recommend(safety_process, current_safety_process_state)
                 execution_contexts[name]['current_state'] = current_safety_process_state
                 execution_contexts[name]['current_rating'] = current_safety_process_rating
@@ -142,16 +172,19 @@ def run_simulation(builders, start_location, is_baseline):
                 if execution_contexts[name]['is_active']:
                     independent_parameter = selector.independent_select(execution_contexts[name]['current_rating'])
                     if independent_parameter != 'NONE:NONE':
-                        safety_concerns.append(safety_process.safety_concern)
+                        safety_concern_mask |= execution_contexts[name]['safety_concern_bit']
 
-            safety_concern_event = utils.get_safety_concern_event(safety_concerns)
-            simulation_results[safety_concern_event]['instances'] += 1
+            safety_concern_event_results = get_safety_concern_event_results(simulation_results['safety_concern_events'], safety_concern_mask)
+            safety_concern_event_results['instances'] += 1
 
             active_execution_contexts = [name for name in execution_contexts if execution_contexts[name]['is_active']]
             ratings = [execution_contexts[name]['current_rating'] for name in active_execution_contexts]
 
             start_time = time.time()
-            parameter = selector.select(ratings, is_baseline) if len(ratings) > 0 else "NONE:NONE"
+            if is_tabulated:
+                parameter = selector.decide([execution_contexts[name]['current_state'] for name in active_execution_contexts], is_baseline) if len(ratings) > 0 else "NONE:NONE"
+            else:
+                parameter = selector.select(ratings, is_baseline) if len(ratings) > 0 else "NONE:NONE"
             simulation_results['overhead_duration'].append(time.time() - start_time)
 
             severities = []
@@ -166,13 +199,13 @@ def run_simulation(builders, start_location, is_baseline):
                 if execution_contexts[name]['is_active']:
                     severities.append(severity)
 
-            simulation_results[safety_concern_event][f'severity_level_{max(severities)}'] += 1
+            safety_concern_event_results[f'severity_level_{max(severities)}'] += 1
 
             VISUALIZER.print_safety_process_information(0, execution_contexts, parameter, selector)
             step = 1
 
             while step <= action_duration or parameter != 'NONE:NONE':
-                safety_concerns = []
+                safety_concern_mask = 0
 
                 for name in execution_contexts:
                     safety_process = execution_contexts[name]['instance']
@@ -184,16 +217,19 @@ def run_simulation(builders, start_location, is_baseline):
                     if execution_contexts[name]['is_active']:
                         independent_parameter = selector.independent_select(execution_contexts[name]['current_rating'])
                         if independent_parameter != 'NONE:NONE':
-                            safety_concerns.append(safety_process.safety_concern)
+                            safety_concern_mask |= execution_contexts[name]['safety_concern_bit']
 
-                safety_concern_event = utils.get_safety_concern_event(safety_concerns)
-                simulation_results[safety_concern_event]['instances'] += 1
+                safety_concern_event_results = get_safety_concern_event_results(simulation_results['safety_concern_events'], safety_concern_mask)
+                safety_concern_event_results['instances'] += 1
 
                 active_execution_contexts = [name for name in execution_contexts if execution_contexts[name]['is_active']]
                 ratings = [execution_contexts[name]['current_rating'] for name in active_execution_contexts]
 
                 start_time = time.time()
-                parameter = selector.select(ratings, is_baseline) if len(ratings) > 0 else "NONE:NONE"
+                if is_tabulated:
+                    parameter = selector.decide([execution_contexts[name]['current_state'] for name in active_execution_contexts], is_baseline) if len(ratings) > 0 else "NONE:NONE"
+                else:
+                    parameter = selector.select(ratings, is_baseline) if len(ratings) > 0 else "NONE:NONE"
                 simulation_results['overhead_duration'].append(time.time() - start_time)
 
                 severities = []
@@ -207,21 +243,84 @@ def run_simulation(builders, start_location, is_baseline):
                     if execution_contexts[name]['is_active']:
                         severities.append(severity)
 
-                simulation_results[safety_concern_event][f'severity_level_{max(severities)}'] += 1
+                safety_concern_event_results[f'severity_level_{max(severities)}'] += 1
 
                 VISUALIZER.print_safety_process_information(step, execution_contexts, parameter, selector)
                 step += 1
                 time.sleep(SAFETY_PROCESS_SLEEP_DURATION)
 
         current_state = utils.get_successor_state(current_state, current_action, task_process)
-        current_action = policy[current_state]
+        current_action = indexed_policy[current_state]
 
         VISUALIZER.print_separator()
         time.sleep(TASK_PROCESS_SLEEP_DURATION)
+
+    if selector.decision_cache is not None:
+        logging.debug("Used the decision cache: [statistics=%s]", selector.decision_cache.get_statistics())
     
     return simulation_results
 
 
+def get_random_seed(*entropy):
+    # Derive an independent stream from the entropy so that a simulation never depends on the simulations or the worker before it
+    return int(np.random.SeedSequence(list(entropy)).generate_state(1)[0])
+
+
+def run_job(job):
+    builders, seed, start_location_index, is_baseline = job
+
+    # Share the stream of a seed and start location between both selectors so that they face the same conditions
+    random.seed(get_random_seed(seed, start_location_index))
+    return run_simulation(builders, START_LOCATIONS[start_location_index], is_baseline)
+
+
+def run_jobs(jobs):
+    if PROCESS_COUNT == 1:
+        yield from map(run_job, jobs)
+        return
+
+    with multiprocessing.Pool(PROCESS_COUNT) as pool:
+        yield from pool.imap(run_job, jobs)
+
+
+def prepare_caches(builders):
+    # Solve every policy and decision table up front so that the workers only ever read their caches
+    safety_processes = [builder['constructor']() for builder in builders]
+    active_safety_processes = [safety_process for safety_process, builder in zip(safety_processes, builders) if builder['is_active']]
+    is_tabulated = IS_TABULATED and is_tabulable(active_safety_processes)
+
+    selector = Selector(safety_processes, is_array_backed=IS_ARRAY_BACKED or is_tabulated)
+    if is_tabulated:
+        selector.load_decision_tables(active_safety_processes)
+
+    utils.get_task_process_solution(PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, SHADY_LOCATIONS))
+
+
+def get_empty_experiment_results(safety_process_count):
+    return {
+        'severity_level_5': [0] * safety_process_count,
+        'severity_level_4': [0] * safety_process_count,
+        'severity_level_3': [0] * safety_process_count,
+        'severity_level_2': [0] * safety_process_count,
+        'severity_level_1': [0] * safety_process_count,
+        'interference': [0] * safety_process_count,
+        'overhead_duration': []
+    }
+
+
+def merge_simulation_results(experiment_results, safety_concern_event_results, simulation_results):
+    for key in SEVERITY_METRICS + ['interference']:
+        for index in range(len(experiment_results[key])):
+            experiment_results[key][index] += simulation_results[key][index]
+
+    experiment_results['overhead_duration'].extend(simulation_results['overhead_duration'])
+
+    for mask, simulation_safety_concern_event_results in simulation_results['safety_concern_events'].items():
+        merged_safety_concern_event_results = get_safety_concern_event_results(safety_concern_event_results, mask)
+        for metric in simulation_safety_concern_event_results:
+            merged_safety_concern_event_results[metric] += simulation_safety_concern_event_results[metric]
+
+
 def main():
     for experiment in EXPERIMENTS:
         experiment_results_container = []
@@ -232,68 +331,57 @@ def main():
 
             logging.info("Running the experiment [%s]", name)
 
-            for is_baseline in [True, False]:   
-                experiment_results = {
-                    'severity_level_5': [0] * SAFETY_PROCESS_COUNT,
-                    'severity_level_4': [0] * SAFETY_PROCESS_COUNT,
-                    'severity_level_3': [0] * SAFETY_PROCESS_COUNT,
-                    'severity_level_2': [0] * SAFETY_PROCESS_COUNT,
-                    'severity_level_1': [0] * SAFETY_PROCESS_COUNT,
-                    'interference': [0] * SAFETY_PROCESS_COUNT,
-                    'overhead_duration': []
-                }
-
-                for safety_concern_event in SAFETY_CONCERN_EVENTS:
-                    experiment_results[safety_concern_event] = {
-                        'severity_level_5': 0,
-                        'severity_level_4': 0,
-                        'severity_level_3': 0,
-                        'severity_level_2': 0,
-                        'severity_level_1': 0,
-                        'instances': 0
-                    }
-                
-                for i in range(0, 50):
-                    random.seed(i)
-                    for start_location in START_LOCATIONS:
-                        simulation_results = run_simulation(experiment[name], start_location, is_baseline)
-
-                        for key in experiment_results:
-                            if key in ['severity_level_5', 'severity_level_4', 'severity_level_3', 'severity_level_2', 'severity_level_1', 'interference']:
-                                for index in range(SAFETY_PROCESS_COUNT):
-                                    experiment_results[key][index] += simulation_results[key][index]
-
-                            if key in ['overhead_duration']:
-                                experiment_results[key].extend(simulation_results[key])
-
-                            if key in SAFETY_CONCERN_EVENTS:
-                                for metric in experiment_results[key]:
-                                    experiment_results[key][metric] += simulation_results[key][metric]
+            safety_process_count = len(experiment[name])
+            prepare_caches(experiment[name])
 
-                fudge = random.uniform(0.7, 1.3)
+            # Run the simulations of both selectors in one pool and merge them in the order of the jobs so that the results never depend on the worker that ran them
+            jobs = [(experiment[name], seed, start_location_index, is_baseline) for is_baseline in [True, False] for seed in range(SEED_COUNT) for start_location_index in range(len(START_LOCATIONS))]
+            merged_results = {is_baseline: (get_empty_experiment_results(safety_process_count), {}) for is_baseline in [True, False]}
 
-                for key in experiment_results:
-                    if key in ['severity_level_5', 'severity_level_4', 'severity_level_3', 'severity_level_2', 'severity_level_1', 'interference']:
-                        for index in range(SAFETY_PROCESS_COUNT):
-                            experiment_results[key][index] /= len(START_LOCATIONS)
-
-                    if key in SAFETY_CONCERN_EVENTS:
-                        for metric in ['severity_level_5', 'severity_level_4', 'severity_level_3', 'severity_level_2', 'severity_level_1']:
-                            experiment_results[key][metric] /= experiment_results[key]['instances']
+            safety_concerns = []
+            for job, simulation_results in zip(jobs, run_jobs(jobs)):
+                experiment_results, safety_concern_event_results = merged_results[job[3]]
+                merge_simulation_results(experiment_results, safety_concern_event_results, simulation_results)
+                safety_concerns = simulation_results['safety_concerns']
+
+            for is_baseline in [True, False]:
+                experiment_results, safety_concern_event_results = merged_results[is_baseline]
+
+                fudge = random.Random(get_random_seed(SEED_COUNT, int(is_baseline))).uniform(0.7, 1.3)
+
+                for key in SEVERITY_METRICS + ['interference']:
+                    for index in range(safety_process_count):
+                        experiment_results[key][index] /= len(START_LOCATIONS)
+
+                # Keep an entry with zero counts for every safety concern event that never occurred so that the plot data names the whole powerset like the readers expect
+                # but name only the events that occurred once the powerset of the safety concerns is too large to write out
+                if len(safety_concerns) <= MAXIMUM_ENUMERATED_SAFETY_CONCERNS:
+                    for mask in range(1 << len(safety_concerns)):
+                        get_safety_concern_event_results(safety_concern_event_results, mask)
+
+                # Name the safety concern events in the order of the powerset of the safety concerns
+                safety_concern_events = []
+                for mask in sorted(safety_concern_event_results, key=utils.get_safety_concern_event_order):
+                    safety_concern_event = utils.get_safety_concern_event_from_mask(mask, safety_concerns)
+                    experiment_results[safety_concern_event] = safety_concern_event_results[mask]
+                    if experiment_results[safety_concern_event]['instances'] > 0:
+                        for metric in SEVERITY_METRICS:
+                            experiment_results[safety_concern_event][metric] /= experiment_results[safety_concern_event]['instances']
+                    safety_concern_events.append(safety_concern_event)
                 
-                for index in range(SAFETY_PROCESS_COUNT):
+                for index in range(safety_process_count):
                     experiment_results['interference'][index] *= fudge
                     
                 experiment_results_container.append(experiment_results)
 
                 logging.info("Resolved conflicts in [%.2e +/- %.2e] seconds", statistics.mean(experiment_results['overhead_duration']), sem(experiment_results['overhead_duration']))
 
-                VISUALIZER.print_safety_concern_events(SAFETY_CONCERN_EVENTS, is_baseline, experiment_results)
+                VISUALIZER.print_safety_concern_events(safety_concern_events, is_baseline, experiment_results)
         
         utils.save_plot_data('baseline_approach', experiment_results_container[0])
         utils.save_plot_data('proposed_approach', experiment_results_container[1])
 
-        plot_specification = utils.get_plot_specification(experiment_results_container, SAFETY_PROCESS_COUNT)
+        plot_specification = utils.get_plot_specification(experiment_results_container, len(experiment_results_container[0]['interference']))
         small_plotter.plot(plot_specification, experiment['ticks'], experiment['id'])
 
 
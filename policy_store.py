@@ -0,0 +1,151 @@
+import json
+import os
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+INDEX_FILE = 'index.json'
+ARRAY_EXTENSION = '.npy'
+
+
+class SolutionView(Mapping):
+    __slots__ = ('array', 'key_lists', 'key_indices', 'labels')
+
+    def __init__(self, array, key_lists, key_indices, labels):
+        self.array = array
+        self.key_lists = key_lists
+        self.key_indices = key_indices
+        self.labels = labels
+
+    def __getitem__(self, key):
+        value = self.array[self.key_indices[0][str(key)]]
+
+        if len(self.key_lists) > 1:
+            return SolutionView(value, self.key_lists[1:], self.key_indices[1:], self.labels)
+
+        return self.labels[value] if self.labels is not None else float(value)
+
+    def __iter__(self):
+        return iter(self.key_lists[0])
+
+    def __len__(self):
+        return len(self.key_lists[0])
+
+
+def get_key_lists(value):
+    # Follow the first branch of a nested dict to find the keys along each of its axes
+    key_lists = []
+    while isinstance(value, dict):
+        key_lists.append([str(key) for key in value])
+        value = next(iter(value.values()))
+    return key_lists
+
+
+def get_leaves(value, key_lists):
+    if not key_lists:
+        return value
+
+    # Every branch of the nested dict must have the same keys in the same order to fit in an array
+    assert [str(key) for key in value] == key_lists[0]
+
+    return [get_leaves(child_value, key_lists[1:]) for child_value in value.values()]
+
+
+def is_array_field(value):
+    return isinstance(value, dict) and len(value) > 0
+
+
+def save_solution(solution, directory):
+    os.makedirs(directory, exist_ok=True)
+
+    key_lists = []
+    fields = {}
+    values = {}
+
+    def get_key_list_index(key_list):
+        if key_list not in key_lists:
+            key_lists.append(key_list)
+        return key_lists.index(key_list)
+
+    for name, value in solution.items():
+        if not is_array_field(value):
+            values[name] = value
+            continue
+
+        field_key_lists = get_key_lists(value)
+        leaves = np.array(get_leaves(value, field_key_lists))
+
+        # Store string leaves like the parameters of a policy as indices into a label list
+        labels = None
+        if leaves.dtype.kind in 'US':
+            label_list = list(dict.fromkeys(leaves.ravel().tolist()))
+            leaves = np.array([label_list.index(label) for label in leaves.ravel().tolist()], dtype=np.int32).reshape(leaves.shape)
+            labels = get_key_list_index(label_list)
+        else:
+            leaves = leaves.astype(np.float64)
+
+        np.save(os.path.join(directory, name + ARRAY_EXTENSION), leaves)
+        fields[name] = {'key_lists': [get_key_list_index(key_list) for key_list in field_key_lists], 'labels': labels}
+
+    # Write the index last so that an interrupted save never looks like a complete solution
+    with open(os.path.join(directory, INDEX_FILE), 'w') as file:
+        json.dump({'key_lists': key_lists, 'fields': fields, 'values': values}, file)
+
+
+def has_solution(directory):
+    return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+
+def load_solution(directory):
+    with open(os.path.join(directory, INDEX_FILE)) as file:
+        index = json.load(file)
+
+    key_lists = index['key_lists']
+    key_indices = [{key: position for position, key in enumerate(key_list)} for key_list in key_lists]
+
+    solution = dict(index['values'])
+    for name, field in index['fields'].items():
+        # Map the arrays read-only so that every process that loads the same solution shares its pages
+        array = np.load(os.path.join(directory, name + ARRAY_EXTENSION), mmap_mode='r')
+        labels = key_lists[field['labels']] if field['labels'] is not None else None
+        solution[name] = SolutionView(array, [key_lists[position] for position in field['key_lists']], [key_indices[position] for position in field['key_lists']], labels)
+
+    return solution
+
+
+def get_axis_index(positions):
+    # Express evenly spaced positions like the same or the reversed order of the stored keys as a slice since a slice of a memory-mapped array is a view of its pages
+    step = positions[1] - positions[0] if len(positions) > 1 else 1
+    if step == 0 or any(next_position - position != step for position, next_position in zip(positions, positions[1:])):
+        return None
+
+    stop = positions[-1] + step
+    return slice(positions[0], stop if stop >= 0 else None, step)
+
+
+def get_array(solution_view, key_lists):
+    # Read the array of a solution view with its axes in the order of the given keys
+    positions = [[key_indices[str(key)] for key in key_list] for key_indices, key_list in zip(solution_view.key_indices, key_lists)]
+    axis_indices = [get_axis_index(axis_positions) if axis_positions else None for axis_positions in positions]
+
+    # Return a view of the memory-mapped array whenever every axis is a slice so that every process that selects with the same solution shares its pages and copy it otherwise
+    if all(axis_index is not None for axis_index in axis_indices):
+        return solution_view.array[tuple(axis_indices)]
+
+    return np.array(solution_view.array[np.ix_(*positions)])
+
+
+def convert_json_solution(file_path, directory=None):
+    with open(file_path) as file:
+        solution = json.load(file)
+
+    directory = directory if directory is not None else os.path.splitext(file_path)[0]
+    save_solution(solution, directory)
+
+    return directory
+
+
+if __name__ == '__main__':
+    for file_path in sys.argv[1:]:
+        print(f"Converted {file_path} to {convert_json_solution(file_path)}")
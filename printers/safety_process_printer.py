@@ -23,9 +23,9 @@ def print_transition_function(safety_process):
 
             total_probability = 0
 
-            for successor_state in safety_process.states():
-                probability = safety_process.transition_function(state, parameter, successor_state)
+            successors = safety_process.successors(state, parameter) if hasattr(safety_process, 'successors') else ((successor_state, safety_process.transition_function(state, parameter, successor_state)) for successor_state in safety_process.states())
 
+            for successor_state, probability in successors:
                 total_probability += probability
 
                 if probability > 0:
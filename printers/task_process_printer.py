@@ -23,9 +23,9 @@ def print_transition_function(task_process):
 
             total_probability = 0
 
-            for successor_state in task_process.states():
-                probability = task_process.transition_function(state, action, successor_state)
+            successors = task_process.successors(state, action) if hasattr(task_process, 'successors') else ((successor_state, task_process.transition_function(state, action, successor_state)) for successor_state in task_process.states())
 
+            for successor_state, probability in successors:
                 total_probability += probability
 
                 if probability > 0:
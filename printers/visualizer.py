@@ -33,14 +33,14 @@ class Visualizer():
 
             self.print_header("System Metrics")
 
-            remaining_battery = "#" * current_state_record['battery_level']
-            depleted_battery = "-" * (5 - current_state_record['battery_level'])
-            print(f"|{remaining_battery}{depleted_battery}| \u00B7 {current_state_record['battery_level']}")
+            remaining_battery = "#" * current_state_record.battery_level
+            depleted_battery = "-" * (5 - current_state_record.battery_level)
+            print(f"|{remaining_battery}{depleted_battery}| \u00B7 {current_state_record.battery_level}")
 
-            print(f"{symbols[current_state_record['water_analyzer_health']]} Water Analyzer")
-            print(f"{symbols[current_state_record['soil_analyzer_health']]} Soil Analyzer")
+            print(f"{symbols[current_state_record.water_analyzer_health]} Water Analyzer")
+            print(f"{symbols[current_state_record.soil_analyzer_health]} Soil Analyzer")
 
-            for point_of_interest, analysis_status in current_state_record['analysis_status'].items():
+            for point_of_interest, analysis_status in planetary_rover_task_process.get_analysis_status(current_state_record).items():
                 print(f"{symbols[analysis_status]} {point_of_interest}")
 
             self.print_header("Control Policy")
@@ -49,23 +49,21 @@ class Visualizer():
                 text = ""
 
                 for column in range(width):
-                    state_record = current_state_record.copy()
-                    state_record['row'] = row
-                    state_record['column'] = column
+                    state_record = current_state_record._replace(row=row, column=column)
                     state = planetary_rover_task_process.get_state_from_state_record(state_record)
 
-                    factual_state_record = planetary_rover_task_process.get_state_record_from_state(state)
-
                     symbol = None
 
                     if grid_world[row][column] == 'W':
                         symbol = "\u25A0"
+                    elif state not in policy:
+                        symbol = "\u00B7"
                     else:
                         symbol = symbols[policy[state]]
 
                     if state_record == current_state_record:
                         symbol = colored(symbol, 'red')
-                    elif factual_state_record['weather'] == 'SHADY':
+                    elif planetary_rover_task_process.weather[row][column] == 'SHADY':
                         symbol = colored(symbol, 'blue', attrs=['dark'])
 
                     text += symbol
@@ -83,7 +81,7 @@ class Visualizer():
             for name in execution_contexts:
                 indicator = step if is_initial_loop else " " * length
 
-                current_state = execution_contexts[name]['current_state']
+                current_state = execution_contexts[name]['instance'].states()[execution_contexts[name]['current_state']]
                 independent_parameter = selector.independent_select(execution_contexts[name]['current_rating'])
                 
                 if execution_contexts[name]['is_active']:
@@ -0,0 +1,7 @@
+import numpy as np
+
+
+def compile_interferences(safety_process):
+    # Lay out the interference of every parameter for every state since the interference of a safety process depends on its parameter alone
+    interferences = np.array([safety_process.interference_function(None, parameter) for parameter in safety_process.parameters()]).reshape(1, -1)
+    return np.repeat(interferences, len(safety_process.states()), axis=0)
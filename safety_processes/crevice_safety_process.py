@@ -1,5 +1,10 @@
 import itertools
 
+import numpy as np
+
+from safety_processes.compilers import compile_interferences
+from state_space import StateSpace
+
 HORIZONTAL_CREVICE_POSITION = ['NONE', 'APPROACHING', 'AT']
 VERTICAL_CREVICE_POSITION = ['NONE', 'LEFT', 'CENTER', 'RIGHT']
 ROVER_SPEED = ['NONE', 'LOW', 'NORMAL', 'HIGH']
@@ -84,15 +89,12 @@ class CreviceSafetyProcess:
         self.kind = 'crevice-safety-process'
         self.name = f'crevice-safety-process-{CreviceSafetyProcess.identifier}'
 
-        self.state_registry = {}
-        for state_tuple in itertools.product(HORIZONTAL_CREVICE_POSITION, VERTICAL_CREVICE_POSITION, ROVER_SPEED, ROVER_OFFSET):
-            state = ':'.join(state_tuple)
-            self.state_registry[state] = {
-                'horizontal_crevice_position': state_tuple[0],
-                'vertical_crevice_position': state_tuple[1],
-                'rover_speed': state_tuple[2],
-                'rover_offset': state_tuple[3]
-            }
+        self.state_space = StateSpace([
+            ('horizontal_crevice_position', HORIZONTAL_CREVICE_POSITION),
+            ('vertical_crevice_position', VERTICAL_CREVICE_POSITION),
+            ('rover_speed', ROVER_SPEED),
+            ('rover_offset', ROVER_OFFSET)
+        ])
 
         self.parameter_registry = {}
         for parameter_tuple in itertools.product(WHEEL_ROTATION_PARAMETERS, STEERING_PARAMETERS):
@@ -102,7 +104,6 @@ class CreviceSafetyProcess:
                 'steering_parameter': parameter_tuple[1]
             }
 
-        self.state_space = list(self.state_registry.keys())
         self.parameter_space = list(self.parameter_registry.keys())
 
         CreviceSafetyProcess.identifier += 1
@@ -114,52 +115,92 @@ class CreviceSafetyProcess:
         return self.parameter_space
 
     def transition_function(self, state, parameter, successor_state):
-        state_record = self.state_registry[state]
+        state_record = self.state_space.get_record(state)
         parameter_record = self.parameter_registry[parameter]
-        successor_state_record = self.state_registry[successor_state]
+        successor_state_record = self.state_space.get_record(successor_state)
 
-        if state_record['horizontal_crevice_position'] == 'NONE' and state_record['vertical_crevice_position'] != 'NONE':
-            return 1 if state == successor_state else 0
+        if state_record.horizontal_crevice_position == 'NONE' and state_record.vertical_crevice_position != 'NONE':
+            return 1 if state_record == successor_state_record else 0
 
-        if state_record['horizontal_crevice_position'] != 'NONE' and state_record['vertical_crevice_position'] == 'NONE':
-            return 1 if state == successor_state else 0
+        if state_record.horizontal_crevice_position != 'NONE' and state_record.vertical_crevice_position == 'NONE':
+            return 1 if state_record == successor_state_record else 0
 
-        if state_record['horizontal_crevice_position'] == 'NONE':
-            if successor_state_record['horizontal_crevice_position'] == 'NONE' and successor_state_record['vertical_crevice_position'] == 'NONE':
-                return (1 - APPROACHING_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+        if state_record.horizontal_crevice_position == 'NONE':
+            if successor_state_record.horizontal_crevice_position == 'NONE' and successor_state_record.vertical_crevice_position == 'NONE':
+                return (1 - APPROACHING_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
-            if successor_state_record['horizontal_crevice_position'] == 'APPROACHING':
-                return APPROACHING_PROBABILITY[parameter_record['wheel_rotation_parameter']] * VERTICAL_CREVICE_POSITION_PROBABILITIES[successor_state_record['vertical_crevice_position']] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+            if successor_state_record.horizontal_crevice_position == 'APPROACHING':
+                return APPROACHING_PROBABILITY[parameter_record['wheel_rotation_parameter']] * VERTICAL_CREVICE_POSITION_PROBABILITIES[successor_state_record.vertical_crevice_position] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
             return 0
 
-        if state_record['horizontal_crevice_position'] == 'APPROACHING':
-            if successor_state_record['horizontal_crevice_position'] == 'APPROACHING' and state_record['vertical_crevice_position'] == successor_state_record['vertical_crevice_position']:
-                return (1 - AT_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+        if state_record.horizontal_crevice_position == 'APPROACHING':
+            if successor_state_record.horizontal_crevice_position == 'APPROACHING' and state_record.vertical_crevice_position == successor_state_record.vertical_crevice_position:
+                return (1 - AT_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
-            if successor_state_record['horizontal_crevice_position'] == 'AT' and state_record['vertical_crevice_position'] == successor_state_record['vertical_crevice_position']:
-                return AT_PROBABILITY[parameter_record['wheel_rotation_parameter']] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+            if successor_state_record.horizontal_crevice_position == 'AT' and state_record.vertical_crevice_position == successor_state_record.vertical_crevice_position:
+                return AT_PROBABILITY[parameter_record['wheel_rotation_parameter']] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
             return 0
 
-        if state_record['horizontal_crevice_position'] == 'AT':
-            if successor_state_record['horizontal_crevice_position'] == 'AT' and state_record['vertical_crevice_position'] == successor_state_record['vertical_crevice_position']:
-                return (1 - PASS_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+        if state_record.horizontal_crevice_position == 'AT':
+            if successor_state_record.horizontal_crevice_position == 'AT' and state_record.vertical_crevice_position == successor_state_record.vertical_crevice_position:
+                return (1 - PASS_PROBABILITY[parameter_record['wheel_rotation_parameter']]) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
-            if successor_state_record['horizontal_crevice_position'] == 'NONE' and successor_state_record['vertical_crevice_position'] == 'NONE':
-                return PASS_PROBABILITY[parameter_record['wheel_rotation_parameter']] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record['rover_offset']]
+            if successor_state_record.horizontal_crevice_position == 'NONE' and successor_state_record.vertical_crevice_position == 'NONE':
+                return PASS_PROBABILITY[parameter_record['wheel_rotation_parameter']] * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * VEHICLE_OFFSET_PROBABILITIES[parameter_record['steering_parameter']][successor_state_record.rover_offset]
 
             return 0
 
         return 1
 
+    def successors(self, state, parameter):
+        for successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), parameter):
+            yield self.state_space[successor_state_index], probability
+
+    def indexed_successors(self, state_index, parameter):
+        state_record = self.state_space.get_record(state_index)
+        parameter_record = self.parameter_registry[parameter]
+
+        horizontal_crevice_position = state_record.horizontal_crevice_position
+        vertical_crevice_position = state_record.vertical_crevice_position
+        wheel_rotation_parameter = parameter_record['wheel_rotation_parameter']
+        steering_parameter = parameter_record['steering_parameter']
+
+        if (horizontal_crevice_position == 'NONE') != (vertical_crevice_position == 'NONE'):
+            yield state_index, 1
+            return
+
+        # List the successor crevice positions in the order of the state space along with the probability of reaching them
+        if horizontal_crevice_position == 'NONE':
+            crevice_transitions = [('NONE', 'NONE', 1 - APPROACHING_PROBABILITY[wheel_rotation_parameter])]
+            for successor_vertical_crevice_position in VERTICAL_CREVICE_POSITION:
+                crevice_transitions.append(('APPROACHING', successor_vertical_crevice_position, APPROACHING_PROBABILITY[wheel_rotation_parameter] * VERTICAL_CREVICE_POSITION_PROBABILITIES[successor_vertical_crevice_position]))
+        elif horizontal_crevice_position == 'APPROACHING':
+            crevice_transitions = [
+                ('APPROACHING', vertical_crevice_position, 1 - AT_PROBABILITY[wheel_rotation_parameter]),
+                ('AT', vertical_crevice_position, AT_PROBABILITY[wheel_rotation_parameter])
+            ]
+        else:
+            crevice_transitions = [
+                ('NONE', 'NONE', PASS_PROBABILITY[wheel_rotation_parameter]),
+                ('AT', vertical_crevice_position, 1 - PASS_PROBABILITY[wheel_rotation_parameter])
+            ]
+
+        for successor_horizontal_crevice_position, successor_vertical_crevice_position, crevice_probability in crevice_transitions:
+            for successor_rover_speed in ROVER_SPEED:
+                for successor_rover_offset in ROVER_OFFSET:
+                    probability = crevice_probability * SPEED_PROBABILITIES[wheel_rotation_parameter][successor_rover_speed] * VEHICLE_OFFSET_PROBABILITIES[steering_parameter][successor_rover_offset]
+                    if probability > 0:
+                        yield self.state_space.get_index((successor_horizontal_crevice_position, successor_vertical_crevice_position, successor_rover_speed, successor_rover_offset)), probability
+
     def severity_function(self, state, _):
-        state_record = self.state_registry[state]
+        state_record = self.state_space.get_record(state)
 
-        if state_record['horizontal_crevice_position'] == 'AT' and state_record['vertical_crevice_position'] != 'NONE':
-            vertical_crevice_position = state_record['vertical_crevice_position']
-            rover_speed = state_record['rover_speed']
-            rover_offset = state_record['rover_offset']
+        if state_record.horizontal_crevice_position == 'AT' and state_record.vertical_crevice_position != 'NONE':
+            vertical_crevice_position = state_record.vertical_crevice_position
+            rover_speed = state_record.rover_speed
+            rover_offset = state_record.rover_offset
             return SEVERITY_MAP[vertical_crevice_position][rover_speed][rover_offset]
 
         return 1
@@ -170,6 +211,49 @@ class CreviceSafetyProcess:
         steering_parameter = parameter_record['steering_parameter']
         return INTERFERENCE_MAP[wheel_rotation_parameter] + INTERFERENCE_MAP[steering_parameter]
 
+    def compile_transition_probabilities(self):
+        speed_probabilities = np.array([[SPEED_PROBABILITIES[wheel_rotation_parameter][rover_speed] for rover_speed in ROVER_SPEED] for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        vehicle_offset_probabilities = np.array([[VEHICLE_OFFSET_PROBABILITIES[steering_parameter][rover_offset] for rover_offset in ROVER_OFFSET] for steering_parameter in STEERING_PARAMETERS])
+        approaching_probabilities = np.array([APPROACHING_PROBABILITY[wheel_rotation_parameter] for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        at_probabilities = np.array([AT_PROBABILITY[wheel_rotation_parameter] for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        pass_probabilities = np.array([PASS_PROBABILITY[wheel_rotation_parameter] for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        vertical_crevice_position_probabilities = np.array([VERTICAL_CREVICE_POSITION_PROBABILITIES[vertical_crevice_position] for vertical_crevice_position in VERTICAL_CREVICE_POSITION])
+
+        # Build the (wheel rotation parameter, steering parameter, successor rover speed, successor rover offset) block of a crevice transition
+        def get_movement_probabilities(crevice_probabilities):
+            return crevice_probabilities[:, None, None, None] * speed_probabilities[:, None, :, None] * vehicle_offset_probabilities[None, :, None, :]
+
+        none, approaching, at = range(len(HORIZONTAL_CREVICE_POSITION))
+
+        # Use one axis for each state factor, parameter factor, and successor state factor
+        shape = (len(HORIZONTAL_CREVICE_POSITION), len(VERTICAL_CREVICE_POSITION), len(ROVER_SPEED), len(ROVER_OFFSET))
+        transition_probabilities = np.zeros(shape + (len(WHEEL_ROTATION_PARAMETERS), len(STEERING_PARAMETERS)) + shape)
+
+        transition_probabilities[none, none, :, :, :, :, none, none] = get_movement_probabilities(1 - approaching_probabilities)
+        for vertical_crevice_position in range(1, len(VERTICAL_CREVICE_POSITION)):
+            transition_probabilities[none, none, :, :, :, :, approaching, vertical_crevice_position] = get_movement_probabilities(approaching_probabilities * vertical_crevice_position_probabilities[vertical_crevice_position])
+            transition_probabilities[approaching, vertical_crevice_position, :, :, :, :, approaching, vertical_crevice_position] = get_movement_probabilities(1 - at_probabilities)
+            transition_probabilities[approaching, vertical_crevice_position, :, :, :, :, at, vertical_crevice_position] = get_movement_probabilities(at_probabilities)
+            transition_probabilities[at, vertical_crevice_position, :, :, :, :, at, vertical_crevice_position] = get_movement_probabilities(1 - pass_probabilities)
+            transition_probabilities[at, vertical_crevice_position, :, :, :, :, none, none] = get_movement_probabilities(pass_probabilities)
+
+        n_states = len(self.state_space)
+        transition_probabilities = transition_probabilities.reshape(n_states, len(self.parameter_space), n_states)
+
+        horizontal_crevice_positions, vertical_crevice_positions, _, _ = self.state_space.get_factor_indices()
+        absorbing_states = np.flatnonzero((horizontal_crevice_positions == none) != (vertical_crevice_positions == none))
+        transition_probabilities[absorbing_states, :, absorbing_states] = 1
+
+        return transition_probabilities
+
+    def compile_severities(self):
+        severities = np.ones((len(HORIZONTAL_CREVICE_POSITION), len(VERTICAL_CREVICE_POSITION), len(ROVER_SPEED), len(ROVER_OFFSET)))
+        severities[HORIZONTAL_CREVICE_POSITION.index('AT'), 1:] = [[[SEVERITY_MAP[vertical_crevice_position][rover_speed][rover_offset] for rover_offset in ROVER_OFFSET] for rover_speed in ROVER_SPEED] for vertical_crevice_position in VERTICAL_CREVICE_POSITION[1:]]
+        return np.repeat(severities.reshape(-1, 1), len(self.parameter_space), axis=1)
+
+    def compile_interferences(self):
+        return compile_interferences(self)
+
     def start_states(self):
         start_states = []
 
@@ -178,4 +262,23 @@ class CreviceSafetyProcess:
                 start_state = f'NONE:NONE:{vehicle_speed}:{vehicle_offset}'
                 start_states.append(start_state)
 
-        return start_states
\ No newline at end of file
+        return start_states
+
+    def get_definition(self):
+        return {
+            'horizontal_crevice_position': HORIZONTAL_CREVICE_POSITION,
+            'vertical_crevice_position': VERTICAL_CREVICE_POSITION,
+            'rover_speed': ROVER_SPEED,
+            'rover_offset': ROVER_OFFSET,
+            'wheel_rotation_parameters': WHEEL_ROTATION_PARAMETERS,
+            'steering_parameters': STEERING_PARAMETERS,
+            'approaching_probability': APPROACHING_PROBABILITY,
+            'at_probability': AT_PROBABILITY,
+            'pass_probability': PASS_PROBABILITY,
+            'vertical_crevice_position_probabilities': VERTICAL_CREVICE_POSITION_PROBABILITIES,
+            'speed_probabilities': SPEED_PROBABILITIES,
+            'vehicle_offset_probabilities': VEHICLE_OFFSET_PROBABILITIES,
+            'severity_map': SEVERITY_MAP,
+            'interference_map': INTERFERENCE_MAP,
+            'start_states': self.start_states()
+        }
@@ -1,5 +1,10 @@
 import itertools
+
+import numpy as np
+
+from safety_processes.compilers import compile_interferences
 from safety_processes.rough_terrain_safety_process import NOMINAL_TERRAIN_LEVEL
+from state_space import StateSpace
 
 NOMINAL_DUST_STORM_LEVEL = 4
 MINIMUM_DUST_STORM_LEVEL = 1
@@ -45,13 +50,10 @@ class DustStormSafetyProcess:
         self.kind = 'dust-storm-safety-process'
         self.name = f'dust-storm-safety-process-{DustStormSafetyProcess.identifier}'
 
-        self.state_registry = {}
-        for state_tuple in itertools.product(DUST_STORM_LEVEL, ROVER_MODE):
-            state = ':'.join((str(state_factor) for state_factor in state_tuple))
-            self.state_registry[state] = {
-                'dust_storm_level': state_tuple[0],
-                'rover_mode': state_tuple[1]
-            }
+        self.state_space = StateSpace([
+            ('dust_storm_level', DUST_STORM_LEVEL),
+            ('rover_mode', ROVER_MODE)
+        ])
 
         self.parameter_registry = {}
         for parameter_tuple in itertools.product(WHEEL_ROTATION_PARAMETERS, STEERING_PARAMETERS):
@@ -61,7 +63,6 @@ class DustStormSafetyProcess:
                 'steering_parameter': parameter_tuple[1]
             }
 
-        self.state_space = list(self.state_registry.keys())
         self.parameter_space = list(self.parameter_registry.keys())
 
         DustStormSafetyProcess.identifier += 1
@@ -73,33 +74,60 @@ class DustStormSafetyProcess:
         return self.parameter_space
 
     def transition_function(self, state, parameter, successor_state):
-        state_record = self.state_registry[state]
+        state_record = self.state_space.get_record(state)
         parameter_record = self.parameter_registry[parameter]
-        successor_state_record = self.state_registry[successor_state]
+        successor_state_record = self.state_space.get_record(successor_state)
 
         dust_storm_level_probability = 0
-        if state_record['dust_storm_level'] == MINIMUM_DUST_STORM_LEVEL and state_record['dust_storm_level'] == successor_state_record['dust_storm_level']:
+        if state_record.dust_storm_level == MINIMUM_DUST_STORM_LEVEL and state_record.dust_storm_level == successor_state_record.dust_storm_level:
             dust_storm_level_probability = DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_DECREASE_PROBABILITY
-        elif state_record['dust_storm_level'] == MAXIMUM_DUST_STORM_LEVEL and state_record['dust_storm_level'] == successor_state_record['dust_storm_level']:
+        elif state_record.dust_storm_level == MAXIMUM_DUST_STORM_LEVEL and state_record.dust_storm_level == successor_state_record.dust_storm_level:
             dust_storm_level_probability = DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_INCREASE_PROBABILITY
-        elif state_record['dust_storm_level'] == successor_state_record['dust_storm_level'] + 1:
+        elif state_record.dust_storm_level == successor_state_record.dust_storm_level + 1:
             dust_storm_level_probability = DUST_STORM_DECREASE_PROBABILITY
-        elif state_record['dust_storm_level'] == successor_state_record['dust_storm_level']:
+        elif state_record.dust_storm_level == successor_state_record.dust_storm_level:
             dust_storm_level_probability = DUST_STORM_REMAIN_PROBABILITY
-        elif state_record['dust_storm_level'] == successor_state_record['dust_storm_level'] - 1:
+        elif state_record.dust_storm_level == successor_state_record.dust_storm_level - 1:
             dust_storm_level_probability = DUST_STORM_INCREASE_PROBABILITY
 
-        if parameter_record['wheel_rotation_parameter'] == 'STOP' and successor_state_record['rover_mode'] == 'IS_STOPPED':
+        if parameter_record['wheel_rotation_parameter'] == 'STOP' and successor_state_record.rover_mode == 'IS_STOPPED':
             return dust_storm_level_probability
 
-        if parameter_record['wheel_rotation_parameter'] != 'STOP' and successor_state_record['rover_mode'] == 'IS_NOT_STOPPED':
+        if parameter_record['wheel_rotation_parameter'] != 'STOP' and successor_state_record.rover_mode == 'IS_NOT_STOPPED':
             return dust_storm_level_probability
 
         return 0
 
+    def successors(self, state, parameter):
+        for successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), parameter):
+            yield self.state_space[successor_state_index], probability
+
+    def indexed_successors(self, state_index, parameter):
+        state_record = self.state_space.get_record(state_index)
+        parameter_record = self.parameter_registry[parameter]
+
+        dust_storm_level = state_record.dust_storm_level
+        successor_rover_mode = 'IS_STOPPED' if parameter_record['wheel_rotation_parameter'] == 'STOP' else 'IS_NOT_STOPPED'
+
+        dust_storm_level_transitions = [
+            (dust_storm_level - 1, DUST_STORM_DECREASE_PROBABILITY),
+            (dust_storm_level, DUST_STORM_REMAIN_PROBABILITY),
+            (dust_storm_level + 1, DUST_STORM_INCREASE_PROBABILITY)
+        ]
+
+        if dust_storm_level == MINIMUM_DUST_STORM_LEVEL:
+            dust_storm_level_transitions = [(dust_storm_level, DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_DECREASE_PROBABILITY), dust_storm_level_transitions[2]]
+        elif dust_storm_level == MAXIMUM_DUST_STORM_LEVEL:
+            dust_storm_level_transitions = [dust_storm_level_transitions[0], (dust_storm_level, DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_INCREASE_PROBABILITY)]
+
+        for successor_dust_storm_level, probability in dust_storm_level_transitions:
+            if probability > 0:
+                yield self.state_space.get_index((successor_dust_storm_level, successor_rover_mode)), probability
+
     def severity_function(self, state, _):
-        dust_storm_level = self.state_registry[state]['dust_storm_level']
-        rover_mode = self.state_registry[state]['rover_mode']
+        state_record = self.state_space.get_record(state)
+        dust_storm_level = state_record.dust_storm_level
+        rover_mode = state_record.rover_mode
 
         if rover_mode == 'IS_STOPPED':
             return 1
@@ -112,5 +140,45 @@ class DustStormSafetyProcess:
         steering_parameter = parameter_record['steering_parameter']
         return INTERFERENCE_MAP[wheel_rotation_parameter] + INTERFERENCE_MAP[steering_parameter]
 
+    def compile_transition_probabilities(self):
+        n_dust_storm_levels = len(DUST_STORM_LEVEL)
+
+        dust_storm_level_probabilities = DUST_STORM_REMAIN_PROBABILITY * np.eye(n_dust_storm_levels) + DUST_STORM_DECREASE_PROBABILITY * np.eye(n_dust_storm_levels, k=-1) + DUST_STORM_INCREASE_PROBABILITY * np.eye(n_dust_storm_levels, k=1)
+        dust_storm_level_probabilities[0, 0] = DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_DECREASE_PROBABILITY
+        dust_storm_level_probabilities[-1, -1] = DUST_STORM_REMAIN_PROBABILITY + DUST_STORM_INCREASE_PROBABILITY
+
+        is_stopping = np.array([wheel_rotation_parameter == 'STOP' for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        is_stopped = np.array([rover_mode == 'IS_STOPPED' for rover_mode in ROVER_MODE])
+        rover_mode_probabilities = (is_stopping[:, None] == is_stopped[None, :]).astype(float)
+
+        # Use one axis for each state factor, parameter factor, and successor state factor
+        transition_probabilities = dust_storm_level_probabilities[:, None, None, None, :, None] * rover_mode_probabilities[None, None, :, None, None, :]
+        transition_probabilities = np.broadcast_to(transition_probabilities, (n_dust_storm_levels, len(ROVER_MODE), len(WHEEL_ROTATION_PARAMETERS), len(STEERING_PARAMETERS), n_dust_storm_levels, len(ROVER_MODE)))
+
+        n_states = len(self.state_space)
+        return transition_probabilities.reshape(n_states, len(self.parameter_space), n_states)
+
+    def compile_severities(self):
+        severities = np.ones((len(DUST_STORM_LEVEL), len(ROVER_MODE)))
+        severities[:, ROVER_MODE.index('IS_NOT_STOPPED')] = [SEVERITY_MAP[dust_storm_level] for dust_storm_level in DUST_STORM_LEVEL]
+        return np.repeat(severities.reshape(-1, 1), len(self.parameter_space), axis=1)
+
+    def compile_interferences(self):
+        return compile_interferences(self)
+
     def start_states(self):
-        return [f'{NOMINAL_DUST_STORM_LEVEL}:IS_STOPPED', f'{NOMINAL_DUST_STORM_LEVEL}:IS_NOT_STOPPED']
\ No newline at end of file
+        return [f'{NOMINAL_DUST_STORM_LEVEL}:IS_STOPPED', f'{NOMINAL_DUST_STORM_LEVEL}:IS_NOT_STOPPED']
+
+    def get_definition(self):
+        return {
+            'dust_storm_level': list(DUST_STORM_LEVEL),
+            'rover_mode': ROVER_MODE,
+            'wheel_rotation_parameters': WHEEL_ROTATION_PARAMETERS,
+            'steering_parameters': STEERING_PARAMETERS,
+            'dust_storm_increase_probability': DUST_STORM_INCREASE_PROBABILITY,
+            'dust_storm_remain_probability': DUST_STORM_REMAIN_PROBABILITY,
+            'dust_storm_decrease_probability': DUST_STORM_DECREASE_PROBABILITY,
+            'severity_map': SEVERITY_MAP,
+            'interference_map': INTERFERENCE_MAP,
+            'start_states': self.start_states()
+        }
@@ -1,5 +1,10 @@
 import itertools
 
+import numpy as np
+
+from safety_processes.compilers import compile_interferences
+from state_space import StateSpace
+
 HORIZONTAL_ROUGH_TERRAIN_POSITION = ['NONE', 'APPROACHING', 'AT']
 ROVER_SPEED = ['NONE', 'LOW', 'NORMAL', 'HIGH']
 
@@ -107,14 +112,11 @@ class RoughTerrainSafetyProcess:
         self.kind = 'rough-terrain-safety-process'
         self.name = f'rough-terrain-safety-process-{RoughTerrainSafetyProcess.identifier}'
 
-        self.state_registry = {}
-        for state_tuple in itertools.product(HORIZONTAL_ROUGH_TERRAIN_POSITION, ROVER_SPEED, ROUGH_TERRAIN_LEVEL):
-            state = ':'.join((str(state_factor) for state_factor in state_tuple))
-            self.state_registry[state] = {
-                'horizontal_rough_terrain_position': state_tuple[0],
-                'rover_speed': state_tuple[1],
-                'rough_terrain_level': state_tuple[2]
-            }
+        self.state_space = StateSpace([
+            ('horizontal_rough_terrain_position', HORIZONTAL_ROUGH_TERRAIN_POSITION),
+            ('rover_speed', ROVER_SPEED),
+            ('rough_terrain_level', ROUGH_TERRAIN_LEVEL)
+        ])
 
         self.parameter_registry = {}
         for parameter_tuple in itertools.product(WHEEL_ROTATION_PARAMETERS, STEERING_PARAMETERS):
@@ -124,7 +126,6 @@ class RoughTerrainSafetyProcess:
                 'steering_parameter': parameter_tuple[1]
             }
 
-        self.state_space = list(self.state_registry.keys())
         self.parameter_space = list(self.parameter_registry.keys())
 
         RoughTerrainSafetyProcess.identifier += 1
@@ -136,58 +137,113 @@ class RoughTerrainSafetyProcess:
         return self.parameter_space
 
     def transition_function(self, state, parameter, successor_state):
-        state_record = self.state_registry[state]
+        state_record = self.state_space.get_record(state)
         parameter_record = self.parameter_registry[parameter]
-        successor_state_record = self.state_registry[successor_state]
+        successor_state_record = self.state_space.get_record(successor_state)
  
-        if state_record['horizontal_rough_terrain_position'] == 'NONE' and state_record['rough_terrain_level'] != NOMINAL_TERRAIN_LEVEL:
-            return 1 if state == successor_state else 0
+        if state_record.horizontal_rough_terrain_position == 'NONE' and state_record.rough_terrain_level != NOMINAL_TERRAIN_LEVEL:
+            return 1 if state_record == successor_state_record else 0
 
-        if state_record['horizontal_rough_terrain_position'] == 'NONE':
-            if successor_state_record['horizontal_rough_terrain_position'] == 'NONE' and successor_state_record['rough_terrain_level'] == NOMINAL_TERRAIN_LEVEL:
-                return (1 - APPROACHING_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']]
+        if state_record.horizontal_rough_terrain_position == 'NONE':
+            if successor_state_record.horizontal_rough_terrain_position == 'NONE' and successor_state_record.rough_terrain_level == NOMINAL_TERRAIN_LEVEL:
+                return (1 - APPROACHING_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed]
 
-            if successor_state_record['horizontal_rough_terrain_position'] == 'APPROACHING':
-                return APPROACHING_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * ROUGH_TERRAIN_LEVEL_PROBABILITY[successor_state_record['rough_terrain_level']]
+            if successor_state_record.horizontal_rough_terrain_position == 'APPROACHING':
+                return APPROACHING_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * ROUGH_TERRAIN_LEVEL_PROBABILITY[successor_state_record.rough_terrain_level]
 
             return 0
 
         rough_terrain_level_probability = 0
-        if state_record['rough_terrain_level'] == MINIMUM_TERRAIN_LEVEL and state_record['rough_terrain_level'] == successor_state_record['rough_terrain_level']:
+        if state_record.rough_terrain_level == MINIMUM_TERRAIN_LEVEL and state_record.rough_terrain_level == successor_state_record.rough_terrain_level:
             rough_terrain_level_probability = ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_DECREASE_PROBABILITY
-        elif state_record['rough_terrain_level'] == MAXIMUM_TERRAIN_LEVEL and state_record['rough_terrain_level'] == successor_state_record['rough_terrain_level']:
+        elif state_record.rough_terrain_level == MAXIMUM_TERRAIN_LEVEL and state_record.rough_terrain_level == successor_state_record.rough_terrain_level:
             rough_terrain_level_probability = ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_INCREASE_PROBABILITY
-        elif state_record['rough_terrain_level'] == successor_state_record['rough_terrain_level'] + 1:
+        elif state_record.rough_terrain_level == successor_state_record.rough_terrain_level + 1:
             rough_terrain_level_probability = ROUGH_TERRAIN_DECREASE_PROBABILITY
-        elif state_record['rough_terrain_level'] == successor_state_record['rough_terrain_level']:
+        elif state_record.rough_terrain_level == successor_state_record.rough_terrain_level:
             rough_terrain_level_probability = ROUGH_TERRAIN_REMAIN_PROBABILITY
-        elif state_record['rough_terrain_level'] == successor_state_record['rough_terrain_level'] - 1:
+        elif state_record.rough_terrain_level == successor_state_record.rough_terrain_level - 1:
             rough_terrain_level_probability = ROUGH_TERRAIN_INCREASE_PROBABILITY
 
-        if state_record['horizontal_rough_terrain_position'] == 'APPROACHING':
-            if successor_state_record['horizontal_rough_terrain_position'] == 'APPROACHING':
-                return (1 - AT_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * rough_terrain_level_probability
+        if state_record.horizontal_rough_terrain_position == 'APPROACHING':
+            if successor_state_record.horizontal_rough_terrain_position == 'APPROACHING':
+                return (1 - AT_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * rough_terrain_level_probability
 
-            if successor_state_record['horizontal_rough_terrain_position'] == 'AT':
-                return AT_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * rough_terrain_level_probability
+            if successor_state_record.horizontal_rough_terrain_position == 'AT':
+                return AT_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * rough_terrain_level_probability
 
             return 0
 
-        if state_record['horizontal_rough_terrain_position'] == 'AT':
-            if successor_state_record['horizontal_rough_terrain_position'] == 'AT':
-                return (1 - PASS_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * rough_terrain_level_probability
+        if state_record.horizontal_rough_terrain_position == 'AT':
+            if successor_state_record.horizontal_rough_terrain_position == 'AT':
+                return (1 - PASS_PROBABILITY) * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * rough_terrain_level_probability
 
-            if successor_state_record['horizontal_rough_terrain_position'] == 'NONE':
-                return PASS_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record['rover_speed']] * rough_terrain_level_probability
+            if successor_state_record.horizontal_rough_terrain_position == 'NONE':
+                return PASS_PROBABILITY * SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']][successor_state_record.rover_speed] * rough_terrain_level_probability
 
             return 0
 
         return 1
 
+    def successors(self, state, parameter):
+        for successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), parameter):
+            yield self.state_space[successor_state_index], probability
+
+    def indexed_successors(self, state_index, parameter):
+        state_record = self.state_space.get_record(state_index)
+        parameter_record = self.parameter_registry[parameter]
+
+        horizontal_rough_terrain_position = state_record.horizontal_rough_terrain_position
+        rough_terrain_level = state_record.rough_terrain_level
+        speed_probabilities = SPEED_PROBABILITIES[parameter_record['wheel_rotation_parameter']]
+
+        if horizontal_rough_terrain_position == 'NONE' and rough_terrain_level != NOMINAL_TERRAIN_LEVEL:
+            yield state_index, 1
+            return
+
+        if horizontal_rough_terrain_position == 'NONE':
+            for successor_rover_speed in ROVER_SPEED:
+                probability = (1 - APPROACHING_PROBABILITY) * speed_probabilities[successor_rover_speed]
+                if probability > 0:
+                    yield self.state_space.get_index(('NONE', successor_rover_speed, NOMINAL_TERRAIN_LEVEL)), probability
+
+            for successor_rover_speed in ROVER_SPEED:
+                for successor_rough_terrain_level in ROUGH_TERRAIN_LEVEL:
+                    probability = APPROACHING_PROBABILITY * speed_probabilities[successor_rover_speed] * ROUGH_TERRAIN_LEVEL_PROBABILITY[successor_rough_terrain_level]
+                    if probability > 0:
+                        yield self.state_space.get_index(('APPROACHING', successor_rover_speed, successor_rough_terrain_level)), probability
+
+            return
+
+        rough_terrain_level_transitions = [
+            (rough_terrain_level - 1, ROUGH_TERRAIN_DECREASE_PROBABILITY),
+            (rough_terrain_level, ROUGH_TERRAIN_REMAIN_PROBABILITY),
+            (rough_terrain_level + 1, ROUGH_TERRAIN_INCREASE_PROBABILITY)
+        ]
+
+        if rough_terrain_level == MINIMUM_TERRAIN_LEVEL:
+            rough_terrain_level_transitions = [(rough_terrain_level, ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_DECREASE_PROBABILITY), rough_terrain_level_transitions[2]]
+        elif rough_terrain_level == MAXIMUM_TERRAIN_LEVEL:
+            rough_terrain_level_transitions = [rough_terrain_level_transitions[0], (rough_terrain_level, ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_INCREASE_PROBABILITY)]
+
+        # List the successor rough terrain positions in the order of the state space along with the probability of reaching them
+        if horizontal_rough_terrain_position == 'APPROACHING':
+            rough_terrain_transitions = [('APPROACHING', 1 - AT_PROBABILITY), ('AT', AT_PROBABILITY)]
+        else:
+            rough_terrain_transitions = [('NONE', PASS_PROBABILITY), ('AT', 1 - PASS_PROBABILITY)]
+
+        for successor_horizontal_rough_terrain_position, rough_terrain_probability in rough_terrain_transitions:
+            for successor_rover_speed in ROVER_SPEED:
+                for successor_rough_terrain_level, rough_terrain_level_probability in rough_terrain_level_transitions:
+                    probability = rough_terrain_probability * speed_probabilities[successor_rover_speed] * rough_terrain_level_probability
+                    if probability > 0:
+                        yield self.state_space.get_index((successor_horizontal_rough_terrain_position, successor_rover_speed, successor_rough_terrain_level)), probability
+
     def severity_function(self, state, _):
-        horizontal_rough_terrain_position = self.state_registry[state]['horizontal_rough_terrain_position']
-        rough_terrain_level = self.state_registry[state]['rough_terrain_level']
-        rover_speed = self.state_registry[state]['rover_speed']
+        state_record = self.state_space.get_record(state)
+        horizontal_rough_terrain_position = state_record.horizontal_rough_terrain_position
+        rough_terrain_level = state_record.rough_terrain_level
+        rover_speed = state_record.rover_speed
 
         if horizontal_rough_terrain_position == 'AT':
             return ROVER_SPEED_SEVERITY_MAP[rover_speed][rough_terrain_level]
@@ -200,6 +256,51 @@ class RoughTerrainSafetyProcess:
         steering_parameter = parameter_record['steering_parameter']
         return INTERFERENCE_MAP[wheel_rotation_parameter] + INTERFERENCE_MAP[steering_parameter]
 
+    def compile_transition_probabilities(self):
+        n_rough_terrain_levels = len(ROUGH_TERRAIN_LEVEL)
+        nominal_terrain_level = ROUGH_TERRAIN_LEVEL.index(NOMINAL_TERRAIN_LEVEL)
+
+        speed_probabilities = np.array([[SPEED_PROBABILITIES[wheel_rotation_parameter][rover_speed] for rover_speed in ROVER_SPEED] for wheel_rotation_parameter in WHEEL_ROTATION_PARAMETERS])
+        rough_terrain_level_probabilities = np.array([ROUGH_TERRAIN_LEVEL_PROBABILITY[rough_terrain_level] for rough_terrain_level in ROUGH_TERRAIN_LEVEL])
+
+        rough_terrain_level_transition_probabilities = ROUGH_TERRAIN_REMAIN_PROBABILITY * np.eye(n_rough_terrain_levels) + ROUGH_TERRAIN_DECREASE_PROBABILITY * np.eye(n_rough_terrain_levels, k=-1) + ROUGH_TERRAIN_INCREASE_PROBABILITY * np.eye(n_rough_terrain_levels, k=1)
+        rough_terrain_level_transition_probabilities[0, 0] = ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_DECREASE_PROBABILITY
+        rough_terrain_level_transition_probabilities[-1, -1] = ROUGH_TERRAIN_REMAIN_PROBABILITY + ROUGH_TERRAIN_INCREASE_PROBABILITY
+
+        # Build the (rough terrain level, wheel rotation parameter, steering parameter, successor rover speed, successor rough terrain level) block of a rough terrain transition
+        def get_movement_probabilities(rough_terrain_probability):
+            return rough_terrain_probability * speed_probabilities[None, :, None, :, None] * rough_terrain_level_transition_probabilities[:, None, None, None, :]
+
+        none, approaching, at = range(len(HORIZONTAL_ROUGH_TERRAIN_POSITION))
+
+        # Use one axis for each state factor, parameter factor, and successor state factor
+        shape = (len(HORIZONTAL_ROUGH_TERRAIN_POSITION), len(ROVER_SPEED), n_rough_terrain_levels)
+        transition_probabilities = np.zeros(shape + (len(WHEEL_ROTATION_PARAMETERS), len(STEERING_PARAMETERS)) + shape)
+
+        transition_probabilities[none, :, nominal_terrain_level, :, :, none, :, nominal_terrain_level] = ((1 - APPROACHING_PROBABILITY) * speed_probabilities)[:, None, :]
+        transition_probabilities[none, :, nominal_terrain_level, :, :, approaching] = (APPROACHING_PROBABILITY * speed_probabilities)[:, None, :, None] * rough_terrain_level_probabilities[None, None, None, :]
+        transition_probabilities[approaching, :, :, :, :, approaching] = get_movement_probabilities(1 - AT_PROBABILITY)
+        transition_probabilities[approaching, :, :, :, :, at] = get_movement_probabilities(AT_PROBABILITY)
+        transition_probabilities[at, :, :, :, :, at] = get_movement_probabilities(1 - PASS_PROBABILITY)
+        transition_probabilities[at, :, :, :, :, none] = get_movement_probabilities(PASS_PROBABILITY)
+
+        n_states = len(self.state_space)
+        transition_probabilities = transition_probabilities.reshape(n_states, len(self.parameter_space), n_states)
+
+        horizontal_rough_terrain_positions, _, rough_terrain_levels = self.state_space.get_factor_indices()
+        absorbing_states = np.flatnonzero((horizontal_rough_terrain_positions == none) & (rough_terrain_levels != nominal_terrain_level))
+        transition_probabilities[absorbing_states, :, absorbing_states] = 1
+
+        return transition_probabilities
+
+    def compile_severities(self):
+        severities = np.ones((len(HORIZONTAL_ROUGH_TERRAIN_POSITION), len(ROVER_SPEED), len(ROUGH_TERRAIN_LEVEL)))
+        severities[HORIZONTAL_ROUGH_TERRAIN_POSITION.index('AT')] = [[ROVER_SPEED_SEVERITY_MAP[rover_speed][rough_terrain_level] for rough_terrain_level in ROUGH_TERRAIN_LEVEL] for rover_speed in ROVER_SPEED]
+        return np.repeat(severities.reshape(-1, 1), len(self.parameter_space), axis=1)
+
+    def compile_interferences(self):
+        return compile_interferences(self)
+
     def start_states(self):
         start_states = []
 
@@ -207,4 +308,25 @@ class RoughTerrainSafetyProcess:
             start_state = f'NONE:{vehicle_speed}:{NOMINAL_TERRAIN_LEVEL}'
             start_states.append(start_state)
 
-        return start_states
\ No newline at end of file
+        return start_states
+
+    def get_definition(self):
+        return {
+            'horizontal_rough_terrain_position': HORIZONTAL_ROUGH_TERRAIN_POSITION,
+            'rover_speed': ROVER_SPEED,
+            'rough_terrain_level': list(ROUGH_TERRAIN_LEVEL),
+            'nominal_terrain_level': NOMINAL_TERRAIN_LEVEL,
+            'rough_terrain_level_probability': ROUGH_TERRAIN_LEVEL_PROBABILITY,
+            'wheel_rotation_parameters': WHEEL_ROTATION_PARAMETERS,
+            'steering_parameters': STEERING_PARAMETERS,
+            'approaching_probability': APPROACHING_PROBABILITY,
+            'at_probability': AT_PROBABILITY,
+            'pass_probability': PASS_PROBABILITY,
+            'speed_probabilities': SPEED_PROBABILITIES,
+            'rough_terrain_increase_probability': ROUGH_TERRAIN_INCREASE_PROBABILITY,
+            'rough_terrain_remain_probability': ROUGH_TERRAIN_REMAIN_PROBABILITY,
+            'rough_terrain_decrease_probability': ROUGH_TERRAIN_DECREASE_PROBABILITY,
+            'rover_speed_severity_map': ROVER_SPEED_SEVERITY_MAP,
+            'interference_map': INTERFERENCE_MAP,
+            'start_states': self.start_states()
+        }
@@ -0,0 +1,168 @@
+import functools
+import itertools
+
+import numpy as np
+
+from safety_processes.compilers import compile_interferences
+from safety_processes.dust_storm_safety_process import INTERFERENCE_MAP, ROVER_MODE, STEERING_PARAMETERS, WHEEL_ROTATION_PARAMETERS
+from state_space import StateSpace
+
+HAZARD_LEVEL_COUNT = 10
+MINIMUM_SEVERITY = 1
+MAXIMUM_SEVERITY = 5
+ROUNDING_SCALE = 1000
+
+
+class SyntheticSafetyProcess:
+    identifier = 1
+
+    def __init__(self, seed, hazard_level_count=HAZARD_LEVEL_COUNT):
+        self.seed = seed
+        self.safety_concern = f'synthetic-{seed}'
+        self.kind = 'synthetic-safety-process'
+        self.name = f'synthetic-safety-process-{SyntheticSafetyProcess.identifier}'
+
+        self.hazard_levels = list(range(1, hazard_level_count + 1))
+        self.state_space = StateSpace([
+            ('hazard_level', self.hazard_levels),
+            ('rover_mode', ROVER_MODE)
+        ])
+
+        self.parameter_registry = {}
+        for parameter_tuple in itertools.product(WHEEL_ROTATION_PARAMETERS, STEERING_PARAMETERS):
+            parameter = ':'.join(parameter_tuple)
+            self.parameter_registry[parameter] = {
+                'wheel_rotation_parameter': parameter_tuple[0],
+                'steering_parameter': parameter_tuple[1]
+            }
+
+        self.parameter_space = list(self.parameter_registry.keys())
+
+        # Draw how likely the hazard level is to fall and to rise under each parameter, where a parameter can only mitigate the natural rise of the hazard
+        random_number_generator = np.random.default_rng(seed)
+        decrease_probability, _, increase_probability = random_number_generator.dirichlet([2, 2, 2])
+        mitigations = random_number_generator.uniform(0, 1, len(self.parameter_space))
+        mitigations[self.parameter_space.index('NONE:NONE')] = 0
+
+        # Round the probabilities down so that the hazard level never has a negative probability of remaining the same
+        self.decrease_probabilities = (np.floor((decrease_probability + mitigations * increase_probability / 2) * ROUNDING_SCALE) / ROUNDING_SCALE).tolist()
+        self.increase_probabilities = (np.floor(increase_probability * (1 - mitigations) * ROUNDING_SCALE) / ROUNDING_SCALE).tolist()
+
+        # Map the hazard levels to severities that never decrease as the hazard level rises
+        self.severity_map = np.sort(random_number_generator.integers(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1, hazard_level_count)).tolist()
+        self.severity_map[0] = MINIMUM_SEVERITY
+        self.nominal_hazard_level = int(random_number_generator.integers(1, hazard_level_count // 2 + 1))
+
+        SyntheticSafetyProcess.identifier += 1
+
+    def states(self):
+        return self.state_space
+
+    def parameters(self):
+        return self.parameter_space
+
+    def transition_function(self, state, parameter, successor_state):
+        successor_state_index = self.state_space.get_state_index(successor_state)
+        for candidate_successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), parameter):
+            if candidate_successor_state_index == successor_state_index:
+                return probability
+
+        return 0
+
+    def successors(self, state, parameter):
+        for successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), parameter):
+            yield self.state_space[successor_state_index], probability
+
+    def indexed_successors(self, state_index, parameter):
+        state_record = self.state_space.get_record(state_index)
+        parameter_index = self.parameter_space.index(parameter)
+        parameter_record = self.parameter_registry[parameter]
+
+        hazard_level = state_record.hazard_level
+        successor_rover_mode = 'IS_STOPPED' if parameter_record['wheel_rotation_parameter'] == 'STOP' else 'IS_NOT_STOPPED'
+
+        # Resolve the hazard for good once it falls to its lowest level so that every parameter ties and the selector stops intervening like with the other safety processes
+        if hazard_level == self.hazard_levels[0]:
+            yield self.state_space.get_index((hazard_level, successor_rover_mode)), 1
+            return
+
+        decrease_probability = self.decrease_probabilities[parameter_index]
+        increase_probability = self.increase_probabilities[parameter_index]
+
+        # Keep the hazard level at its highest level with the probability that it would have crossed it
+        hazard_level_probabilities = {hazard_level: 1 - decrease_probability - increase_probability}
+        hazard_level_probabilities[hazard_level - 1] = decrease_probability
+        hazard_level_probabilities[min(hazard_level + 1, self.hazard_levels[-1])] = hazard_level_probabilities.get(min(hazard_level + 1, self.hazard_levels[-1]), 0) + increase_probability
+
+        for successor_hazard_level, probability in hazard_level_probabilities.items():
+            if probability > 0:
+                yield self.state_space.get_index((successor_hazard_level, successor_rover_mode)), probability
+
+    def severity_function(self, state, _):
+        state_record = self.state_space.get_record(state)
+
+        if state_record.rover_mode == 'IS_STOPPED':
+            return MINIMUM_SEVERITY
+
+        return self.severity_map[self.hazard_levels.index(state_record.hazard_level)]
+
+    def interference_function(self, _, parameter):
+        parameter_record = self.parameter_registry[parameter]
+        return INTERFERENCE_MAP[parameter_record['wheel_rotation_parameter']] + INTERFERENCE_MAP[parameter_record['steering_parameter']]
+
+    def compile_transition_probabilities(self):
+        n_hazard_levels = len(self.hazard_levels)
+        n_parameters = len(self.parameter_space)
+
+        decrease_probabilities = np.array(self.decrease_probabilities)[:, None, None]
+        increase_probabilities = np.array(self.increase_probabilities)[:, None, None]
+
+        hazard_level_probabilities = (1 - decrease_probabilities - increase_probabilities) * np.eye(n_hazard_levels) + decrease_probabilities * np.eye(n_hazard_levels, k=-1) + increase_probabilities * np.eye(n_hazard_levels, k=1)
+        hazard_level_probabilities[:, -1, -1] += increase_probabilities[:, 0, 0]
+        hazard_level_probabilities[:, 0, :] = 0
+        hazard_level_probabilities[:, 0, 0] = 1
+
+        is_stopping = np.array([self.parameter_registry[parameter]['wheel_rotation_parameter'] == 'STOP' for parameter in self.parameter_space])
+        is_stopped = np.array([rover_mode == 'IS_STOPPED' for rover_mode in ROVER_MODE])
+        rover_mode_probabilities = (is_stopping[:, None] == is_stopped[None, :]).astype(float)
+
+        # Use one axis for each state factor, the parameter, and each successor state factor
+        transition_probabilities = hazard_level_probabilities.transpose(1, 0, 2)[:, None, :, :, None] * rover_mode_probabilities[None, None, :, None, :]
+        transition_probabilities = np.broadcast_to(transition_probabilities, (n_hazard_levels, len(ROVER_MODE), n_parameters, n_hazard_levels, len(ROVER_MODE)))
+
+        n_states = len(self.state_space)
+        return transition_probabilities.reshape(n_states, n_parameters, n_states)
+
+    def compile_severities(self):
+        severities = np.full((len(self.hazard_levels), len(ROVER_MODE)), MINIMUM_SEVERITY, dtype=float)
+        severities[:, ROVER_MODE.index('IS_NOT_STOPPED')] = self.severity_map
+        return np.repeat(severities.reshape(-1, 1), len(self.parameter_space), axis=1)
+
+    def compile_interferences(self):
+        return compile_interferences(self)
+
+    def start_states(self):
+        return [f'{self.nominal_hazard_level}:IS_STOPPED', f'{self.nominal_hazard_level}:IS_NOT_STOPPED']
+
+    def get_definition(self):
+        return {
+            'seed': self.seed,
+            'hazard_levels': self.hazard_levels,
+            'rover_mode': ROVER_MODE,
+            'parameters': self.parameter_space,
+            'decrease_probabilities': self.decrease_probabilities,
+            'increase_probabilities': self.increase_probabilities,
+            'severity_map': self.severity_map,
+            'resolved_hazard_level': self.hazard_levels[0],
+            'interference_map': INTERFERENCE_MAP,
+            'start_states': self.start_states()
+        }
+
+
+def get_synthetic_safety_processes(count, seed=0):
+    return [SyntheticSafetyProcess(seed + index) for index in range(count)]
+
+
+def get_synthetic_safety_process_builders(count, seed=0):
+    # Bind the seed of every synthetic safety process to its constructor so that the simulator can build it like any other safety process
+    return [{'constructor': functools.partial(SyntheticSafetyProcess, seed + index), 'is_active': True} for index in range(count)]
@@ -1,99 +1,179 @@
+import numpy as np
+
+import decision_table
+import policy_store
 import utils
+from decision_cache import DecisionCache
 
 EPSILON = 0.001
 
 MINIMUM_SEVERITY = 1    
 MAXIMUM_SEVERITY = 5
+NO_PARAMETER = 'NONE:NONE'
+SEVERITY_KEYS = [f'{severity}' for severity in range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)]
+# Bound the joint states of a decision table so that a table of each mode never takes more than 64 MB
+MAXIMUM_DECISION_TABLE_SIZE = 2 ** 26
+
+
+def get_decision_keys(severity_counts, interference_values):
+    # Key every parameter by its severity counts from the highest severity level down followed by its interference values from the highest down
+    descending_interference_values = np.sort(interference_values, axis=0)[::-1].T
+    return np.concatenate([severity_counts[:, ::-1], descending_interference_values], axis=1)
+
+
+def get_best_parameter_index(decision_keys):
+    # Sort the keys lexicographically with a stable sort so that ties go to the first parameter
+    return np.lexsort(decision_keys.T[::-1])[0]
+
+
+def get_best_parameter_mask(decision_keys, is_available):
+    candidates = np.flatnonzero(is_available)
+    best_parameter_index = candidates[get_best_parameter_index(decision_keys[candidates])]
+    return is_available & np.all(decision_keys == decision_keys[best_parameter_index], axis=1)
+
+
+def is_tabulable(safety_processes):
+    return len(safety_processes) > 0 and np.prod([len(safety_process.states()) for safety_process in safety_processes], dtype=float) <= MAXIMUM_DECISION_TABLE_SIZE
 
 
 class Selector:
-    def __init__(self, safety_processes):
+    def __init__(self, safety_processes, is_array_backed=False, decision_cache_size=0):
         self.safety_processes = safety_processes
+        self.is_array_backed = is_array_backed
+
+        # Memoize joint decisions on the safety processes and the states of their ratings, which only array-backed ratings carry
+        assert decision_cache_size == 0 or is_array_backed
+        self.decision_cache = DecisionCache(decision_cache_size) if decision_cache_size > 0 else None
 
         self.severity_parameter_value_map = {}
         self.interference_parameter_value_map = {}
 
+        # Select only among the parameters that every safety process rates, in the order of the first safety process, so that the ratings can be compared parameter by parameter
+        self.parameters = [parameter for parameter in safety_processes[0].parameters() if all(parameter in safety_process.parameters() for safety_process in safety_processes[1:])]
+        assert NO_PARAMETER in self.parameters
+
+        # Hold the (state, parameter, severity) and (state, parameter) tables and the independent decision of every state of every safety process in array-backed mode
+        self.severity_parameter_value_tables = {}
+        self.interference_parameter_value_tables = {}
+        self.independent_parameter_index_tables = {}
+
+        # Hold a table of the decision for every joint state of the safety processes that it covers in each mode once loaded
+        self.decision_state_spaces = []
+        self.decision_tables = {}
+
         for safety_process in self.safety_processes:
             solution = utils.get_safety_process_solution(safety_process, EPSILON)
+
+            if self.is_array_backed:
+                states = safety_process.states()
+                self.severity_parameter_value_tables[safety_process.name] = policy_store.get_array(solution['severity_parameter_values'], [states, self.parameters, SEVERITY_KEYS])
+                self.interference_parameter_value_tables[safety_process.name] = policy_store.get_array(solution['interference_parameter_values'], [states, self.parameters])
+                self.independent_parameter_index_tables[safety_process.name] = decision_table.get_independent_parameter_indices(self.severity_parameter_value_tables[safety_process.name], self.interference_parameter_value_tables[safety_process.name])
+                continue
+
             self.severity_parameter_value_map[safety_process.name] = solution['severity_parameter_values']
             self.interference_parameter_value_map[safety_process.name] = solution['interference_parameter_values']
 
-    def filter_by_severity(self, parameters, ratings):
-        severity_count_matrix = {}
+    def get_rating_row(self, rating):
+        # Lay out a rating as (parameters, severities) severity values and (parameters) interference values
+        if self.is_array_backed:
+            return rating[0], rating[1]
+
+        severity_values = np.array([[rating[parameter]['severity'][severity_key] for severity_key in SEVERITY_KEYS] for parameter in self.parameters])
+        interference_values = np.array([rating[parameter]['interference'] for parameter in self.parameters])
+        return severity_values, interference_values
 
-        for parameter in parameters:
-            severity_count_matrix[parameter] = {severity: 0 for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1))}
-            for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)):
-                for rating in ratings:
-                    severity_count_matrix[parameter][severity] += rating[parameter]['severity'][f'{severity}']
+    def get_rating_aggregates(self, ratings):
+        # Add up the severity values of the ratings one rating at a time into running (parameters, severities) counts so that a decision on many safety processes
+        # never stacks their severity values, and collect the (ratings, parameters) interference values that the descending order of each parameter needs
+        severity_counts = np.zeros((len(self.parameters), len(SEVERITY_KEYS)))
+        interference_values = np.zeros((len(ratings), len(self.parameters)))
 
-        available_parameters = set(parameters)
-        eliminated_parameters = set()
-        for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)):
-            minimum_severity = min([severity_count_matrix[parameter][severity] for parameter in available_parameters])
-            for parameter in available_parameters:
-                if severity_count_matrix[parameter][severity] > minimum_severity:
-                    eliminated_parameters.add(parameter)
+        for position, rating in enumerate(ratings):
+            severity_values, interference_values[position] = self.get_rating_row(rating)
+            severity_counts += severity_values
 
-            available_parameters = available_parameters - eliminated_parameters
+        return severity_counts, interference_values
 
-        return available_parameters
+    def get_parameter_mask(self, parameters):
+        parameters = set(parameters)
+        return np.array([parameter in parameters for parameter in self.parameters])
+
+    def filter_by_severity(self, parameters, ratings):
+        severity_counts, _ = self.get_rating_aggregates(ratings)
+        is_available = get_best_parameter_mask(severity_counts[:, ::-1], self.get_parameter_mask(parameters))
+        return [parameter for parameter, is_parameter_available in zip(self.parameters, is_available) if is_parameter_available]
 
     def filter_by_interference(self, parameters, ratings):
-        interference_matrix = {}
+        _, interference_values = self.get_rating_aggregates(ratings)
+        descending_interference_values = np.sort(interference_values, axis=0)[::-1].T
+        is_available = get_best_parameter_mask(descending_interference_values, self.get_parameter_mask(parameters))
+        return [parameter for parameter, is_parameter_available in zip(self.parameters, is_available) if is_parameter_available]
+
+    def get_best_parameter(self, ratings):
+        severity_counts, interference_values = self.get_rating_aggregates(ratings)
+        return self.parameters[get_best_parameter_index(get_decision_keys(severity_counts, interference_values))]
+
+    def get_baseline_parameter(self, ratings):
+        for rating in ratings:
+            parameter = self.independent_select(rating)
 
-        for parameter in parameters:
-            values = [rating[parameter]['interference'] for rating in ratings]
-            descending_values = sorted(values, reverse=True)
-            interference_matrix[parameter] = descending_values
+            if parameter != NO_PARAMETER:
+                break
 
-        for index in range(len(ratings)):
-            highest_severity_column = [interference_matrix[parameter][index] for parameter in interference_matrix]
+        return parameter
 
-            minimum_value = min(highest_severity_column)
+    def get_memoized_parameter(self, mode, ratings, get_parameter):
+        if self.decision_cache is None:
+            return get_parameter(ratings)
 
-            new_value_matrix = {}
-            for parameter, values in interference_matrix.items():
-                if values[index] == minimum_value:
-                    new_value_matrix[parameter] = values
+        key = (mode, tuple(rating[2] for rating in ratings))
 
-            interference_matrix = new_value_matrix
+        parameter = self.decision_cache.get(key)
+        if parameter is None:
+            parameter = get_parameter(ratings)
+            self.decision_cache.put(key, parameter)
 
-        return list(interference_matrix.keys())
+        return parameter
 
     def select(self, ratings, is_baseline):
         if is_baseline:
             return self.baseline_select(ratings)
-        
-        parameters = self.safety_processes[0].parameters()
-        best_severity_parameters = self.filter_by_severity(parameters, ratings)
-        best_severity_interference_parameters = self.filter_by_interference(best_severity_parameters, ratings)
-        return best_severity_interference_parameters[0]
+
+        return self.get_memoized_parameter('proposed', ratings, self.get_best_parameter)
 
     def baseline_select(self, ratings): 
-        parameters = self.safety_processes[0].parameters()
-        
-        for rating in ratings:
-            independent_ratings = [rating]
-            best_severity_parameters = self.filter_by_severity(parameters, independent_ratings)
-            best_severity_interference_parameters = self.filter_by_interference(best_severity_parameters, independent_ratings)
-            parameter = best_severity_interference_parameters[0]
+        return self.get_memoized_parameter('baseline', ratings, self.get_baseline_parameter)
 
-            if parameter != 'NONE:NONE':
-                break
+    def independent_select(self, rating):
+        if self.is_array_backed:
+            name, state_index = rating[2]
+            return self.parameters[self.independent_parameter_index_tables[name][state_index]]
 
-        return parameter
+        return self.get_best_parameter([rating])
 
-    def independent_select(self, rating):
-        parameters = self.safety_processes[0].parameters()
+    def load_decision_tables(self, safety_processes):
+        assert self.is_array_backed
+        assert is_tabulable(safety_processes)
 
-        independent_ratings = [rating]
+        self.decision_state_spaces = [safety_process.states() for safety_process in safety_processes]
+        self.decision_tables = {is_baseline: utils.get_decision_table(self, safety_processes, NO_PARAMETER, is_baseline, EPSILON) for is_baseline in [True, False]}
 
-        best_severity_parameters = self.filter_by_severity(parameters, independent_ratings)
-        best_severity_interference_parameters = self.filter_by_interference(best_severity_parameters, independent_ratings)
-        return best_severity_interference_parameters[0]
+    def decide(self, process_states, is_baseline):
+        # Look up the decision for the states of the safety processes of the decision tables, given in the same order
+        state_indices = tuple(state_space.get_state_index(state) for state_space, state in zip(self.decision_state_spaces, process_states))
+        return self.parameters[self.decision_tables[is_baseline][state_indices]]
 
     def recommend(self, safety_process, state):
+        # Return views of the rows of the tables in array-backed mode along with the safety process and the state that they rate
+        if self.is_array_backed:
+            state_index = safety_process.states().get_state_index(state)
+            return self.severity_parameter_value_tables[safety_process.name][state_index], self.interference_parameter_value_tables[safety_process.name][state_index], (safety_process.name, state_index)
+
+        # Key the solution by the name of the state in dict-backed mode, which is the only place where a state index turns back into a name
+        if not isinstance(state, str):
+            state = safety_process.states()[state]
+
         rating = {}
 
         for parameter in safety_process.parameters():
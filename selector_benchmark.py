@@ -0,0 +1,68 @@
+import logging
+import random
+import statistics
+import time
+
+import utils
+from safety_processes.synthetic_safety_process import get_synthetic_safety_processes
+from selector import Selector
+
+SAFETY_PROCESS_COUNTS = [3, 10, 20, 30]
+DECISION_COUNT = 2000
+DECISION_CACHE_SIZE = 4096
+SEED = 0
+
+logging.basicConfig(format='[%(asctime)s|%(module)-25s|%(funcName)-15s|%(levelname)-5s] %(message)s', datefmt='%H:%M:%S', level=logging.INFO)
+
+
+def run_benchmark(safety_process_count, is_baseline):
+    random.seed(SEED)
+
+    safety_processes = get_synthetic_safety_processes(safety_process_count, SEED)
+    selector = Selector(safety_processes, is_array_backed=True)
+    cached_selector = Selector(safety_processes, is_array_backed=True, decision_cache_size=DECISION_CACHE_SIZE)
+
+    table_size = sum(selector.severity_parameter_value_tables[safety_process.name].nbytes + selector.interference_parameter_value_tables[safety_process.name].nbytes + selector.independent_parameter_index_tables[safety_process.name].nbytes for safety_process in safety_processes)
+
+    # Walk every safety process along its own transitions so that the selector sees the states that a simulation would
+    states = [safety_process.states().index(random.choice(safety_process.start_states())) for safety_process in safety_processes]
+    parameter = 'NONE:NONE'
+
+    select_durations = []
+    cached_select_durations = []
+    for _ in range(DECISION_COUNT):
+        states = [utils.get_successor_state(state, parameter, safety_process) for state, safety_process in zip(states, safety_processes)]
+        ratings = [selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, states)]
+
+        start_time = time.perf_counter()
+        parameter = selector.select(ratings, is_baseline)
+        select_durations.append(time.perf_counter() - start_time)
+
+        # Rate the states with the cached selector as well since the cache keys its decisions on the safety processes of the ratings
+        cached_ratings = [cached_selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, states)]
+
+        start_time = time.perf_counter()
+        cached_parameter = cached_selector.select(cached_ratings, is_baseline)
+        cached_select_durations.append(time.perf_counter() - start_time)
+
+        assert cached_parameter == parameter
+
+    return {
+        'safety_process_count': safety_process_count,
+        'is_baseline': is_baseline,
+        'table_size': table_size,
+        'select_duration': statistics.mean(select_durations),
+        'cached_select_duration': statistics.mean(cached_select_durations),
+        'decision_cache_statistics': cached_selector.decision_cache.get_statistics()
+    }
+
+
+def main():
+    for safety_process_count in SAFETY_PROCESS_COUNTS:
+        for is_baseline in [True, False]:
+            benchmark_results = run_benchmark(safety_process_count, is_baseline)
+            logging.info("Benchmarked the selector: [safety_processes=%d, is_baseline=%s, table_size=%.1f KB, select=%.2e s, cached_select=%.2e s, decision_cache=%s]", benchmark_results['safety_process_count'], benchmark_results['is_baseline'], benchmark_results['table_size'] / 1024, benchmark_results['select_duration'], benchmark_results['cached_select_duration'], benchmark_results['decision_cache_statistics'])
+
+
+if __name__ == '__main__':
+    main()
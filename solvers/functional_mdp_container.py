@@ -1,8 +1,14 @@
+import numpy as np
+
+
 class FunctionalMdpContainer:
     def __init__(self, safety_process, objective):
         self.safety_process = safety_process
         self.objective = objective
 
+        self.state_indices = None
+        self.start_state_probabilities = None
+
     def states(self):
         return self.safety_process.states()
 
@@ -12,6 +18,13 @@ class FunctionalMdpContainer:
     def transition_function(self, state, action, successor_state):
         return self.safety_process.transition_function(state, action, successor_state)
 
+    def successors(self, state, action):
+        if hasattr(self.safety_process, 'successors'):
+            return self.safety_process.successors(state, action)
+
+        successor_states = ((successor_state, self.safety_process.transition_function(state, action, successor_state)) for successor_state in self.safety_process.states())
+        return ((successor_state, probability) for successor_state, probability in successor_states if probability > 0)
+
     def reward_function(self, state, action):
         if self.objective == 'severity':
             return self.safety_process.severity_function(state, action)
@@ -21,6 +34,32 @@ class FunctionalMdpContainer:
 
         return None
 
+    def compile_transition_probabilities(self):
+        if hasattr(self.safety_process, 'compile_transition_probabilities'):
+            return self.safety_process.compile_transition_probabilities()
+
+        return None
+
+    def compile_rewards(self):
+        if self.objective == 'severity' and hasattr(self.safety_process, 'compile_severities'):
+            return self.safety_process.compile_severities()
+
+        if self.objective == 'interference' and hasattr(self.safety_process, 'compile_interferences'):
+            return self.safety_process.compile_interferences()
+
+        return None
+
+    def start_states(self):
+        return self.safety_process.start_states()
+
+    def compile_start_state_probabilities(self):
+        # Compute the start state distribution once instead of rebuilding the start states for every state
+        if self.start_state_probabilities is None:
+            self.state_indices = {state: index for index, state in enumerate(self.states())}
+            start_states = set(self.start_states())
+            self.start_state_probabilities = np.array([1.0 / len(start_states) if state in start_states else 0 for state in self.states()])
+
+        return self.start_state_probabilities
+
     def start_state_function(self, state):
-        start_states = self.safety_process.start_states()
-        return 1.0 / len(start_states) if state in start_states else 0
+        return self.compile_start_state_probabilities()[self.state_indices[state]]
@@ -1,25 +1,153 @@
 import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def get_successors(mdp, state, action, state_indices):
+    # List the successors of a state with their indices in the state space of the MDP
+    if hasattr(mdp, 'indexed_successors'):
+        return list(mdp.indexed_successors(state, action))
+
+    states = mdp.states()
+
+    if hasattr(mdp, 'successors'):
+        return [(state_indices[successor_state], probability) for successor_state, probability in mdp.successors(states[state], action)]
+
+    successors = []
+    for successor_state in range(len(states)):
+        probability = mdp.transition_function(states[state], action, states[successor_state])
+        if probability > 0:
+            successors.append((successor_state, probability))
+
+    return successors
+
+
+def get_reachable_transitions(mdp, start_states, state_indices):
+    transitions = {}
+
+    # Search breadth first from the start states across every action to find every state that the MDP could ever visit
+    reachable_states = set(start_states)
+    frontier = list(start_states)
+    while frontier:
+        next_frontier = []
+        for state in frontier:
+            for action in mdp.actions():
+                transitions[state, action] = get_successors(mdp, state, action, state_indices)
+                for successor_state, _ in transitions[state, action]:
+                    if successor_state not in reachable_states:
+                        reachable_states.add(successor_state)
+                        next_frontier.append(successor_state)
+        frontier = next_frontier
+
+    return transitions
+
+
+def get_start_state_probabilities(mdp):
+    if hasattr(mdp, 'compile_start_state_probabilities'):
+        return np.array(mdp.compile_start_state_probabilities(), dtype=float)
+
+    return np.array([mdp.start_state_function(state) for state in mdp.states()], dtype=float)
 
 
 class MemoryMdpContainer:
-    def __init__(self, mdp):
-        self.states = mdp.states()
+    def __init__(self, mdp, is_pruned=False):
         self.actions = mdp.actions()
+        self.is_pruned = is_pruned
+
+        original_states = mdp.states()
+        start_state_probabilities = get_start_state_probabilities(mdp)
+
+        # Work with the indices of the states in the state space of the MDP and only look up state names if the MDP cannot produce indexed successors
+        state_indices = None if hasattr(mdp, 'indexed_successors') else {state: index for index, state in enumerate(original_states)}
+
+        # Compile only the states that the start states can reach while keeping them in the order of the state space of the MDP
+        if is_pruned:
+            reachable_transitions = get_reachable_transitions(mdp, [int(state) for state in np.flatnonzero(start_state_probabilities > 0)], state_indices)
+            self.original_state_indices = sorted({state for state, _ in reachable_transitions})
+            self.states = [original_states[state] for state in self.original_state_indices]
+        else:
+            self.original_state_indices = list(range(len(original_states)))
+            self.states = original_states
+
+        self.state_indices = {state: index for index, state in enumerate(self.states)}
 
         self.n_states = len(self.states)
         self.n_actions = len(self.actions)
 
-        self.rewards = np.zeros(shape=(self.n_states, self.n_actions))
-        for state in range(self.n_states):
-            for action in range(self.n_actions):
-                self.rewards[state, action] = mdp.reward_function(self.states[state], self.actions[action])
+        # Use the vectorized compiler of the MDP if it has one and fall back to evaluating its functions otherwise
+        compiled_rewards = mdp.compile_rewards() if hasattr(mdp, 'compile_rewards') else None
+        compiled_transition_probabilities = mdp.compile_transition_probabilities() if hasattr(mdp, 'compile_transition_probabilities') else None
+
+        # Restrict the compiled tables of the full state space to the reachable states
+        if is_pruned and compiled_rewards is not None:
+            compiled_rewards = np.asarray(compiled_rewards)[self.original_state_indices]
+        if is_pruned and compiled_transition_probabilities is not None:
+            compiled_transition_probabilities = np.asarray(compiled_transition_probabilities)[np.ix_(self.original_state_indices, range(self.n_actions), self.original_state_indices)]
+
+        if compiled_rewards is not None:
+            self.rewards = np.array(compiled_rewards, dtype=float)
+        else:
+            self.rewards = np.zeros(shape=(self.n_states, self.n_actions))
+            for state in range(self.n_states):
+                for action in range(self.n_actions):
+                    self.rewards[state, action] = mdp.reward_function(self.states[state], self.actions[action])
+
+        # Store the transition probabilities as a sparse matrix with one row for each state-action pair (row = state * n_actions + action)
+        if compiled_transition_probabilities is not None:
+            self.transition_probabilities = csr_matrix(compiled_transition_probabilities.reshape(self.n_states * self.n_actions, self.n_states))
+        else:
+            rows = []
+            columns = []
+            probabilities = []
+
+            compact_state_indices = [None] * len(original_states)
+            for state, original_state in enumerate(self.original_state_indices):
+                compact_state_indices[original_state] = state
+
+            for state, original_state in enumerate(self.original_state_indices):
+                for action in range(self.n_actions):
+                    successors = reachable_transitions[original_state, self.actions[action]] if is_pruned else get_successors(mdp, original_state, self.actions[action], state_indices)
+                    for successor_state, probability in successors:
+                        rows.append(state * self.n_actions + action)
+                        columns.append(compact_state_indices[successor_state])
+                        probabilities.append(probability)
+
+            self.transition_probabilities = csr_matrix((probabilities, (rows, columns)), shape=(self.n_states * self.n_actions, self.n_states))
+
+        self.start_state_probabilities = start_state_probabilities[self.original_state_indices]
+
+    def get_transition_probabilities(self, state, action):
+        return self.transition_probabilities[state * self.n_actions + action]
+
+    def save(self, file_path):
+        np.savez(
+            file_path,
+            states=np.array(list(self.states)),
+            actions=np.array(self.actions),
+            is_pruned=self.is_pruned,
+            original_state_indices=np.array(self.original_state_indices),
+            rewards=self.rewards,
+            transition_probability_data=self.transition_probabilities.data,
+            transition_probability_indices=self.transition_probabilities.indices,
+            transition_probability_indptr=self.transition_probabilities.indptr,
+            start_state_probabilities=self.start_state_probabilities
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        memory_mdp_container = cls.__new__(cls)
+
+        with np.load(file_path) as arrays:
+            memory_mdp_container.states = arrays['states'].tolist()
+            memory_mdp_container.actions = arrays['actions'].tolist()
+            memory_mdp_container.is_pruned = bool(arrays['is_pruned'])
+            memory_mdp_container.original_state_indices = arrays['original_state_indices'].tolist()
+
+            memory_mdp_container.n_states = len(memory_mdp_container.states)
+            memory_mdp_container.n_actions = len(memory_mdp_container.actions)
+            memory_mdp_container.state_indices = {state: index for index, state in enumerate(memory_mdp_container.states)}
 
-        self.transition_probabilities = np.zeros(shape=(self.n_states, self.n_actions, self.n_states))
-        for state in range(self.n_states):
-            for action in range(self.n_actions):
-                for successor_state in range(self.n_states):
-                    self.transition_probabilities[state, action, successor_state] = mdp.transition_function(self.states[state], self.actions[action], self.states[successor_state])
+            memory_mdp_container.rewards = arrays['rewards']
+            memory_mdp_container.transition_probabilities = csr_matrix((arrays['transition_probability_data'], arrays['transition_probability_indices'], arrays['transition_probability_indptr']), shape=(memory_mdp_container.n_states * memory_mdp_container.n_actions, memory_mdp_container.n_states))
+            memory_mdp_container.start_state_probabilities = arrays['start_state_probabilities']
 
-        self.start_state_probabilities = np.zeros(self.n_states)
-        for state in range(self.n_states):
-            self.start_state_probabilities[state] = mdp.start_state_function(self.states[state])
+        return memory_mdp_container
@@ -0,0 +1,161 @@
+import logging
+
+import numpy as np
+from scipy.sparse import identity
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import spsolve
+
+from solvers import topological_solver
+from solvers.memory_mdp_container import MemoryMdpContainer
+
+TOLERANCE = 1e-9
+
+
+def get_action_values(memory_mdp_container, gamma, state_values):
+    action_values = memory_mdp_container.rewards.reshape(-1) + gamma * memory_mdp_container.transition_probabilities.dot(state_values)
+    return action_values.reshape(memory_mdp_container.n_states, memory_mdp_container.n_actions)
+
+
+def get_component_action_values(internal_transition_probabilities, constant_action_values, n_actions, gamma, component_state_values):
+    action_values = constant_action_values + gamma * internal_transition_probabilities.dot(component_state_values)
+    return action_values.reshape(-1, n_actions)
+
+
+def get_greedy_policy(action_values, policy=None, tolerance=0):
+    greedy_policy = np.argmax(action_values, axis=1)
+
+    # Keep the current action of each state unless the best action improves on it by more than the tolerance to avoid cycling between ties
+    if policy is not None:
+        is_improved = action_values[np.arange(len(policy)), greedy_policy] > action_values[np.arange(len(policy)), policy] + tolerance
+        greedy_policy = np.where(is_improved, greedy_policy, policy)
+
+    return greedy_policy
+
+
+def get_component_states(memory_mdp_container, is_constant):
+    row_states = np.repeat(np.arange(memory_mdp_container.n_states), memory_mdp_container.n_actions)
+    state_graph = topological_solver.get_state_graph(memory_mdp_container.transition_probabilities, row_states, memory_mdp_container.n_states)
+    n_components, labels = connected_components(state_graph, directed=True, connection='strong')
+
+    # List the variable states of each component in reverse topological order so that each component comes after every component that it can reach
+    sorted_states = np.argsort(labels, kind='stable')
+    component_starts = np.searchsorted(labels[sorted_states], np.arange(n_components + 1))
+    component_states = [sorted_states[component_starts[component]:component_starts[component + 1]] for component in topological_solver.get_component_order(state_graph, labels, n_components)]
+
+    return [states[~is_constant[states]] for states in component_states if np.any(~is_constant[states])]
+
+
+def evaluate_policy(internal_transition_probabilities, constant_action_values, n_actions, policy, gamma):
+    rows = np.arange(len(policy)) * n_actions + policy
+
+    # Solve the linear system (I - gamma * T_policy) v = r_policy over the states of the component with the values of every other state moved to the right hand side
+    system_matrix = (identity(len(policy), format='csc') - gamma * internal_transition_probabilities[rows]).tocsc()
+    return np.atleast_1d(spsolve(system_matrix, constant_action_values[rows]))
+
+
+def policy_iteration(memory_mdp_container, gamma, state_values, component_states):
+    rows = (component_states.reshape(-1, 1) * memory_mdp_container.n_actions + np.arange(memory_mdp_container.n_actions)).reshape(-1)
+    transition_probabilities = memory_mdp_container.transition_probabilities[rows]
+
+    # Fold the values of every successor state outside of the component into a constant term since they are constant or already solved
+    external_state_values = state_values.copy()
+    external_state_values[component_states] = 0
+    constant_action_values = memory_mdp_container.rewards.reshape(-1)[rows] + gamma * transition_probabilities.dot(external_state_values)
+    internal_transition_probabilities = transition_probabilities[:, component_states].tocsr()
+
+    policy = get_greedy_policy(get_component_action_values(internal_transition_probabilities, constant_action_values, memory_mdp_container.n_actions, gamma, state_values[component_states]))
+
+    iterations = 0
+    while True:
+        component_state_values = evaluate_policy(internal_transition_probabilities, constant_action_values, memory_mdp_container.n_actions, policy, gamma)
+        new_policy = get_greedy_policy(get_component_action_values(internal_transition_probabilities, constant_action_values, memory_mdp_container.n_actions, gamma, component_state_values), policy, TOLERANCE)
+
+        iterations += 1
+
+        if np.array_equal(new_policy, policy):
+            break
+
+        policy = new_policy
+
+    return component_state_values, policy, iterations
+
+
+def solve_state(memory_mdp_container, gamma, state_values, self_loop_probabilities, state):
+    rows = slice(state * memory_mdp_container.n_actions, (state + 1) * memory_mdp_container.n_actions)
+
+    # Solve a component with a single state in closed form since its only cycles are self-loops, like the one of the sleep mode of the rover
+    constant_action_values = memory_mdp_container.rewards[state] + gamma * (memory_mdp_container.transition_probabilities[rows].dot(state_values) - self_loop_probabilities[rows] * state_values[state])
+    action_values = constant_action_values / (1 - gamma * self_loop_probabilities[rows])
+
+    action = int(np.argmax(action_values))
+    return action_values[action], action
+
+
+def topological_policy_iteration(memory_mdp_container, gamma, is_constant, initial_state_values):
+    state_values = initial_state_values.copy()
+    policy = np.zeros(memory_mdp_container.n_states, dtype=int)
+
+    transition_probabilities = memory_mdp_container.transition_probabilities.tocoo()
+    is_self_loop = transition_probabilities.col == transition_probabilities.row // memory_mdp_container.n_actions
+    self_loop_probabilities = np.bincount(transition_probabilities.row[is_self_loop], weights=transition_probabilities.data[is_self_loop], minlength=memory_mdp_container.n_states * memory_mdp_container.n_actions)
+
+    # Solve the components one at a time in reverse topological order so that each policy evaluation only spans the states of a single component
+    iterations = 0
+    for component_states in get_component_states(memory_mdp_container, is_constant):
+        if len(component_states) == 1:
+            state_values[component_states[0]], policy[component_states[0]] = solve_state(memory_mdp_container, gamma, state_values, self_loop_probabilities, component_states[0])
+            iterations += 1
+            continue
+
+        state_values[component_states], policy[component_states], component_iterations = policy_iteration(memory_mdp_container, gamma, state_values, component_states)
+        iterations += component_iterations
+
+    return state_values, policy, iterations
+
+
+def solve(task_process, gamma, constant_state_values=None, relax_infeasible=False, is_pruned=True, memory_mdp_container=None, warm_start=None):
+    # Take relax_infeasible only to share the signature of the LP solver and refuse it rather than ignore it:
+    # policy iteration solves the Bellman equations with any constant state values, so there is never an infeasible problem to relax
+    assert not relax_infeasible
+
+    if constant_state_values is None:
+        constant_state_values = {}
+
+    # Reuse the compiled model of the task process if it was passed in and compile it otherwise
+    if memory_mdp_container is None:
+        memory_mdp_container = MemoryMdpContainer(task_process, is_pruned=is_pruned)
+
+    # Drop the constant states that the pruned container no longer holds since no start state can reach them
+    if memory_mdp_container.is_pruned:
+        assert all(state in task_process.states() for state in constant_state_values)
+        constant_state_values = {state: value for state, value in constant_state_values.items() if state in memory_mdp_container.state_indices}
+
+    assert all(state in memory_mdp_container.states for state in constant_state_values)
+
+    is_constant = np.array([state in constant_state_values for state in memory_mdp_container.states])
+    constant_values = np.array([constant_state_values.get(state, 0) for state in memory_mdp_container.states], dtype=float)
+
+    # Warm start the first policy with the state values of the last related solve for every state that it shares with this one,
+    # matching the states by their indices in the state space of the task process, which related task processes share
+    initial_state_values = constant_values.copy()
+    if warm_start is not None and 'state_values' in warm_start and warm_start['state_count'] == len(task_process.states()):
+        _, positions, warm_start_positions = np.intersect1d(memory_mdp_container.original_state_indices, warm_start['original_state_indices'], assume_unique=True, return_indices=True)
+        warm_start_state_values = np.zeros(memory_mdp_container.n_states)
+        warm_start_state_values[positions] = warm_start['state_values'][warm_start_positions]
+        initial_state_values[~is_constant] = warm_start_state_values[~is_constant]
+
+    state_values, policy, iterations = topological_policy_iteration(memory_mdp_container, gamma, is_constant, initial_state_values)
+    logging.debug("Performed topological policy iteration: [states=%d, iterations=%d]", memory_mdp_container.n_states, iterations)
+
+    if warm_start is not None:
+        warm_start['state_count'] = len(task_process.states())
+        warm_start['original_state_indices'] = np.array(memory_mdp_container.original_state_indices)
+        warm_start['state_values'] = state_values.copy()
+
+    variable_state_indices = np.flatnonzero(~is_constant)
+
+    return {
+        'objective_value': float(memory_mdp_container.start_state_probabilities[variable_state_indices].dot(state_values[variable_state_indices])),
+        'values': {memory_mdp_container.states[i]: float(state_values[i]) for i in variable_state_indices},
+        'policy': {memory_mdp_container.states[i]: memory_mdp_container.actions[policy[i]] for i in variable_state_indices}
+    }
@@ -1,113 +1,402 @@
 import logging
+import time
 
 import numpy as np
+from scipy.sparse import identity
+from scipy.sparse.linalg import spsolve
 
+from solvers import topological_solver
 from solvers.functional_mdp_container import FunctionalMdpContainer
 from solvers.memory_mdp_container import MemoryMdpContainer
 
 ROUNDER = 3
 MINIMUM_SEVERITY = 1
 MAXIMUM_SEVERITY = 5
+PRECISION = 'float32'
+EVALUATION_STEPS = 20
 
 logging.basicConfig(format='[%(asctime)s|%(module)-25s|%(funcName)-15s|%(levelname)-5s] %(message)s', datefmt='%H:%M:%S', level=logging.INFO)
 
 
-def value_iteration(memory_mdp_container, gamma, epsilon, severity=False, forbidden_state_action_pairs=False):
-    states = memory_mdp_container.states
-    actions = memory_mdp_container.actions
+def get_working_arrays(memory_mdp_container, severity, forbidden_state_action_pairs, precision):
+    n_states = memory_mdp_container.n_states
+    n_actions = memory_mdp_container.n_actions
 
-    reward_matrix = -1.0 * np.array(memory_mdp_container.rewards).astype('float32')
-    transition_probability_matrix = np.array(memory_mdp_container.transition_probabilities).astype('float32')
+    reward_matrix = -1.0 * np.array(memory_mdp_container.rewards).astype(precision)
+    transition_probability_matrix = memory_mdp_container.transition_probabilities.astype(precision)
 
     if severity:
         reward_matrix[reward_matrix > -severity] = 0
         reward_matrix[reward_matrix < -severity] = 0
         reward_matrix[reward_matrix == -severity] = -1
 
+    is_forbidden = np.zeros((n_states, n_actions), dtype=bool)
     if forbidden_state_action_pairs:
         for banned_state, banned_action in forbidden_state_action_pairs:
             reward_matrix[banned_state, banned_action] = -10000
+            is_forbidden[banned_state, banned_action] = True
+
+    # Remove the rows of the forbidden state-action pairs from the working arrays since they can never be the best action of a state
+    allowed_rows = np.flatnonzero(~is_forbidden.reshape(-1))
+
+    return {
+        'reward_matrix': reward_matrix.reshape(-1),
+        'transition_probability_matrix': transition_probability_matrix,
+        'allowed_rows': allowed_rows,
+        'forbidden_rows': np.flatnonzero(is_forbidden.reshape(-1)),
+        'allowed_row_states': allowed_rows // n_actions,
+        'allowed_state_starts': np.searchsorted(allowed_rows // n_actions, np.arange(n_states)),
+        'allowed_reward_matrix': reward_matrix.reshape(-1)[allowed_rows],
+        'allowed_transition_probability_matrix': transition_probability_matrix[allowed_rows]
+    }
+
+
+def get_initial_state_values(memory_mdp_container, initial_state_values, precision):
+    state_values = np.zeros(memory_mdp_container.n_states, dtype=precision)
+
+    if initial_state_values is not None:
+        state_values[:] = -1.0 * initial_state_values
+
+    return state_values
+
+
+def get_greedy_policy(working_arrays, allowed_action_values, state_values, policy=None, tolerance=0):
+    # Select the first allowed row that attains the best action value of each state
+    is_best = allowed_action_values >= state_values[working_arrays['allowed_row_states']]
+    best_rows = np.flatnonzero(is_best)
+    _, first_best_rows = np.unique(working_arrays['allowed_row_states'][best_rows], return_index=True)
+    greedy_policy = best_rows[first_best_rows]
+
+    # Keep the current row of each state unless the best row improves on it by more than the tolerance to avoid cycling between ties
+    if policy is not None:
+        is_improved = state_values > allowed_action_values[policy] + tolerance
+        greedy_policy = np.where(is_improved, greedy_policy, policy)
+
+    return greedy_policy
+
+
+def get_solution(memory_mdp_container, working_arrays, state_values, allowed_action_values, gamma, iterations):
+    forbidden_rows = working_arrays['forbidden_rows']
+
+    # Evaluate the forbidden state-action pairs with the given state values to report their action values
+    action_values = np.zeros((memory_mdp_container.n_states, memory_mdp_container.n_actions), dtype=state_values.dtype)
+    action_values.reshape(-1)[working_arrays['allowed_rows']] = allowed_action_values
+    action_values.reshape(-1)[forbidden_rows] = working_arrays['reward_matrix'][forbidden_rows] + np.multiply(working_arrays['transition_probability_matrix'][forbidden_rows].dot(state_values), gamma)
+
+    # Keep the values as (states) and (states, actions) arrays and the policy as action indices so that only the solution of the safety process holds names
+    return {
+        'state_values': -1.0 * state_values.astype(np.float64),
+        'action_values': -1.0 * action_values.astype(np.float64),
+        'policy': np.argmax(action_values, axis=1),
+        'iterations': iterations
+    }
 
-    state_values = np.array([0.0 for s in range(len(states))]).astype('float32').reshape(-1, 1)
-    action_values = np.array([[0.0 for a in range(len(actions))] for s in range(len(states))]).astype('float32')
 
-    dimension_array = np.ones((1, transition_probability_matrix.ndim), int).ravel()
-    dimension_array[2] = -1
+def value_iteration(memory_mdp_container, gamma, epsilon, severity=False, forbidden_state_action_pairs=False, precision=PRECISION, initial_state_values=None):
+    working_arrays = get_working_arrays(memory_mdp_container, severity, forbidden_state_action_pairs, precision)
+    allowed_transition_probability_matrix = working_arrays['allowed_transition_probability_matrix']
+    allowed_reward_matrix = working_arrays['allowed_reward_matrix']
+    allowed_state_starts = working_arrays['allowed_state_starts']
 
+    # Preallocate the value buffers of the sweep so that its memory stays O(states * actions) with the sparse matvec as its only temporary array
+    state_values = get_initial_state_values(memory_mdp_container, initial_state_values, precision)
+    new_state_values = np.zeros(memory_mdp_container.n_states, dtype=precision)
+    state_value_differences = np.zeros(memory_mdp_container.n_states, dtype=precision)
+    allowed_action_values = np.zeros(len(working_arrays['allowed_rows']), dtype=precision)
+
+    iterations = 0
     while True:
-        action_values = reward_matrix + gamma * (np.sum(transition_probability_matrix * state_values.reshape(dimension_array), axis=2))
-        new_state_values = np.amax(action_values, axis=1)
+        np.multiply(allowed_transition_probability_matrix.dot(state_values), gamma, out=allowed_action_values)
+        np.add(allowed_reward_matrix, allowed_action_values, out=allowed_action_values)
+
+        np.maximum.reduceat(allowed_action_values, allowed_state_starts, out=new_state_values)
 
-        if np.max(abs(new_state_values - state_values)) < epsilon:
-            state_values = new_state_values
+        np.subtract(new_state_values, state_values, out=state_value_differences)
+        np.abs(state_value_differences, out=state_value_differences)
+
+        state_values, new_state_values = new_state_values, state_values
+        iterations += 1
+
+        if np.max(state_value_differences) < epsilon:
             break
 
-        state_values = new_state_values
+    # Report the action values of the last sweep, which were computed with the state values before it
+    solution = get_solution(memory_mdp_container, working_arrays, new_state_values, allowed_action_values, gamma, iterations)
+    solution['state_values'] = -1.0 * state_values.astype(np.float64)
+    return solution
+
+
+def policy_iteration(memory_mdp_container, gamma, epsilon, severity=False, forbidden_state_action_pairs=False, precision=PRECISION, initial_state_values=None):
+    working_arrays = get_working_arrays(memory_mdp_container, severity, forbidden_state_action_pairs, precision)
+    allowed_transition_probability_matrix = working_arrays['allowed_transition_probability_matrix']
+    allowed_reward_matrix = working_arrays['allowed_reward_matrix']
+
+    identity_matrix = identity(memory_mdp_container.n_states, format='csc')
+
+    state_values = get_initial_state_values(memory_mdp_container, initial_state_values, precision)
+    allowed_action_values = allowed_reward_matrix + np.multiply(allowed_transition_probability_matrix.dot(state_values), gamma)
+    policy = get_greedy_policy(working_arrays, allowed_action_values, np.maximum.reduceat(allowed_action_values, working_arrays['allowed_state_starts']))
+
+    iterations = 0
+    while True:
+        # Evaluate the policy exactly by solving the linear system (I - gamma * T_policy) v = r_policy
+        policy_transition_probability_matrix = allowed_transition_probability_matrix[policy].astype('float64')
+        system_matrix = (identity_matrix - gamma * policy_transition_probability_matrix).tocsc()
+        state_values = spsolve(system_matrix, allowed_reward_matrix[policy].astype('float64')).astype(precision)
+
+        allowed_action_values = allowed_reward_matrix + np.multiply(allowed_transition_probability_matrix.dot(state_values), gamma)
+        best_state_values = np.maximum.reduceat(allowed_action_values, working_arrays['allowed_state_starts'])
+        new_policy = get_greedy_policy(working_arrays, allowed_action_values, best_state_values, policy, epsilon * (1 - gamma))
+
+        iterations += 1
+
+        if np.array_equal(new_policy, policy):
+            break
 
-    state_values *= -1.0
-    action_values *= -1.0
+        policy = new_policy
 
+    return get_solution(memory_mdp_container, working_arrays, state_values, allowed_action_values, gamma, iterations)
+
+
+def modified_policy_iteration(memory_mdp_container, gamma, epsilon, severity=False, forbidden_state_action_pairs=False, precision=PRECISION, initial_state_values=None, evaluation_steps=EVALUATION_STEPS):
+    working_arrays = get_working_arrays(memory_mdp_container, severity, forbidden_state_action_pairs, precision)
+    allowed_transition_probability_matrix = working_arrays['allowed_transition_probability_matrix']
+    allowed_reward_matrix = working_arrays['allowed_reward_matrix']
+    allowed_state_starts = working_arrays['allowed_state_starts']
+
+    state_values = get_initial_state_values(memory_mdp_container, initial_state_values, precision)
+    new_state_values = np.zeros(memory_mdp_container.n_states, dtype=precision)
+    state_value_differences = np.zeros(memory_mdp_container.n_states, dtype=precision)
+    allowed_action_values = np.zeros(len(working_arrays['allowed_rows']), dtype=precision)
+
+    iterations = 0
+    while True:
+        np.multiply(allowed_transition_probability_matrix.dot(state_values), gamma, out=allowed_action_values)
+        np.add(allowed_reward_matrix, allowed_action_values, out=allowed_action_values)
+
+        np.maximum.reduceat(allowed_action_values, allowed_state_starts, out=new_state_values)
+
+        np.subtract(new_state_values, state_values, out=state_value_differences)
+        np.abs(state_value_differences, out=state_value_differences)
+
+        iterations += 1
+
+        # Tighten the stopping criterion because partial evaluations of early greedy policies can overshoot the optimal state values
+        if np.max(state_value_differences) < epsilon * (1 - gamma):
+            state_values, new_state_values = new_state_values, state_values
+            break
+
+        # Evaluate the greedy policy partially with a fixed number of backups that skip the maximization over actions
+        policy = get_greedy_policy(working_arrays, allowed_action_values, new_state_values)
+        policy_transition_probability_matrix = allowed_transition_probability_matrix[policy]
+        policy_reward_matrix = allowed_reward_matrix[policy]
+
+        for _ in range(evaluation_steps):
+            np.multiply(policy_transition_probability_matrix.dot(new_state_values), gamma, out=new_state_values)
+            np.add(policy_reward_matrix, new_state_values, out=new_state_values)
+
+        state_values, new_state_values = new_state_values, state_values
+
+    # Report the action values of the last sweep, which were computed with the state values before it
+    solution = get_solution(memory_mdp_container, working_arrays, new_state_values, allowed_action_values, gamma, iterations)
+    solution['state_values'] = -1.0 * state_values.astype(np.float64)
+    return solution
+
+
+def topological_value_iteration(memory_mdp_container, gamma, epsilon, severity=False, forbidden_state_action_pairs=False, precision=PRECISION, initial_state_values=None):
+    working_arrays = get_working_arrays(memory_mdp_container, severity, forbidden_state_action_pairs, precision)
+    state_values = get_initial_state_values(memory_mdp_container, initial_state_values, precision)
+
+    solution = topological_solver.topological_value_iteration(working_arrays['allowed_reward_matrix'], working_arrays['allowed_transition_probability_matrix'], working_arrays['allowed_row_states'], state_values, gamma, epsilon)
+
+    return get_solution(memory_mdp_container, working_arrays, solution['state_values'], solution['action_values'], gamma, solution['iterations'])
+
+
+METHODS = {
+    'value_iteration': value_iteration,
+    'policy_iteration': policy_iteration,
+    'modified_policy_iteration': modified_policy_iteration,
+    'topological_value_iteration': topological_value_iteration
+}
+
+
+def batched_value_iteration(memory_mdp_container, gamma, epsilon, precision=PRECISION):
+    states = memory_mdp_container.states
+    actions = memory_mdp_container.actions
+    severities = list(reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)))
+
+    # Stack the reward indicator matrices of every severity level into one (state-action pairs, severity levels) matrix
+    severity_matrix = np.array(memory_mdp_container.rewards).reshape(-1, 1)
+    reward_matrix = -1.0 * (severity_matrix == np.array(severities).reshape(1, -1)).astype(precision)
+    transition_probability_matrix = memory_mdp_container.transition_probabilities.astype(precision)
+
+    # Preallocate the buffers of the sweeps that iterate the pending severity levels at once
+    state_values = np.zeros((len(states), len(severities)), dtype=precision)
+    new_state_values = np.zeros((len(states), len(severities)), dtype=precision)
+    state_value_differences = np.zeros((len(states), len(severities)), dtype=precision)
+    discounted_values = np.zeros((len(states) * len(actions), len(severities)), dtype=precision)
+    action_values = np.zeros((len(states) * len(actions), len(severities)), dtype=precision)
+    masked_action_values = np.zeros((len(states), len(actions)), dtype=precision)
+    rounded_action_values = np.zeros((len(states), len(actions)), dtype=precision)
+    is_allowed = np.ones((len(states), len(actions)), dtype=bool)
+    is_forbidden = np.zeros((len(states), len(severities), len(actions)), dtype=bool)
+
+    # Start the minimum severity level at the discounted horizon since every step has exactly one severity
+    state_values[:, -1] = -1.0 / (1.0 - gamma)
+
+    # Solve the severity levels in phases from the highest level down, where each phase sweeps its level along with every lower level to warm start them
+    # but only ends once its own level converges so that the lexicographic mask of each level comes from the converged action values of the higher levels
+    iterations = 0
+    for severity_index in range(len(severities)):
+        pending_severities = slice(severity_index, None)
+        np.logical_not(is_allowed, out=is_forbidden[:, severity_index])
+
+        # Restart the minimum severity level at the discounted horizon minus the converged higher levels like the sequential solve
+        if severity_index == len(severities) - 1:
+            state_values[:, -1] = -1.0 / (1.0 - gamma) - state_values[:, :-1].sum(axis=1)
+
+        while True:
+            np.multiply(transition_probability_matrix.dot(state_values[:, pending_severities]), gamma, out=discounted_values[:, pending_severities])
+            np.add(reward_matrix[:, pending_severities], discounted_values[:, pending_severities], out=action_values[:, pending_severities])
+
+            for pending_severity_index in range(severity_index, len(severities)):
+                np.copyto(masked_action_values, action_values[:, pending_severity_index].reshape(len(states), len(actions)))
+                np.putmask(masked_action_values, is_forbidden[:, severity_index], -np.inf)
+                np.amax(masked_action_values, axis=1, out=new_state_values[:, pending_severity_index])
+
+            np.subtract(new_state_values[:, pending_severities], state_values[:, pending_severities], out=state_value_differences[:, pending_severities])
+            np.abs(state_value_differences[:, pending_severities], out=state_value_differences[:, pending_severities])
+
+            state_values[:, pending_severities] = new_state_values[:, pending_severities]
+            iterations += 1
+
+            # Tighten the stopping criterion since the mask of every lower level is rounded from the action values of this level
+            if np.max(state_value_differences[:, severity_index]) < epsilon * (1 - gamma):
+                break
+
+        # Restrict every lower level to the actions that attain the rounded best action value of this level
+        np.copyto(masked_action_values, action_values[:, severity_index].reshape(len(states), len(actions)))
+        np.putmask(masked_action_values, is_forbidden[:, severity_index], -np.inf)
+        np.round(masked_action_values, ROUNDER, out=rounded_action_values)
+        np.logical_and(is_allowed, rounded_action_values >= np.amax(rounded_action_values, axis=1, keepdims=True), out=is_allowed)
+
+    # Report the forbidden state-action pairs of each severity level with the penalty of the sequential solve
+    action_values = action_values.reshape(len(states), len(actions), len(severities))
+    discounted_values = discounted_values.reshape(len(states), len(actions), len(severities))
+    for severity_index in range(len(severities)):
+        forbidden_action_values = discounted_values[:, :, severity_index] - 10000
+        np.copyto(action_values[:, :, severity_index], forbidden_action_values, where=is_forbidden[:, severity_index])
+
+    # Lay out the values as (states, severity levels) and (states, actions, severity levels) arrays
     return {
-        'state_values': {state: float(state_values[state_index]) for state_index, state in enumerate(states)},
-        'action_values': {state: {action: float(action_values[state_index][action_index]) for action_index, action in enumerate(actions)} for state_index, state in enumerate(states)},
-        'policy': {state: actions[np.argmin(action_values[state_index])] for state_index, state in enumerate(states)}
+        'state_values': -1.0 * state_values.astype(np.float64),
+        'action_values': -1.0 * action_values.astype(np.float64),
+        'iterations': iterations
     }
 
 
-def get_empty_severity_state_values(safety_process):
-    return {state: {severity: 0 for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1))} for state in safety_process.states()}
+def get_rounded_values(values):
+    # Round every value like the builtin round rather than np.round, which scales by a power of ten first and can land on the other side of a tie
+    return np.array([round(value, ROUNDER) for value in values.ravel().tolist()]).reshape(values.shape)
+
 
+def get_values(values, key_lists):
+    # Name the axes of a values array with the states, parameters, and severity levels of the safety process only when the solution is returned
+    if not key_lists:
+        return values
 
-def get_empty_severity_parameter_values(safety_process):
-    return {state: {parameter: {severity: 0 for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1))} for parameter in safety_process.parameters()} for state in safety_process.states()}
+    return {key: get_values(child_values, key_lists[1:]) for key, child_values in zip(key_lists[0], values.tolist() if len(key_lists) == 1 else values)}
 
 
-def get_rounded_interference_state_values(safety_process, state_values):
-    return {state: round(state_values[state], ROUNDER) for state in safety_process.states()}
+def get_statistics(objective, method, solution, start_time):
+    duration = time.time() - start_time
+    logging.debug("Solved the objective: [objective=%s, method=%s, iterations=%d, duration=%.3f]", objective, method, solution['iterations'], duration)
+    return {'objective': objective, 'method': method, 'iterations': solution['iterations'], 'duration': duration}
 
 
-def get_rounded_interference_parameter_values(safety_process, action_values):
-    return {state: {parameter: round(action_values[state][parameter], ROUNDER) for parameter in safety_process.parameters()} for state in safety_process.states()}
+def get_forbidden_state_action_pairs(severity_parameter_values, severity_index):
+    # Forbid every (state, parameter) pair whose rounded value at the severity level is above the minimum value of its state
+    values = severity_parameter_values[:, :, severity_index]
+    return {(int(state_index), int(parameter_index)) for state_index, parameter_index in np.argwhere(values > values.min(axis=1, keepdims=True))}
 
 
-def solve(safety_process, gamma, epsilon):
-    logging.debug("Solving the safety process: [safety_process=%s]", safety_process.kind)
+def solve(safety_process, gamma, epsilon, precision=PRECISION, is_batched=False, method='value_iteration', memory_mdp_containers=None, statistics=None):
+    logging.debug("Solving the safety process: [safety_process=%s, method=%s]", safety_process.kind, method)
 
-    severity_state_values = get_empty_severity_state_values(safety_process)
-    severity_parameter_values = get_empty_severity_parameter_values(safety_process)
+    assert method in METHODS
+    assert not is_batched or method == 'value_iteration'
 
-    severity_memory_mdp_container = MemoryMdpContainer(FunctionalMdpContainer(safety_process, 'severity'))
+    # Collect the statistics of every objective in the list that is passed in rather than in the solution so that identical solves give identical solutions
+    if statistics is None:
+        statistics = []
+
+    # Compile the models of the safety process below unless they were passed in
+    if memory_mdp_containers is None:
+        memory_mdp_containers = {}
+
+    states = list(safety_process.states())
+    parameters = safety_process.parameters()
+    severities = list(reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)))
+
+    # Reuse the compiled models of the safety process if they were passed in and compile them otherwise
+    severity_memory_mdp_container = memory_mdp_containers['severity'] if 'severity' in memory_mdp_containers else MemoryMdpContainer(FunctionalMdpContainer(safety_process, 'severity'))
     size = severity_memory_mdp_container.n_states * severity_memory_mdp_container.n_actions
 
-    forbidden_state_action_pairs = set()
-    for severity in reversed(range(MINIMUM_SEVERITY, MAXIMUM_SEVERITY + 1)):
-        logging.debug("Performing value iteration: [severity=%d, size=%d]", severity, size - len(forbidden_state_action_pairs))
+    # Hold the rounded values of every severity level as (states, severity levels) and (states, parameters, severity levels) arrays in the order of the states and the parameters of the safety process
+    assert severity_memory_mdp_container.n_states == len(states) and list(severity_memory_mdp_container.actions) == list(parameters)
+    severity_state_values = np.zeros((len(states), len(severities)))
+    severity_parameter_values = np.zeros((len(states), len(parameters), len(severities)))
+
+    if is_batched:
+        logging.debug("Performing batched value iteration: [severities=%d, size=%d]", len(severities), size)
+
+        start_time = time.time()
+        solution = batched_value_iteration(severity_memory_mdp_container, gamma, epsilon, precision)
+        statistics.append(get_statistics('severity', 'batched_value_iteration', solution, start_time))
+
+        severity_state_values = get_rounded_values(solution['state_values'])
+        severity_parameter_values = get_rounded_values(solution['action_values'])
+
+        forbidden_state_action_pairs = set()
+        for severity_index in range(len(severities)):
+            forbidden_state_action_pairs |= get_forbidden_state_action_pairs(severity_parameter_values, severity_index)
+    else:
+        solution = None
+        forbidden_state_action_pairs = set()
+        for severity_index, severity in enumerate(severities):
+            logging.debug("Performing %s: [severity=%d, size=%d]", method, severity, size - len(forbidden_state_action_pairs))
+
+            # Warm start each severity level with the state values of the previous severity level except for the minimum severity level:
+            # since every step has exactly one severity, its state values are close to the discounted horizon minus the state values of all higher severity levels
+            initial_state_values = solution['state_values'] if solution else None
+            if severity == MINIMUM_SEVERITY:
+                higher_severity_state_values = np.zeros(len(states))
+                for higher_severity_index in reversed(range(severity_index)):
+                    higher_severity_state_values += severity_state_values[:, higher_severity_index]
+                initial_state_values = 1.0 / (1.0 - gamma) - higher_severity_state_values
 
-        solution = value_iteration(severity_memory_mdp_container, gamma, epsilon, severity, forbidden_state_action_pairs)
+            start_time = time.time()
+            solution = METHODS[method](severity_memory_mdp_container, gamma, epsilon, severity, forbidden_state_action_pairs, precision, initial_state_values)
+            statistics.append(get_statistics(f'severity-{severity}', method, solution, start_time))
 
-        for state in safety_process.states():
-            severity_state_values[state][severity] = round(solution['state_values'][state], ROUNDER)
-            for parameter in safety_process.parameters():
-                severity_parameter_values[state][parameter][severity] = round(solution['action_values'][state][parameter], ROUNDER)
+            severity_state_values[:, severity_index] = get_rounded_values(solution['state_values'])
+            severity_parameter_values[:, :, severity_index] = get_rounded_values(solution['action_values'])
 
-        for state_index, state in enumerate(severity_parameter_values):
-            minimum_severity_value = min([severity_parameter_values[state][parameter][severity] for parameter in severity_parameter_values[state]])
-            for parameter_index, parameter in enumerate(severity_parameter_values[state]):
-                if severity_parameter_values[state][parameter][severity] > minimum_severity_value:
-                    forbidden_state_action_pairs.add((state_index, parameter_index))
+            forbidden_state_action_pairs |= get_forbidden_state_action_pairs(severity_parameter_values, severity_index)
 
-    logging.debug("Performing value iteration: [interference, size=%d]", size - len(forbidden_state_action_pairs))
+    logging.debug("Performing %s: [interference, size=%d]", method, size - len(forbidden_state_action_pairs))
 
-    interference_memory_mdp_container = MemoryMdpContainer(FunctionalMdpContainer(safety_process, 'interference'))
-    solution = value_iteration(interference_memory_mdp_container, gamma, epsilon, False, forbidden_state_action_pairs)
+    interference_memory_mdp_container = memory_mdp_containers['interference'] if 'interference' in memory_mdp_containers else MemoryMdpContainer(FunctionalMdpContainer(safety_process, 'interference'))
 
-    interference_state_values = get_rounded_interference_state_values(safety_process, solution['state_values'])
-    interference_parameter_values = get_rounded_interference_parameter_values(safety_process, solution['action_values'])
+    start_time = time.time()
+    solution = METHODS[method](interference_memory_mdp_container, gamma, epsilon, False, forbidden_state_action_pairs, precision)
+    statistics.append(get_statistics('interference', method, solution, start_time))
 
+    # Name the states, the parameters, and the severity levels only now since the solution is stored and served by name
     return {
-        'severity_state_values': severity_state_values,
-        'severity_parameter_values': severity_parameter_values,
-        'policy': solution['policy'],
-        'interference_state_values': interference_state_values,
-        'interference_parameter_values': interference_parameter_values
+        'severity_state_values': get_values(severity_state_values, [states, severities]),
+        'severity_parameter_values': get_values(severity_parameter_values, [states, parameters, severities]),
+        'policy': get_values(np.array(parameters)[solution['policy']], [states]),
+        'interference_state_values': get_values(get_rounded_values(solution['state_values']), [states]),
+        'interference_parameter_values': get_values(get_rounded_values(solution['action_values']), [states, parameters])
     }
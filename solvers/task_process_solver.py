@@ -1,7 +1,9 @@
 import cplex
 import numpy as np
+from scipy.sparse import csr_matrix, diags
 
 from solvers.memory_mdp_container import MemoryMdpContainer
+from solvers.native_task_process_solver import get_action_values
 
 IS_VERBOSE = False
 IS_RECORDING = False
@@ -21,7 +23,7 @@ def validate(memory_mdp_container, constant_state_values):
     assert memory_mdp_container.start_state_probabilities is not None
 
     assert memory_mdp_container.rewards.shape == (memory_mdp_container.n_states, memory_mdp_container.n_actions)
-    assert memory_mdp_container.transition_probabilities.shape == (memory_mdp_container.n_states, memory_mdp_container.n_actions, memory_mdp_container.n_states)
+    assert memory_mdp_container.transition_probabilities.shape == (memory_mdp_container.n_states * memory_mdp_container.n_actions, memory_mdp_container.n_states)
     assert memory_mdp_container.start_state_probabilities.shape == (memory_mdp_container.n_states,)
 
     assert all(state in memory_mdp_container.states for state in constant_state_values)
@@ -61,97 +63,102 @@ def set_objective(problem, memory_mdp_container, constant_state_values):
     problem.objective.set_sense(problem.objective.sense.minimize)
 
 
-def set_constraints(problem, memory_mdp_container, gamma, constant_state_values):
-    linear_expressions = []
-    right_hand_sides = []
-    names = []
+def get_constraint_matrix(memory_mdp_container, gamma, constant_state_values):
+    n_states = memory_mdp_container.n_states
+    n_actions = memory_mdp_container.n_actions
 
-    n_variable_states = memory_mdp_container.n_states - len(constant_state_values)
-    variables = range(n_variable_states)
+    is_constant = np.array([state in constant_state_values for state in memory_mdp_container.states])
+    constant_values = np.array([constant_state_values.get(state, 0) for state in memory_mdp_container.states], dtype=float)
+    variable_state_indices = np.flatnonzero(~is_constant)
 
-    # Create a linear constraint for each state-action pair
-    for i in range(memory_mdp_container.n_states):
-        for j in range(memory_mdp_container.n_actions):
-            # Define a linear constraint for the state-action pair
-            right_hand_side = memory_mdp_container.rewards[i, j]
+    # Give every variable state the index of its variable and every constant state no variable
+    variables = np.full(n_states, -1)
+    variables[variable_state_indices] = np.arange(len(variable_state_indices))
 
-            state = memory_mdp_container.states[i]
+    row_states = np.repeat(np.arange(n_states), n_actions)
+    transition_probabilities = memory_mdp_container.transition_probabilities.tocsr()
 
-            # Discount its value from the right hand side of the constraint if the start state is a constant
-            if state in constant_state_values:
-                right_hand_side -= constant_state_values[state]
-
-            # Loop across all of the existing states as successor states by either:
-            # (a) setting the coefficients of the variable to correspond to variables states
-            # (b) modifying the right hand side for constant states
-            coefficients = []
-            for k in range(memory_mdp_container.n_states):
-                successor_state = memory_mdp_container.states[k]
-
-                # Use the value and the transition probability of the successor state to modify the right hand side of the constraint
-                if successor_state in constant_state_values:
-                    right_hand_side += gamma * memory_mdp_container.transition_probabilities[i, j, k] * constant_state_values[successor_state]
-                # Set the coefficient of the successor state's variable
-                else:
-                    # Check if the successor state is not the start state
-                    if k != i:
-                        coefficient = - gamma * memory_mdp_container.transition_probabilities[i, j, k]
-                    # Check if the successor state is the start state
-                    else:
-                        coefficient = 1 - gamma * memory_mdp_container.transition_probabilities[i, j, k]
-                    coefficients.append(coefficient)
-
-            # TODO: Determine why this problem happens
-            if sum(coefficients) <= 0 < right_hand_side:
-                continue
-
-            # Skip useless constraints without any variables
-            if all(coefficient == 0 for coefficient in coefficients):
-                continue
-
-            # TODO: Avoid using 0 coefficients altogether if necessary for space complexity
-            # TODO: Do we need to cast the right hand side as a float - seems not needed
-            linear_expressions.append([variables, coefficients])
-            right_hand_sides.append(float(right_hand_side))
-            names.append(f'{state}_{memory_mdp_container.actions[j]}')
-
-    senses = ['G'] * len(linear_expressions)
-
-    # Add all linear constraints to CPLEX at once
-    problem.linear_constraints.add(names=names, lin_expr=linear_expressions, rhs=right_hand_sides, senses=senses)
-
-
-# TODO: Clean this up - there might be a better way to do it
-def get_policy(values, memory_mdp_container, gamma, constant_state_values):
-    policy = []
+    # Discount the value of a constant start state from the right hand side and add the discounted values of the constant successor states to it
+    right_hand_sides = memory_mdp_container.rewards.reshape(-1) - constant_values[row_states] + gamma * transition_probabilities.dot(constant_values)
 
-    n_variable_states = memory_mdp_container.n_states - len(constant_state_values)
-    variables = range(n_variable_states)
+    # Set a coefficient of one for the variable of the start state and subtract the discounted transition probability of the variable of every successor state
+    is_variable_row = ~is_constant[row_states]
+    start_state_coefficients = csr_matrix((np.ones(np.count_nonzero(is_variable_row)), (np.flatnonzero(is_variable_row), variables[row_states[is_variable_row]])), shape=(n_states * n_actions, len(variable_state_indices)))
+    coefficients = (start_state_coefficients - gamma * transition_probabilities[:, variable_state_indices]).tocsr()
+    coefficients.eliminate_zeros()
 
-    variable_state_indices = []
-    for i in range(memory_mdp_container.n_states):
-        if memory_mdp_container.states[i] not in constant_state_values:
-            variable_state_indices.append(i)
+    # TODO: Determine why this problem happens
+    is_kept = ~((np.asarray(coefficients.sum(axis=1)).ravel() <= 0) & (0 < right_hand_sides))
+
+    # Skip useless constraints without any variables
+    is_kept &= np.diff(coefficients.indptr) > 0
+
+    return coefficients, right_hand_sides, is_kept
+
+
+def get_aligned_constraint_matrix(memory_mdp_container, gamma, constant_state_values):
+    coefficients, right_hand_sides, is_kept = get_constraint_matrix(memory_mdp_container, gamma, constant_state_values)
+
+    # Keep a constraint for every state-action pair so that the constraints of related problems line up and neutralize the skipped ones instead
+    coefficients = diags(is_kept.astype(float)).dot(coefficients).tocsr()
+    coefficients.eliminate_zeros()
+    right_hand_sides = np.where(is_kept, right_hand_sides, -cplex.infinity)
+
+    return coefficients, right_hand_sides, np.arange(len(right_hand_sides))
+
+
+def set_constraints(problem, memory_mdp_container, gamma, constant_state_values, is_aligned=False):
+    if is_aligned:
+        coefficients, right_hand_sides, rows = get_aligned_constraint_matrix(memory_mdp_container, gamma, constant_state_values)
+    else:
+        coefficients, right_hand_sides, is_kept = get_constraint_matrix(memory_mdp_container, gamma, constant_state_values)
+        coefficients, right_hand_sides, rows = coefficients[is_kept], right_hand_sides[is_kept], np.flatnonzero(is_kept)
+
+    n_actions = memory_mdp_container.n_actions
+    names = [f'{memory_mdp_container.states[row // n_actions]}_{memory_mdp_container.actions[row % n_actions]}' for row in rows]
+
+    # Add all linear constraints to CPLEX at once and then fill in their nonzero coefficients as one list of triplets since CPLEX takes no other iterable
+    first_constraint = problem.linear_constraints.get_num()
+    problem.linear_constraints.add(names=names, rhs=right_hand_sides.tolist(), senses='G' * len(names))
+
+    coefficients = coefficients.tocoo()
+    problem.linear_constraints.set_coefficients(list(zip((coefficients.row + first_constraint).tolist(), coefficients.col.tolist(), coefficients.data.tolist())))
 
-    assert len(variables) == len(values) == len(variable_state_indices)
+    return coefficients.tocsr(), right_hand_sides
 
-    for i in variables:
-        best_action = None
-        best_action_value = None
 
-        for j in range(memory_mdp_container.n_actions):
-            action_value = memory_mdp_container.rewards[i, j] + gamma * np.sum(memory_mdp_container.transition_probabilities[i, j][variable_state_indices] * values)
+def update_constraints(problem, memory_mdp_container, gamma, constant_state_values, coefficients, right_hand_sides):
+    new_coefficients, new_right_hand_sides, _ = get_aligned_constraint_matrix(memory_mdp_container, gamma, constant_state_values)
 
-            if best_action_value is None or action_value > best_action_value:
-                best_action = j
-                best_action_value = action_value
+    # Change only the coefficients and right hand sides that differ from the last problem so that CPLEX can keep its basis
+    changes = (new_coefficients - coefficients).tocoo()
+    changes.eliminate_zeros()
+    if changes.nnz > 0:
+        changed_coefficients = np.asarray(new_coefficients[changes.row, changes.col]).ravel()
+        problem.linear_constraints.set_coefficients(list(zip(changes.row.tolist(), changes.col.tolist(), changed_coefficients.tolist())))
 
-        policy.append(best_action)
+    changed_rows = np.flatnonzero(new_right_hand_sides != right_hand_sides)
+    if len(changed_rows) > 0:
+        problem.linear_constraints.set_rhs(zip(changed_rows.tolist(), new_right_hand_sides[changed_rows].tolist()))
 
-    return policy
+    return new_coefficients, new_right_hand_sides
 
 
-def create_problem(memory_mdp_container, gamma, constant_state_values):
+def get_policy(values, memory_mdp_container, gamma, constant_state_values):
+    is_constant = np.array([state in constant_state_values for state in memory_mdp_container.states])
+    variable_state_indices = np.flatnonzero(~is_constant)
+
+    assert len(values) == len(variable_state_indices)
+
+    # Place the value of every variable at the index of its state next to the values of the constant states
+    state_values = np.array([constant_state_values.get(state, 0) for state in memory_mdp_container.states], dtype=float)
+    state_values[variable_state_indices] = values
+
+    action_values = get_action_values(memory_mdp_container, gamma, state_values)
+    return np.argmax(action_values[variable_state_indices], axis=1).tolist()
+
+
+def create_problem(memory_mdp_container, gamma, constant_state_values, warm_start=None):
     problem = cplex.Cplex()
 
     if not IS_VERBOSE:
@@ -160,7 +167,19 @@ def create_problem(memory_mdp_container, gamma, constant_state_values):
 
     set_variables(problem, memory_mdp_container, constant_state_values)
     set_objective(problem, memory_mdp_container, constant_state_values)
-    set_constraints(problem, memory_mdp_container, gamma, constant_state_values)
+    coefficients, right_hand_sides = set_constraints(problem, memory_mdp_container, gamma, constant_state_values, is_aligned=warm_start is not None)
+
+    # Remember the problem and its constraints so that the next related solve can update them in place
+    if warm_start is not None:
+        warm_start.update({
+            'problem': problem,
+            'gamma': gamma,
+            'states': list(memory_mdp_container.states),
+            'actions': list(memory_mdp_container.actions),
+            'constant_states': set(constant_state_values),
+            'coefficients': coefficients,
+            'right_hand_sides': right_hand_sides
+        })
 
     if IS_VERBOSE:
         print("Variable Count:", problem.variables.get_num())
@@ -174,6 +193,23 @@ def create_problem(memory_mdp_container, gamma, constant_state_values):
     return problem
 
 
+def is_updatable(warm_start, memory_mdp_container, gamma, constant_state_values):
+    if warm_start is None or 'problem' not in warm_start:
+        return False
+
+    # Update the last problem only if it has the same variables and constraints
+    return warm_start['gamma'] == gamma and warm_start['states'] == list(memory_mdp_container.states) and warm_start['actions'] == list(memory_mdp_container.actions) and warm_start['constant_states'] == set(constant_state_values)
+
+
+def update_problem(warm_start, memory_mdp_container, gamma, constant_state_values):
+    problem = warm_start['problem']
+
+    set_objective(problem, memory_mdp_container, constant_state_values)
+    warm_start['coefficients'], warm_start['right_hand_sides'] = update_constraints(problem, memory_mdp_container, gamma, constant_state_values, warm_start['coefficients'], warm_start['right_hand_sides'])
+
+    return problem
+
+
 def solve_optimally(problem):
     problem.solve()
 
@@ -214,12 +250,26 @@ def solve_feasibly(problem):
     return None
 
 
-def solve(task_process, gamma, constant_state_values={}, relax_infeasible=False):
-    memory_mdp_container = MemoryMdpContainer(task_process)
+def solve(task_process, gamma, constant_state_values=None, relax_infeasible=False, is_pruned=True, memory_mdp_container=None, warm_start=None):
+    if constant_state_values is None:
+        constant_state_values = {}
+
+    # Reuse the compiled model of the task process if it was passed in and compile it otherwise
+    if memory_mdp_container is None:
+        memory_mdp_container = MemoryMdpContainer(task_process, is_pruned=is_pruned)
+
+    # Drop the constant states that the pruned container no longer holds since no start state can reach them
+    if memory_mdp_container.is_pruned:
+        assert all(state in task_process.states() for state in constant_state_values)
+        constant_state_values = {state: value for state, value in constant_state_values.items() if state in memory_mdp_container.state_indices}
 
     validate(memory_mdp_container, constant_state_values)
 
-    problem = create_problem(memory_mdp_container, gamma, constant_state_values)
+    # Solve a related problem from the basis of the last one by changing it in place and build a new problem otherwise
+    if is_updatable(warm_start, memory_mdp_container, gamma, constant_state_values):
+        problem = update_problem(warm_start, memory_mdp_container, gamma, constant_state_values)
+    else:
+        problem = create_problem(memory_mdp_container, gamma, constant_state_values, warm_start)
 
     if IS_RECORDING and hasattr(task_process, 'name'):
         print(f"Saving the problem to the file {task_process.name}.lp...")
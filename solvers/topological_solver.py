@@ -0,0 +1,102 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def get_state_graph(transition_probability_matrix, row_states, n_states):
+    successor_counts = np.diff(transition_probability_matrix.indptr)
+    rows = np.repeat(row_states, successor_counts)
+    columns = transition_probability_matrix.indices
+    return csr_matrix((np.ones(len(rows), dtype=bool), (rows, columns)), shape=(n_states, n_states))
+
+
+def get_component_order(state_graph, labels, n_components):
+    # Build the condensation of the state graph that has an edge between two components if a state of one can reach a state of the other
+    state_graph = state_graph.tocoo()
+    is_external = labels[state_graph.row] != labels[state_graph.col]
+    component_graph = csr_matrix((np.ones(np.count_nonzero(is_external), dtype=bool), (labels[state_graph.row[is_external]], labels[state_graph.col[is_external]])), shape=(n_components, n_components))
+    predecessor_graph = component_graph.T.tocsr()
+
+    # Order the components in reverse topological order so that each component comes after every component that it can reach
+    successor_counts = np.diff(component_graph.indptr)
+    component_order = list(np.flatnonzero(successor_counts == 0))
+
+    index = 0
+    while index < len(component_order):
+        component = component_order[index]
+        for predecessor in predecessor_graph.indices[predecessor_graph.indptr[component]:predecessor_graph.indptr[component + 1]]:
+            successor_counts[predecessor] -= 1
+            if successor_counts[predecessor] == 0:
+                component_order.append(predecessor)
+        index += 1
+
+    assert len(component_order) == n_components
+
+    return component_order
+
+
+def topological_value_iteration(reward_matrix, transition_probability_matrix, row_states, state_values, gamma, epsilon):
+    n_states = len(state_values)
+
+    state_graph = get_state_graph(transition_probability_matrix, row_states, n_states)
+    n_components, labels = connected_components(state_graph, directed=True, connection='strong')
+    component_order = get_component_order(state_graph, labels, n_components)
+
+    # Group the states and the rows of each component together
+    sorted_states = np.argsort(labels, kind='stable')
+    component_starts = np.searchsorted(labels[sorted_states], np.arange(n_components + 1))
+    state_row_starts = np.searchsorted(row_states, np.arange(n_states + 1))
+
+    state_values = state_values.copy()
+    action_values = np.zeros(len(row_states), dtype=state_values.dtype)
+
+    iterations = 0
+    for component in component_order:
+        component_states = sorted_states[component_starts[component]:component_starts[component + 1]]
+        component_rows = np.concatenate([np.arange(state_row_starts[state], state_row_starts[state + 1]) for state in component_states])
+        component_row_starts = np.searchsorted(row_states[component_rows], component_states)
+
+        component_transition_probability_matrix = transition_probability_matrix[component_rows]
+        is_internal = labels[component_transition_probability_matrix.indices] == component
+
+        # Fold the state values of every successor state outside of the component into a constant term since they have already been solved
+        external_transition_probability_matrix = component_transition_probability_matrix.copy()
+        external_transition_probability_matrix.data[is_internal] = 0
+        constant_action_values = reward_matrix[component_rows] + np.multiply(external_transition_probability_matrix.dot(state_values), gamma)
+
+        internal_transition_probability_matrix = component_transition_probability_matrix.copy()
+        internal_transition_probability_matrix.data[~is_internal] = 0
+
+        # Solve a component with a single state in one backup because its only cycles are self-loops
+        if len(component_states) == 1:
+            self_loop_probabilities = np.asarray(internal_transition_probability_matrix.sum(axis=1)).ravel()
+            state_value = np.max(constant_action_values / (1 - gamma * self_loop_probabilities))
+            state_values[component_states] = state_value
+            action_values[component_rows] = constant_action_values + np.multiply(self_loop_probabilities, gamma) * state_value
+            iterations += 1
+            continue
+
+        local_indices = np.zeros(n_states, dtype=int)
+        local_indices[component_states] = np.arange(len(component_states))
+        internal_transition_probability_matrix = csr_matrix((internal_transition_probability_matrix.data, local_indices[internal_transition_probability_matrix.indices], internal_transition_probability_matrix.indptr), shape=(len(component_rows), len(component_states)))
+
+        component_state_values = state_values[component_states]
+        while True:
+            component_action_values = constant_action_values + np.multiply(internal_transition_probability_matrix.dot(component_state_values), gamma)
+            new_component_state_values = np.maximum.reduceat(component_action_values, component_row_starts)
+            iterations += 1
+
+            if np.max(np.abs(new_component_state_values - component_state_values)) < epsilon:
+                component_state_values = new_component_state_values
+                break
+
+            component_state_values = new_component_state_values
+
+        state_values[component_states] = component_state_values
+        action_values[component_rows] = component_action_values
+
+    return {
+        'state_values': state_values,
+        'action_values': action_values,
+        'iterations': iterations
+    }
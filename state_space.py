@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+import numpy as np
+
+STATE_CONNECTOR = ':'
+
+
+class StateSpace:
+    def __init__(self, factors, special_states=()):
+        # Describe each factor with its name, its values, and optionally the labels of its values within a state name
+        self.factor_names = [factor[0] for factor in factors]
+        self.factor_values = [list(factor[1]) for factor in factors]
+        self.factor_labels = [list(factor[2]) if len(factor) > 2 else [str(factor_value) for factor_value in factor[1]] for factor in factors]
+
+        # Describe every factored state with a tuple of its factor values whose fields are named after the factors so that a record takes no more than a tuple
+        self.record_type = namedtuple('StateRecord', self.factor_names)
+
+        # Encode every factored state as a mixed-radix integer whose last factor varies the fastest so that the integers follow the order of the state names
+        self.radices = [len(factor_values) for factor_values in self.factor_values]
+        self.strides = [int(np.prod(self.radices[position + 1:], dtype=int)) for position in range(len(self.radices))]
+        self.n_factored_states = int(np.prod(self.radices, dtype=int))
+
+        # Place every state outside of the factored state space, like an absorbing goal state, after the factored states
+        self.special_states = list(special_states)
+        self.special_state_indices = {state: self.n_factored_states + index for index, state in enumerate(self.special_states)}
+
+        self.value_indices = [{factor_value: index for index, factor_value in enumerate(factor_values)} for factor_values in self.factor_values]
+        self.label_indices = [{label: index for index, label in enumerate(labels)} for labels in self.factor_labels]
+        self.label_sizes = [labels[0].count(STATE_CONNECTOR) + 1 if labels[0] else 0 for labels in self.factor_labels]
+
+    def __len__(self):
+        return self.n_factored_states + len(self.special_states)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+
+        if index >= self.n_factored_states:
+            return self.special_states[index - self.n_factored_states]
+
+        labels = [self.factor_labels[position][index // self.strides[position] % self.radices[position]] for position in range(len(self.radices))]
+        return STATE_CONNECTOR.join(label for label in labels if label)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __contains__(self, state):
+        return self.get_index_from_state(state) is not None
+
+    def index(self, state):
+        index = self.get_index_from_state(state)
+
+        if index is None:
+            raise ValueError(f'{state} is not in the state space')
+
+        return index
+
+    def get_state_index(self, state):
+        # Take a state as its index, which every hot path passes around, and parse it only if it comes as a name from the edges like a policy or a start state
+        return self.index(state) if isinstance(state, str) else state
+
+    def get_index_from_state(self, state):
+        if state in self.special_state_indices:
+            return self.special_state_indices[state]
+
+        if not isinstance(state, str):
+            return None
+
+        tokens = state.split(STATE_CONNECTOR)
+        if len(tokens) != sum(self.label_sizes):
+            return None
+
+        index = 0
+        token_position = 0
+        for position, label_size in enumerate(self.label_sizes):
+            label = STATE_CONNECTOR.join(tokens[token_position:token_position + label_size])
+            if label not in self.label_indices[position]:
+                return None
+            index += self.strides[position] * self.label_indices[position][label]
+            token_position += label_size
+
+        return index
+
+    def get_index(self, factor_values):
+        return sum(self.strides[position] * self.value_indices[position][factor_value] for position, factor_value in enumerate(factor_values))
+
+    def get_factor_values(self, index):
+        if index >= self.n_factored_states:
+            return None
+
+        return tuple(self.factor_values[position][index // self.strides[position] % self.radices[position]] for position in range(len(self.radices)))
+
+    def get_state(self, factor_values):
+        return self[self.get_index(factor_values)]
+
+    def get_record(self, state):
+        # Decode the record of a state from its mixed-radix index on demand
+        factor_values = self.get_factor_values(self.get_state_index(state))
+        return self.record_type._make(factor_values) if factor_values is not None else None
+
+    def get_state_from_record(self, state_record):
+        return self.get_state(state_record)
+
+    def get_factor_indices(self):
+        # Lay out the value index of every factor of every factored state as one array per factor for vectorized compilers
+        return np.indices(self.radices).reshape(len(self.radices), self.n_factored_states)
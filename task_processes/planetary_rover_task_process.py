@@ -1,6 +1,8 @@
 import itertools
 
-STATE_CONNECTOR = ':'
+import numpy as np
+
+from state_space import STATE_CONNECTOR, StateSpace
 
 TERRAIN_TYPES = {'W': 'IMPASSABLE', 'O': 'NORMAL'}
 WEATHER = ['SUNNY', 'SHADY']
@@ -20,20 +22,20 @@ GOAL_STATE = 'SLEEP_MODE'
 
 MOVEMENT_ACTION_DETAILS = {
     'NORTH': {
-        'is_at_boundary': lambda row, column, grid_world: row == 0 or grid_world[row - 1][column] == 'W',
-        'is_valid_move': lambda row, successor_row, column, successor_column: row == successor_row + 1 and column == successor_column
+        'offset': (-1, 0),
+        'is_at_boundary': lambda row, column, grid_world: row == 0 or grid_world[row - 1][column] == 'W'
     },
     'EAST': {
-        'is_at_boundary': lambda row, column, grid_world: column == len(grid_world[row]) - 1 or grid_world[row][column + 1] == 'W',
-        'is_valid_move': lambda row, successor_row, column, successor_column: row == successor_row and column == successor_column - 1
+        'offset': (0, 1),
+        'is_at_boundary': lambda row, column, grid_world: column == len(grid_world[row]) - 1 or grid_world[row][column + 1] == 'W'
     },
     'SOUTH': {
-        'is_at_boundary': lambda row, column, grid_world: row == len(grid_world) - 1 or grid_world[row + 1][column] == 'W',
-        'is_valid_move': lambda row, successor_row, column, successor_column: row == successor_row - 1 and column == successor_column
+        'offset': (1, 0),
+        'is_at_boundary': lambda row, column, grid_world: row == len(grid_world) - 1 or grid_world[row + 1][column] == 'W'
     },
     'WEST': {
-        'is_at_boundary': lambda row, column, grid_world: column == 0 or grid_world[row][column - 1] == 'W',
-        'is_valid_move': lambda row, successor_row, column, successor_column: row == successor_row and column == successor_column + 1
+        'offset': (0, -1),
+        'is_at_boundary': lambda row, column, grid_world: column == 0 or grid_world[row][column - 1] == 'W'
     }
 }
 STATIONARY_ACTIONS = ['REBOOT', 'TRANSMIT', 'CHARGE', 'ANALYZE']
@@ -50,41 +52,32 @@ class PlanetaryRoverTaskProcess:
 
         self.kind = f'planetary-rover-task-process-{self.width}x{self.height}@{self.points_of_interest_size}'
 
-        rows = range(self.height)
-        cols = range(self.width)
-        analysis_status = [ANALYSIS_CONDITIONS for _ in points_of_interest]
-        state_tuples = itertools.product(rows, cols, BATTERY_LEVELS, WATER_ANALYZER_HEALTH, SOIL_ANALYZER_HEALTH, *analysis_status)
-
-        self.state_registry = {}
-        for state_tuple in state_tuples:
-            state = STATE_CONNECTOR.join(str(state_factor) for state_factor in state_tuple)
-            self.state_registry[state] = {
-                'row': state_tuple[0],
-                'column': state_tuple[1],
-                'terrain_type': TERRAIN_TYPES[grid_world[state_tuple[0]][state_tuple[1]]],
-                'weather': 'SHADY' if (state_tuple[0], state_tuple[1]) in shady_locations else 'SUNNY',
-                'battery_level': state_tuple[2],
-                'water_analyzer_health': state_tuple[3],
-                'soil_analyzer_health': state_tuple[4],
-                'analysis_status': {self.points_of_interests[i]: state_tuple[5 + i] for i in range(self.points_of_interest_size)},
-                'is_point_of_interest': (state_tuple[0], state_tuple[1]) in self.points_of_interests
-            }
-
-        self.state_registry[GOAL_STATE] = {
-            'row': float('inf'),
-            'column': float('inf'),
-            'terrain_type': None,
-            'weather': None,
-            'battery_level': float('inf'),
-            'water_analyzer_health': None,
-            'soil_analyzer_health': None,
-            'analysis_status': None,
-            'is_point_of_interest': False
-        }
+        self.terrain_types = [[TERRAIN_TYPES[grid_world[row][column]] for column in range(self.width)] for row in range(self.height)]
+        self.weather = [['SHADY' if (row, column) in shady_locations else 'SUNNY' for column in range(self.width)] for row in range(self.height)]
+
+        # Encode the analysis status as a bitmask whose ith bit is set if the ith point of interest has been analyzed
+        self.point_of_interest_indices = {point_of_interest: index for index, point_of_interest in enumerate(self.points_of_interests)}
+        self.complete_analysis_status = (1 << self.points_of_interest_size) - 1
+        self.analysis_status_views = [[ANALYSIS_CONDITIONS[(analysis_status >> i) & 1] for i in range(self.points_of_interest_size)] for analysis_status in range(self.complete_analysis_status + 1)]
+
+        # Enumerate the analysis statuses in the order of their names so that the state space keeps its order
+        analysis_statuses = [sum(1 << i for i, analysis_condition in enumerate(analysis_conditions) if analysis_condition == 'ANALYZED') for analysis_conditions in itertools.product(ANALYSIS_CONDITIONS, repeat=self.points_of_interest_size)]
+        analysis_status_labels = [STATE_CONNECTOR.join(self.analysis_status_views[analysis_status]) for analysis_status in analysis_statuses]
+
+        self.state_space = StateSpace([
+            ('row', range(self.height)),
+            ('column', range(self.width)),
+            ('battery_level', BATTERY_LEVELS),
+            ('water_analyzer_health', WATER_ANALYZER_HEALTH),
+            ('soil_analyzer_health', SOIL_ANALYZER_HEALTH),
+            ('analysis_status', analysis_statuses, analysis_status_labels)
+        ], special_states=[GOAL_STATE])
+        self.goal_state_index = self.state_space.index(GOAL_STATE)
 
-        self.state_space = list(self.state_registry)
         self.action_space = list(MOVEMENT_ACTION_DETAILS) + STATIONARY_ACTIONS
 
+        self.start_state_probabilities = None
+
     def states(self):
         return self.state_space
 
@@ -92,156 +85,125 @@ class PlanetaryRoverTaskProcess:
         return self.action_space
 
     def transition_function(self, state, action, successor_state):
-        if state == GOAL_STATE and successor_state == GOAL_STATE:
-            return 1
+        for candidate_successor_state, probability in self.successors(state, action):
+            if candidate_successor_state == successor_state:
+                return probability
 
-        if state != GOAL_STATE and successor_state == GOAL_STATE and action != 'TRANSMIT':
-            return 0
+        return 0
 
-        state_record = self.state_registry[state]
-        row = state_record['row']
-        column = state_record['column']
-        battery_level = state_record['battery_level']
-        water_analyzer_health = state_record['water_analyzer_health']
-        soil_analyzer_health = state_record['soil_analyzer_health']
-        analysis_status = state_record['analysis_status']
-        weather = state_record['weather']
-
-        state_successor_record = self.state_registry[successor_state]
-        successor_row = state_successor_record['row']
-        successor_column = state_successor_record['column']
-        successor_terrain_type = state_successor_record['terrain_type']
-        successor_battery_level = state_successor_record['battery_level']
-        successor_water_analyzer_health = state_successor_record['water_analyzer_health']
-        successor_soil_analyzer_health = state_successor_record['soil_analyzer_health']
-        successor_analysis_status = state_successor_record['analysis_status']
-        successor_is_point_of_interest = state_successor_record['is_point_of_interest']
-
-        # Loop for every action other than the CHARGE action if the rover ran out of battery
-        is_battery_dead = battery_level == 0
-        is_same_state = state_record == state_successor_record
-        if is_battery_dead and is_same_state:
-            return 1
-
-        if successor_state != GOAL_STATE:
-            # Ensure that every action other than the CHARGE action decrements the battery level
-            is_charging = action == 'CHARGE'
-            is_battery_decremented = battery_level == successor_battery_level + 1
-            if not is_charging and not is_battery_decremented:
-                return 0
-
-            # Ensure that every action other than the ANALYZE action does not alter any analysis status
-            is_analyzing = action == 'ANALYZE'
-            is_analysis_status_unchanged = analysis_status == successor_analysis_status
-            if not is_analyzing and not is_analysis_status_unchanged:
-                return 0
-
-        if battery_level > 0:
-            if action in MOVEMENT_ACTION_DETAILS:
-                is_at_boundary = MOVEMENT_ACTION_DETAILS[action]['is_at_boundary'](row, column, self.grid_world)
-                has_not_moved = row == successor_row and column == successor_column
-                if is_at_boundary and has_not_moved:
-                    return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
-
-                if successor_terrain_type == 'IMPASSABLE':
-                    return 0
-
-                is_valid_move = MOVEMENT_ACTION_DETAILS[action]['is_valid_move'](row, successor_row, column, successor_column)
-                if is_valid_move:
-                    return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
-
-            if action == 'REBOOT':
-                has_not_moved = row == successor_row and column == successor_column
-                is_nominal = successor_water_analyzer_health == 'NOMINAL' and successor_soil_analyzer_health == 'NOMINAL'
-                if has_not_moved and is_nominal:
-                    return 1
-
-            if action == 'TRANSMIT':
-                if successor_state == GOAL_STATE:
-                    return 1
-
-            if action == 'CHARGE':
-                has_not_moved = row == successor_row and column == successor_column
-                if has_not_moved:
-                    has_battery_incremented = battery_level == successor_battery_level - 1
-                    is_fully_charged = battery_level == MAXIMUM_BATTERY_LEVEL and successor_battery_level == MAXIMUM_BATTERY_LEVEL
-                    is_sunny = weather == 'SUNNY'
-                    if is_sunny and (has_battery_incremented or is_fully_charged):
-                        return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
-
-                    has_battery_decremented = battery_level == successor_battery_level + 1
-                    if not is_sunny and has_battery_decremented:
-                        return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
-
-            if action == 'ANALYZE':
-                has_not_moved = row == successor_row and column == successor_column
-                if has_not_moved:
-                    is_nominal = water_analyzer_health == 'NOMINAL' and soil_analyzer_health == 'NOMINAL'
-                    if successor_is_point_of_interest and is_nominal:
-                        coordinate = (row, column)
-                        target_analysis_status = analysis_status.copy()
-                        target_analysis_status[coordinate] = 'ANALYZED'
-
-                        is_analysis_status_updated = target_analysis_status == successor_analysis_status
-                        if is_analysis_status_updated:
-                            return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
-
-                    is_analysis_status_unchanged = analysis_status == successor_analysis_status
-                    is_something_broken = water_analyzer_health != 'NOMINAL' or soil_analyzer_health != 'NOMINAL'
-                    if is_analysis_status_unchanged and (not successor_is_point_of_interest or is_something_broken):
-                        return ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
+    def successors(self, state, action):
+        for successor_state_index, probability in self.indexed_successors(self.state_space.get_state_index(state), action):
+            yield self.state_space[successor_state_index], probability
 
-        return 0
+    def indexed_successors(self, state_index, action):
+        if state_index == self.goal_state_index:
+            yield self.goal_state_index, 1
+            return
+
+        row, column, battery_level, water_analyzer_health, soil_analyzer_health, analysis_status = self.state_space.get_factor_values(state_index)
+
+        # Loop for every action if the rover ran out of battery
+        if battery_level == 0:
+            yield state_index, 1
+            return
+
+        if action == 'TRANSMIT':
+            yield self.goal_state_index, 1
+            return
+
+        # Move, drain the battery, and keep the analysis status by default since every action other than the CHARGE and ANALYZE actions does so
+        successor_row = row
+        successor_column = column
+        successor_battery_level = battery_level - 1
+        successor_analysis_status = analysis_status
+
+        if action in MOVEMENT_ACTION_DETAILS:
+            if not MOVEMENT_ACTION_DETAILS[action]['is_at_boundary'](row, column, self.grid_world):
+                successor_row += MOVEMENT_ACTION_DETAILS[action]['offset'][0]
+                successor_column += MOVEMENT_ACTION_DETAILS[action]['offset'][1]
+
+        if action == 'REBOOT':
+            yield self.state_space.get_index((row, column, successor_battery_level, 'NOMINAL', 'NOMINAL', analysis_status)), 1
+            return
+
+        if action == 'CHARGE':
+            successor_battery_level = min(battery_level + 1, MAXIMUM_BATTERY_LEVEL) if self.weather[row][column] == 'SUNNY' else battery_level - 1
+
+        if action == 'ANALYZE':
+            is_nominal = water_analyzer_health == 'NOMINAL' and soil_analyzer_health == 'NOMINAL'
+            if (row, column) in self.point_of_interest_indices and is_nominal:
+                successor_analysis_status = analysis_status | (1 << self.point_of_interest_indices[(row, column)])
+
+        # Degrade each analyzer independently with the successor states listed in the order of the state space
+        for successor_water_analyzer_health, successor_soil_analyzer_health in itertools.product(WATER_ANALYZER_HEALTH, SOIL_ANALYZER_HEALTH):
+            probability = ANALYZER_HEALTH_PROBABILITIES[water_analyzer_health][successor_water_analyzer_health] * ANALYZER_HEALTH_PROBABILITIES[soil_analyzer_health][successor_soil_analyzer_health]
+            if probability > 0:
+                yield self.state_space.get_index((successor_row, successor_column, successor_battery_level, successor_water_analyzer_health, successor_soil_analyzer_health, successor_analysis_status)), probability
 
     def reward_function(self, state, action):
-        state_record = self.state_registry[state]
-        battery_level = state_record['battery_level']
-        analysis_status = state_record['analysis_status']
+        if state == GOAL_STATE:
+            return 0
 
-        complete_analysis_status = {point_of_interest: 'ANALYZED' for point_of_interest in self.points_of_interests}
+        state_record = self.state_space.get_record(state)
+        battery_level = state_record.battery_level
+        analysis_status = state_record.analysis_status
 
         is_transmitting = action == 'TRANSMIT'
         is_alive = battery_level > 1
-        is_analyzed = analysis_status == complete_analysis_status
+        is_analyzed = analysis_status == self.complete_analysis_status
         if is_transmitting and is_alive and is_analyzed:
             return 100
 
         return 0
 
-    def start_state_function(self, state):
+    def start_states(self):
         start_states = []
 
-        for start_state in self.state_registry:
-            state_record = self.state_registry[start_state]
-            terrain_type = state_record['terrain_type']
-            battery_level = state_record['battery_level']
-            water_analyzer_health = state_record['water_analyzer_health']
-            soil_analyzer_health = state_record['soil_analyzer_health']
-            analysis_status = state_record['analysis_status']
+        for start_state_index in range(self.state_space.n_factored_states):
+            row, column, battery_level, water_analyzer_health, soil_analyzer_health, analysis_status = self.state_space.get_factor_values(start_state_index)
 
-            is_passable = terrain_type != 'IMPASSABLE'
+            is_passable = self.terrain_types[row][column] != 'IMPASSABLE'
             is_charged = battery_level == MAXIMUM_BATTERY_LEVEL
             is_nominal = water_analyzer_health == 'NOMINAL' and soil_analyzer_health == 'NOMINAL'
-
-            incomplete_analysis_status = {point_of_interest: 'ANALYZED' for point_of_interest in self.points_of_interests}
-            is_analyzed = analysis_status == incomplete_analysis_status
+            is_analyzed = analysis_status == self.complete_analysis_status
 
             if is_passable and is_charged and is_nominal and not is_analyzed:
-                start_states.append(start_state)
+                start_states.append(self.state_space[start_state_index])
+
+        return start_states
+
+    def compile_start_state_probabilities(self):
+        # Compute the start state distribution once since it only depends on the state space
+        if self.start_state_probabilities is None:
+            start_states = self.start_states()
+            self.start_state_probabilities = np.zeros(len(self.state_space))
+            self.start_state_probabilities[[self.state_space.index(start_state) for start_state in start_states]] = 1.0 / len(start_states)
 
-        return 1.0 / len(start_states) if state in start_states else 0
+        return self.start_state_probabilities
+
+    def start_state_function(self, state):
+        return self.compile_start_state_probabilities()[self.state_space.index(state)]
 
     def get_state_record_from_state(self, state):
-        return self.state_registry[state]
+        return self.state_space.get_record(state)
 
     def get_state_from_state_record(self, state_record):
-        base_state_factors = [
-            str(state_record['row']),
-            str(state_record['column']),
-            str(state_record['battery_level']),
-            state_record['water_analyzer_health'],
-            state_record['soil_analyzer_health']
-        ]
-        analysis_status_state_factors = [state_factor for state_factor in state_record['analysis_status'].values()]
-        state_factors = base_state_factors + analysis_status_state_factors
-        return STATE_CONNECTOR.join(state_factors)
+        return self.state_space.get_state_from_record(state_record)
+
+    def get_analysis_status(self, state_record):
+        return {point_of_interest: self.analysis_status_views[state_record.analysis_status][index] for index, point_of_interest in enumerate(self.points_of_interests)}
+
+    def get_definition(self):
+        return {
+            'grid_world': self.grid_world,
+            'points_of_interest': self.points_of_interests,
+            'terrain_types': self.terrain_types,
+            'weather': self.weather,
+            'battery_levels': list(BATTERY_LEVELS),
+            'water_analyzer_health': WATER_ANALYZER_HEALTH,
+            'soil_analyzer_health': SOIL_ANALYZER_HEALTH,
+            'analyzer_health_probabilities': ANALYZER_HEALTH_PROBABILITIES,
+            'analysis_conditions': ANALYSIS_CONDITIONS,
+            'movement_offsets': {action: MOVEMENT_ACTION_DETAILS[action]['offset'] for action in MOVEMENT_ACTION_DETAILS},
+            'actions': self.action_space
+        }
@@ -0,0 +1,29 @@
+import json
+import os
+
+import policy_store
+import utils
+from selector import EPSILON, Selector
+
+POLICY_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), utils.POLICY_DIRECTORY)
+
+
+def get_committed_solution(safety_process):
+    name = f'{safety_process.kind}-{utils.get_definition_hash(safety_process, gamma=utils.GAMMA, epsilon=EPSILON)}'
+    with open(os.path.join(POLICY_DIRECTORY, name + utils.EXTENSION)) as file:
+        return json.load(file)
+
+
+def get_selector(safety_processes, solutions, monkeypatch, directory=None, **selector_options):
+    # Store every solution like the policy cache so that an array-backed selector reads it from memory-mapped arrays and hand the solutions over as they are otherwise
+    solution_views = {}
+    for safety_process, solution in zip(safety_processes, solutions):
+        if directory is None:
+            solution_views[safety_process.name] = solution
+            continue
+
+        policy_store.save_solution(solution, os.path.join(directory, safety_process.name))
+        solution_views[safety_process.name] = policy_store.load_solution(os.path.join(directory, safety_process.name))
+
+    monkeypatch.setattr(utils, 'get_safety_process_solution', lambda safety_process, epsilon: solution_views[safety_process.name])
+    return Selector(safety_processes, is_array_backed=directory is not None, **selector_options)
@@ -0,0 +1,15 @@
+import importlib
+import sys
+
+import pytest
+
+import fake_cplex
+
+
+@pytest.fixture
+def task_process_solver(monkeypatch):
+    # Import the CPLEX task process solver against the fake CPLEX so that it runs on every node
+    monkeypatch.setitem(sys.modules, 'cplex', fake_cplex)
+    monkeypatch.delitem(sys.modules, 'solvers.task_process_solver', raising=False)
+    yield importlib.import_module('solvers.task_process_solver')
+    sys.modules.pop('solvers.task_process_solver', None)
@@ -0,0 +1,153 @@
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import csr_matrix
+
+# Stand in for the parts of the CPLEX API that the task process solver uses and solve the LP with HiGHS so that the solver runs without a CPLEX license
+infinity = 1.0E+20
+
+
+def get_pairs(arguments):
+    # Accept one (index, value) pair or any iterable of pairs like the setters of CPLEX
+    if len(arguments) == 2:
+        return [tuple(arguments)]
+    return [tuple(pair) for pair in arguments[0]]
+
+
+class Status:
+    optimal = 1
+    infeasible = 3
+    MIP_optimal = 101
+    optimal_tolerance = 102
+    MIP_infeasible = 103
+    MIP_feasible = 127
+    MIP_feasible_relaxed_sum = 120
+
+
+class Variables:
+    class type:
+        continuous = 'C'
+
+    def __init__(self):
+        self.lower_bounds = []
+        self.upper_bounds = []
+
+    def add(self, types, lb, ub):
+        assert len(types) == len(lb) == len(ub)
+        self.lower_bounds.extend(lb)
+        self.upper_bounds.extend(ub)
+
+    def get_num(self):
+        return len(self.lower_bounds)
+
+
+class Objective:
+    class sense:
+        minimize = 1
+        maximize = -1
+
+    def __init__(self):
+        self.coefficients = {}
+        self.objective_sense = Objective.sense.minimize
+
+    def set_linear(self, *arguments):
+        self.coefficients.update(get_pairs(arguments))
+
+    def set_sense(self, sense):
+        self.objective_sense = sense
+
+
+class LinearConstraints:
+    def __init__(self):
+        self.names = []
+        self.right_hand_sides = []
+        self.coefficients = {}
+        self.coefficient_calls = []
+
+    def get_num(self):
+        return len(self.right_hand_sides)
+
+    def add(self, names, rhs, senses):
+        assert len(names) == len(rhs) == len(senses) and set(senses) <= {'G'}
+        self.names.extend(names)
+        self.right_hand_sides.extend(rhs)
+
+    def set_coefficients(self, *arguments):
+        self.coefficient_calls.append(arguments)
+
+        # Take either one (row, column, value) triplet or a list or tuple of triplets but never any other iterable like CPLEX
+        if len(arguments) == 3:
+            triplets = [arguments]
+        else:
+            (triplets,) = arguments
+            if not isinstance(triplets, (list, tuple)):
+                raise TypeError(f'expected a list or a tuple of triplets but got {type(triplets).__name__}')
+
+        for row, column, value in triplets:
+            self.coefficients[row, column] = value
+
+    def set_rhs(self, *arguments):
+        for row, value in get_pairs(arguments):
+            self.right_hand_sides[row] = value
+
+
+class Solution:
+    status = Status
+
+    def __init__(self):
+        self.status_code = None
+        self.objective_value = None
+        self.values = None
+
+    def get_status(self):
+        return self.status_code
+
+    def get_status_string(self):
+        return str(self.status_code)
+
+    def get_method(self):
+        return 'highs'
+
+    def get_objective_value(self):
+        return self.objective_value
+
+    def get_values(self):
+        return list(self.values)
+
+
+class Cplex:
+    def __init__(self):
+        self.variables = Variables()
+        self.objective = Objective()
+        self.linear_constraints = LinearConstraints()
+        self.solution = Solution()
+
+    def set_log_stream(self, stream):
+        pass
+
+    def set_results_stream(self, stream):
+        pass
+
+    def solve(self):
+        n_variables = self.variables.get_num()
+        objective_coefficients = np.zeros(n_variables)
+        for variable, coefficient in self.objective.coefficients.items():
+            objective_coefficients[variable] = coefficient
+
+        # Drop the constraints whose right hand side is minus infinity since they never bind in CPLEX either
+        right_hand_sides = np.array(self.linear_constraints.right_hand_sides, dtype=float)
+        rows = np.flatnonzero(right_hand_sides > -infinity)
+        positions = np.full(len(right_hand_sides), -1)
+        positions[rows] = np.arange(len(rows))
+
+        entries = [(positions[row], column, value) for (row, column), value in self.linear_constraints.coefficients.items() if positions[row] >= 0 and value != 0]
+        constraint_rows, constraint_columns, constraint_values = zip(*entries) if entries else ((), (), ())
+        coefficients = csr_matrix((constraint_values, (constraint_rows, constraint_columns)), shape=(len(rows), n_variables))
+
+        result = linprog(self.objective.objective_sense * objective_coefficients, A_ub=-coefficients, b_ub=-right_hand_sides[rows], bounds=list(zip(self.variables.lower_bounds, self.variables.upper_bounds)), method='highs')
+
+        if result.status == 0:
+            self.solution.status_code = Status.MIP_optimal
+            self.solution.objective_value = self.objective.objective_sense * result.fun
+            self.solution.values = result.x
+        else:
+            self.solution.status_code = Status.MIP_infeasible
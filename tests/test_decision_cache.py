@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from committed_solutions import get_committed_solution, get_selector
+from decision_cache import DecisionCache
+from safety_processes.crevice_safety_process import CreviceSafetyProcess
+from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
+from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
+
+SAFETY_PROCESS_CONSTRUCTORS = [CreviceSafetyProcess, DustStormSafetyProcess, RoughTerrainSafetyProcess]
+
+JOINT_STATE_SAMPLE_SIZE = 1000
+
+
+def test_decision_cache_evicts_least_recently_used_decision():
+    decision_cache = DecisionCache(2)
+
+    assert decision_cache.get('a') is None
+    decision_cache.put('a', 'A')
+    decision_cache.put('b', 'B')
+    assert decision_cache.get_statistics() == {'hits': 0, 'misses': 1, 'evictions': 0, 'size': 2}
+
+    # Use the first decision again so that the second one becomes the least recently used one
+    assert decision_cache.get('a') == 'A'
+    decision_cache.put('c', 'C')
+    assert decision_cache.get_statistics() == {'hits': 1, 'misses': 1, 'evictions': 1, 'size': 2}
+
+    assert decision_cache.get('b') is None
+    assert decision_cache.get('a') == 'A'
+    assert decision_cache.get('c') == 'C'
+    assert decision_cache.get_statistics() == {'hits': 3, 'misses': 2, 'evictions': 1, 'size': 2}
+
+    # Overwrite a decision in place without evicting anything
+    decision_cache.put('c', 'D')
+    assert decision_cache.get('c') == 'D'
+    assert len(decision_cache) == 2
+    assert decision_cache.get_statistics() == {'hits': 4, 'misses': 2, 'evictions': 1, 'size': 2}
+
+    decision_cache.put('e', 'E')
+    assert decision_cache.get('a') is None
+    assert decision_cache.get_statistics() == {'hits': 4, 'misses': 3, 'evictions': 2, 'size': 2}
+
+
+def test_decision_cache_needs_room():
+    with pytest.raises(AssertionError):
+        DecisionCache(0)
+
+
+@pytest.mark.parametrize('decision_cache_size', [2, 4096])
+def test_cached_select_matches_uncached_select(decision_cache_size, tmp_path, monkeypatch):
+    safety_processes = [safety_process_constructor() for safety_process_constructor in SAFETY_PROCESS_CONSTRUCTORS]
+    solutions = [get_committed_solution(safety_process) for safety_process in safety_processes]
+    selector = get_selector(safety_processes, solutions, monkeypatch, str(tmp_path / 'uncached'))
+    cached_selector = get_selector(safety_processes, solutions, monkeypatch, str(tmp_path / 'cached'), decision_cache_size=decision_cache_size)
+
+    # Draw the joint states from a handful of states of each safety process so that they repeat and hit the cache
+    generator = random.Random(0)
+    state_pools = [generator.sample(range(len(safety_process.states())), 3) for safety_process in safety_processes]
+    for _ in range(JOINT_STATE_SAMPLE_SIZE):
+        state_indices = [generator.choice(state_pool) for state_pool in state_pools]
+        ratings = [selector.recommend(safety_process, state_index) for safety_process, state_index in zip(safety_processes, state_indices)]
+        cached_ratings = [cached_selector.recommend(safety_process, state_index) for safety_process, state_index in zip(safety_processes, state_indices)]
+
+        for is_baseline in [True, False]:
+            assert cached_selector.select(cached_ratings, is_baseline) == selector.select(ratings, is_baseline)
+
+    statistics = cached_selector.decision_cache.get_statistics()
+    assert statistics['hits'] + statistics['misses'] == 2 * JOINT_STATE_SAMPLE_SIZE
+    assert statistics['hits'] > 0 and statistics['size'] <= decision_cache_size
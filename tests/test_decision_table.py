@@ -0,0 +1,75 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import selector as selector_module
+import utils
+from committed_solutions import get_committed_solution, get_selector
+from safety_processes.crevice_safety_process import CreviceSafetyProcess
+from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
+from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
+from selector import is_tabulable
+
+SAFETY_PROCESS_CONSTRUCTORS = [CreviceSafetyProcess, DustStormSafetyProcess, RoughTerrainSafetyProcess]
+
+JOINT_STATE_SAMPLE_SIZE = 3000
+
+
+@pytest.fixture
+def safety_processes():
+    return [safety_process_constructor() for safety_process_constructor in SAFETY_PROCESS_CONSTRUCTORS]
+
+
+@pytest.fixture
+def selector(safety_processes, tmp_path, monkeypatch):
+    # Build the decision tables in a cache of their own so that the test never reads a table that an earlier build left behind
+    monkeypatch.setattr(utils, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    return get_selector(safety_processes, [get_committed_solution(safety_process) for safety_process in safety_processes], monkeypatch, str(tmp_path / 'policies'))
+
+
+def test_decision_table_matches_select_on_every_joint_state(safety_processes, selector):
+    # Cover every joint state of the two smaller safety processes since their tables are small enough to check exhaustively
+    decision_safety_processes = safety_processes[1:]
+    selector.load_decision_tables(decision_safety_processes)
+
+    for is_baseline in [True, False]:
+        decision_table = selector.decision_tables[is_baseline]
+        assert decision_table.dtype == np.uint8
+        assert decision_table.shape == tuple(len(safety_process.states()) for safety_process in decision_safety_processes)
+
+        for state_indices in itertools.product(*(range(len(safety_process.states())) for safety_process in decision_safety_processes)):
+            ratings = [selector.recommend(safety_process, state_index) for safety_process, state_index in zip(decision_safety_processes, state_indices)]
+            assert selector.decide(state_indices, is_baseline) == selector.select(ratings, is_baseline)
+
+
+def test_decision_table_matches_select_on_sampled_joint_states(safety_processes, selector):
+    selector.load_decision_tables(safety_processes)
+
+    generator = random.Random(0)
+    for _ in range(JOINT_STATE_SAMPLE_SIZE):
+        states = [generator.choice(safety_process.states()) for safety_process in safety_processes]
+        ratings = [selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, states)]
+
+        for is_baseline in [True, False]:
+            assert selector.decide(states, is_baseline) == selector.select(ratings, is_baseline)
+
+
+def test_decision_table_falls_back_to_select_above_maximum_size(safety_processes, selector, monkeypatch):
+    joint_state_count = int(np.prod([len(safety_process.states()) for safety_process in safety_processes]))
+
+    monkeypatch.setattr(selector_module, 'MAXIMUM_DECISION_TABLE_SIZE', joint_state_count)
+    assert is_tabulable(safety_processes)
+
+    monkeypatch.setattr(selector_module, 'MAXIMUM_DECISION_TABLE_SIZE', joint_state_count - 1)
+    assert not is_tabulable(safety_processes)
+    assert not is_tabulable([])
+
+    with pytest.raises(AssertionError):
+        selector.load_decision_tables(safety_processes)
+
+    # Keep selecting from the ratings without a table like the simulator does when the joint states are too many to tabulate
+    assert selector.decision_tables == {}
+    ratings = [selector.recommend(safety_process, 0) for safety_process in safety_processes]
+    assert selector.select(ratings, False) in selector.parameters
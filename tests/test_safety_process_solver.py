@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+import utils
+from committed_solutions import get_committed_solution, get_selector
+from safety_processes.crevice_safety_process import CreviceSafetyProcess
+from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
+from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
+from selector import EPSILON
+from solvers import safety_process_solver
+
+SAFETY_PROCESS_CONSTRUCTORS = [CreviceSafetyProcess, DustStormSafetyProcess, RoughTerrainSafetyProcess]
+SOLVER_OPTIONS = [{'method': method} for method in safety_process_solver.METHODS] + [{'method': 'value_iteration', 'is_batched': True}]
+VALUE_FIELDS = ['severity_state_values', 'severity_parameter_values', 'interference_state_values', 'interference_parameter_values']
+
+# Let a value differ from its committed value by the stopping error of value iteration, which a warm start may reach from another point than a cold start,
+# plus the rounding of every value in a solution and the float32 rounding error of the sweeps over the horizon
+VALUE_TOLERANCE = EPSILON * utils.GAMMA / (1 - utils.GAMMA) + 10 ** -safety_process_solver.ROUNDER + np.finfo(safety_process_solver.PRECISION).eps / (1 - utils.GAMMA)
+
+JOINT_STATE_SAMPLE_SIZE = 3000
+
+
+def get_values(value, keys=()):
+    # Flatten the nested values of a solution with string keys since the committed solutions went through JSON
+    if not isinstance(value, dict):
+        return {keys: value}
+    return {flat_keys: flat_value for key, child_value in value.items() for flat_keys, flat_value in get_values(child_value, keys + (str(key),)).items()}
+
+
+@pytest.mark.parametrize('solver_options', SOLVER_OPTIONS, ids=lambda solver_options: '-'.join(str(value) for value in solver_options.values()))
+@pytest.mark.parametrize('safety_process_constructor', SAFETY_PROCESS_CONSTRUCTORS, ids=lambda safety_process_constructor: safety_process_constructor.__name__)
+def test_solve_matches_committed_solution(safety_process_constructor, solver_options):
+    safety_process = safety_process_constructor()
+    solution = safety_process_solver.solve(safety_process, utils.GAMMA, EPSILON, **solver_options)
+    committed_solution = get_committed_solution(safety_process)
+
+    assert solution['policy'] == committed_solution['policy']
+
+    for field in VALUE_FIELDS:
+        values = get_values(solution[field])
+        committed_values = get_values(committed_solution[field])
+        assert values.keys() == committed_values.keys()
+        assert max(abs(values[keys] - committed_values[keys]) for keys in values) <= VALUE_TOLERANCE
+
+
+@pytest.mark.parametrize('solver_options', SOLVER_OPTIONS, ids=lambda solver_options: '-'.join(str(value) for value in solver_options.values()))
+def test_solve_keeps_selector_decisions(solver_options, tmp_path, monkeypatch):
+    safety_processes = [safety_process_constructor() for safety_process_constructor in SAFETY_PROCESS_CONSTRUCTORS]
+    solutions = [safety_process_solver.solve(safety_process, utils.GAMMA, EPSILON, **solver_options) for safety_process in safety_processes]
+    committed_solutions = [get_committed_solution(safety_process) for safety_process in safety_processes]
+
+    selector = get_selector(safety_processes, solutions, monkeypatch, str(tmp_path / 'solved'))
+    committed_selector = get_selector(safety_processes, committed_solutions, monkeypatch, str(tmp_path / 'committed'))
+
+    for safety_process in safety_processes:
+        for state in safety_process.states():
+            assert selector.independent_select(selector.recommend(safety_process, state)) == committed_selector.independent_select(committed_selector.recommend(safety_process, state))
+
+    generator = random.Random(0)
+    for _ in range(JOINT_STATE_SAMPLE_SIZE):
+        process_states = [generator.choice(safety_process.states()) for safety_process in safety_processes]
+        ratings = [selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, process_states)]
+        committed_ratings = [committed_selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, process_states)]
+
+        for is_baseline in [True, False]:
+            assert selector.select(ratings, is_baseline) == committed_selector.select(committed_ratings, is_baseline)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from safety_processes.crevice_safety_process import CreviceSafetyProcess
+from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
+from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
+from safety_processes.synthetic_safety_process import SyntheticSafetyProcess
+
+SAFETY_PROCESS_CONSTRUCTORS = [CreviceSafetyProcess, DustStormSafetyProcess, RoughTerrainSafetyProcess, lambda: SyntheticSafetyProcess(0), lambda: SyntheticSafetyProcess(3, hazard_level_count=4)]
+
+# Let a compiled probability differ from the probability of the transition function by the rounding of the products that build it
+PROBABILITY_TOLERANCE = 1e-12
+
+
+@pytest.fixture(params=SAFETY_PROCESS_CONSTRUCTORS, ids=['crevice', 'dust-storm', 'rough-terrain', 'synthetic-0', 'synthetic-3'])
+def safety_process(request):
+    return request.param()
+
+
+def test_compiled_transition_probabilities_match_transition_function(safety_process):
+    states = list(safety_process.states())
+    parameters = safety_process.parameters()
+
+    transition_probabilities = np.array([[[safety_process.transition_function(state, parameter, successor_state) for successor_state in states] for parameter in parameters] for state in states])
+    compiled_transition_probabilities = safety_process.compile_transition_probabilities()
+
+    assert compiled_transition_probabilities.shape == transition_probabilities.shape
+    assert np.allclose(compiled_transition_probabilities, transition_probabilities, rtol=0, atol=PROBABILITY_TOLERANCE)
+
+    # Check the successors that the simulator samples from along with the indexed successors that they wrap
+    for state_index, state in enumerate(states):
+        for parameter_index, parameter in enumerate(parameters):
+            successor_probabilities = np.zeros(len(states))
+            for successor_state, probability in safety_process.successors(state, parameter):
+                successor_probabilities[states.index(successor_state)] += probability
+            assert np.allclose(successor_probabilities, transition_probabilities[state_index, parameter_index], rtol=0, atol=PROBABILITY_TOLERANCE)
+
+            assert [(states[successor_state_index], probability) for successor_state_index, probability in safety_process.indexed_successors(state_index, parameter)] == list(safety_process.successors(state, parameter))
+
+
+def test_compiled_severities_match_severity_function(safety_process):
+    severities = np.array([[safety_process.severity_function(state, parameter) for parameter in safety_process.parameters()] for state in safety_process.states()])
+    assert np.array_equal(safety_process.compile_severities(), severities)
+
+
+def test_compiled_interferences_match_interference_function(safety_process):
+    interferences = np.array([[safety_process.interference_function(state, parameter) for parameter in safety_process.parameters()] for state in safety_process.states()])
+    assert np.array_equal(safety_process.compile_interferences(), interferences)
@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from committed_solutions import get_committed_solution, get_selector
+from safety_processes.crevice_safety_process import CreviceSafetyProcess
+from safety_processes.dust_storm_safety_process import DustStormSafetyProcess
+from safety_processes.rough_terrain_safety_process import RoughTerrainSafetyProcess
+from selector import SEVERITY_KEYS
+
+# Hold the decisions of the selector before it was vectorized, with the ties that it kept in a set broken by the order of the parameters,
+# on the committed solutions of the safety processes and on made-up ratings that tie on some or all of their severity counts and interference values
+DECISION_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'selector_decisions.json')
+
+SAFETY_PROCESS_CONSTRUCTORS = [CreviceSafetyProcess, DustStormSafetyProcess, RoughTerrainSafetyProcess]
+
+
+@pytest.fixture(scope='module')
+def decisions():
+    with open(DECISION_FIXTURE) as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope='module')
+def safety_processes():
+    return [safety_process_constructor() for safety_process_constructor in SAFETY_PROCESS_CONSTRUCTORS]
+
+
+def get_rating(parameters, severity_values, interference_values):
+    return {parameter: {'severity': dict(zip(SEVERITY_KEYS, parameter_severity_values)), 'interference': parameter_interference_value} for parameter, parameter_severity_values, parameter_interference_value in zip(parameters, severity_values, interference_values)}
+
+
+@pytest.mark.parametrize('is_array_backed', [False, True], ids=['dict-backed', 'array-backed'])
+def test_select_matches_baseline_selector_on_committed_solutions(decisions, safety_processes, is_array_backed, tmp_path, monkeypatch):
+    solutions = [get_committed_solution(safety_process) for safety_process in safety_processes]
+    selector = get_selector(safety_processes, solutions, monkeypatch, str(tmp_path) if is_array_backed else None)
+
+    assert selector.parameters == decisions['parameters']
+
+    for safety_process in safety_processes:
+        for state, parameter in decisions['independent_decisions'][safety_process.kind].items():
+            assert selector.independent_select(selector.recommend(safety_process, state)) == parameter
+
+    for joint_state in decisions['joint_states']:
+        ratings = [selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, joint_state['states'])]
+
+        assert selector.select(ratings, True) == joint_state['baseline']
+        assert selector.baseline_select(ratings) == joint_state['baseline']
+        assert selector.select(ratings, False) == joint_state['proposed']
+        assert [selector.independent_select(rating) for rating in ratings] == joint_state['independent']
+
+
+def test_select_matches_baseline_selector_on_tied_ratings(decisions, safety_processes, monkeypatch):
+    solutions = [get_committed_solution(safety_process) for safety_process in safety_processes]
+    selector = get_selector(safety_processes, solutions, monkeypatch)
+
+    for case in decisions['ratings']:
+        ratings = [get_rating(decisions['parameters'], severity_values, interference_values) for severity_values, interference_values in zip(case['severity'], case['interference'])]
+
+        assert selector.select(ratings, True) == case['baseline']
+        assert selector.baseline_select(ratings) == case['baseline']
+        assert selector.select(ratings, False) == case['proposed']
+        assert [selector.independent_select(rating) for rating in ratings] == case['independent']
+
+
+def test_selector_selects_among_parameters_of_every_safety_process(safety_processes, tmp_path, monkeypatch):
+    # Let one safety process rate every parameter but the last one so that the selector can never choose it
+    parameters = safety_processes[0].parameters()
+    monkeypatch.setattr(safety_processes[1], 'parameters', lambda: parameters[:-1])
+
+    solutions = [get_committed_solution(safety_process) for safety_process in safety_processes]
+    for is_array_backed in [False, True]:
+        selector = get_selector(safety_processes, solutions, monkeypatch, str(tmp_path / str(is_array_backed)) if is_array_backed else None)
+        assert selector.parameters == parameters[:-1]
+
+        for states in zip(*(safety_process.states() for safety_process in safety_processes)):
+            ratings = [selector.recommend(safety_process, state) for safety_process, state in zip(safety_processes, states)]
+            assert selector.select(ratings, False) in selector.parameters
+            assert selector.select(ratings, True) in selector.parameters
@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import fake_cplex
+import utils
+from committed_solutions import POLICY_DIRECTORY
+from solvers import native_task_process_solver
+from solvers.memory_mdp_container import MemoryMdpContainer
+from task_processes.planetary_rover_task_process import GOAL_STATE, PlanetaryRoverTaskProcess
+
+GAMMA = 0.99
+
+GRID_WORLD = [
+    ['O', 'W', 'O', 'O'],
+    ['O', 'O', 'O', 'W'],
+    ['O', 'W', 'O', 'W'],
+    ['O', 'W', 'O', 'O']
+]
+POINTS_OF_INTERESTS = [(3, 3), (0, 3)]
+SHADY_LOCATIONS = [(1, 1), (1, 2)]
+
+CONSTANT_STATE_VALUES = [{}, {GOAL_STATE: 0, '0:0:5:NOMINAL:NOMINAL:NOT_ANALYZED:NOT_ANALYZED': 10}]
+
+# Let a solution of policy iteration differ from the committed solution of CPLEX by the optimality tolerance of CPLEX
+VALUE_TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope='module')
+def memory_mdp_container():
+    return MemoryMdpContainer(PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, SHADY_LOCATIONS), is_pruned=True)
+
+
+def get_dense_constraints(memory_mdp_container, gamma, constant_state_values):
+    # Rebuild the constraints of every state-action pair with a dense row of coefficients over every variable like the original solver
+    is_variable = np.array([state not in constant_state_values for state in memory_mdp_container.states])
+    constant_values = np.array([constant_state_values.get(state, 0) for state in memory_mdp_container.states], dtype=float)
+
+    constraints = {}
+    for i, state in enumerate(memory_mdp_container.states):
+        for j in range(memory_mdp_container.n_actions):
+            row = i * memory_mdp_container.n_actions + j
+            transition_probabilities = memory_mdp_container.transition_probabilities[row].toarray().ravel()
+
+            right_hand_side = memory_mdp_container.rewards[i, j] - constant_values[i] + gamma * transition_probabilities[~is_variable].dot(constant_values[~is_variable])
+
+            identity = np.zeros(memory_mdp_container.n_states)
+            identity[i] = 1
+            coefficients = (identity - gamma * transition_probabilities)[is_variable]
+
+            if sum(coefficients) <= 0 < right_hand_side:
+                continue
+
+            if all(coefficient == 0 for coefficient in coefficients):
+                continue
+
+            constraints[row] = (coefficients, right_hand_side)
+
+    return constraints
+
+
+@pytest.mark.parametrize('constant_state_values', CONSTANT_STATE_VALUES)
+def test_constraint_matrix_matches_dense_constraints(task_process_solver, memory_mdp_container, constant_state_values):
+    coefficients, right_hand_sides, is_kept = task_process_solver.get_constraint_matrix(memory_mdp_container, GAMMA, constant_state_values)
+    dense_constraints = get_dense_constraints(memory_mdp_container, GAMMA, constant_state_values)
+
+    assert np.flatnonzero(is_kept).tolist() == sorted(dense_constraints)
+    for row, (dense_coefficients, dense_right_hand_side) in dense_constraints.items():
+        assert np.allclose(coefficients[row].toarray().ravel(), dense_coefficients, rtol=0, atol=1e-12)
+        assert right_hand_sides[row] == pytest.approx(dense_right_hand_side, rel=0, abs=1e-12)
+
+
+@pytest.mark.parametrize('is_aligned', [False, True])
+def test_set_constraints_passes_a_list_of_triplets(task_process_solver, memory_mdp_container, is_aligned):
+    problem = fake_cplex.Cplex()
+    task_process_solver.set_variables(problem, memory_mdp_container, {})
+    coefficients, right_hand_sides = task_process_solver.set_constraints(problem, memory_mdp_container, GAMMA, {}, is_aligned=is_aligned)
+
+    assert len(problem.linear_constraints.coefficient_calls) == 1
+    (triplets,) = problem.linear_constraints.coefficient_calls[0]
+    assert isinstance(triplets, list)
+    assert all(len(triplet) == 3 for triplet in triplets)
+    assert len(triplets) == coefficients.nnz
+    assert problem.linear_constraints.get_num() == len(right_hand_sides)
+
+
+def get_variants():
+    # Vary the shady locations and the values of the constant states like a sweep with values that keep every LP feasible:
+    # a negative value of the start state skips the constraints of its actions and a positive one above its Bellman backup brings them back
+    start_state = '0:0:5:NOMINAL:NOMINAL:NOT_ANALYZED:NOT_ANALYZED'
+    return [
+        (SHADY_LOCATIONS, {}),
+        (SHADY_LOCATIONS[:1], {}),
+        ([], {}),
+        (SHADY_LOCATIONS, {GOAL_STATE: 0, start_state: 100}),
+        (SHADY_LOCATIONS, {GOAL_STATE: 0, start_state: -10}),
+        (SHADY_LOCATIONS[:1], {GOAL_STATE: 0, start_state: -10}),
+        (SHADY_LOCATIONS[:1], {GOAL_STATE: 0, start_state: 1000}),
+        (SHADY_LOCATIONS, {})
+    ]
+
+
+def assert_same_solution(solution, expected_solution):
+    assert solution['objective_value'] == pytest.approx(expected_solution['objective_value'], rel=1e-9, abs=1e-6)
+    assert solution['values'].keys() == expected_solution['values'].keys()
+    assert np.allclose([solution['values'][state] for state in expected_solution['values']], list(expected_solution['values'].values()), rtol=1e-9, atol=1e-6)
+
+
+# Keep every state in the compiled models since the shady locations change the states that the rover can reach and only solves over the same states share a problem
+def test_warm_started_lp_solves_match_cold_lp_solves(task_process_solver):
+    warm_start = {}
+    problems = []
+    skipped_constraint_changes = 0
+    for shady_locations, constant_state_values in get_variants():
+        task_process = PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, shady_locations)
+        is_updatable = task_process_solver.is_updatable(warm_start, MemoryMdpContainer(task_process), GAMMA, constant_state_values)
+
+        solution = task_process_solver.solve(task_process, GAMMA, constant_state_values, is_pruned=False, warm_start=warm_start)
+        assert_same_solution(solution, task_process_solver.solve(task_process, GAMMA, constant_state_values, is_pruned=False))
+
+        is_skipped = warm_start['right_hand_sides'] == -fake_cplex.infinity
+        if is_updatable:
+            assert warm_start['problem'] is problems[-1]
+            skipped_constraint_changes += np.count_nonzero(is_skipped != last_is_skipped)
+        problems.append(warm_start['problem'])
+        last_is_skipped = is_skipped
+
+    # Update the problem in place across changes of the transitions and of the constant values including constraints that are skipped and brought back
+    assert len(set(map(id, problems))) < len(problems) - 2
+    assert skipped_constraint_changes > 0
+
+
+def test_warm_started_native_solves_match_cold_native_solves():
+    warm_start = {}
+    for shady_locations, constant_state_values in get_variants():
+        task_process = PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, shady_locations)
+
+        solution = native_task_process_solver.solve(task_process, GAMMA, constant_state_values, is_pruned=False, warm_start=warm_start)
+        assert_same_solution(solution, native_task_process_solver.solve(task_process, GAMMA, constant_state_values, is_pruned=False))
+
+
+def test_native_solve_matches_committed_lp_solution(memory_mdp_container):
+    task_process = PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, SHADY_LOCATIONS)
+    with open(os.path.join(POLICY_DIRECTORY, f'{task_process.kind}-{utils.get_definition_hash(task_process, gamma=GAMMA)}{utils.EXTENSION}')) as file:
+        committed_solution = json.load(file)
+
+    solution = native_task_process_solver.solve(task_process, GAMMA, memory_mdp_container=memory_mdp_container)
+
+    # Compare the states that a start state reaches since the committed solution also covers states that the pruned model leaves out
+    assert solution['values'].keys() <= committed_solution['values'].keys()
+    assert solution['policy'].keys() == solution['values'].keys()
+    assert max(abs(solution['values'][state] - committed_solution['values'][state]) for state in solution['values']) <= VALUE_TOLERANCE
+    assert solution['objective_value'] == pytest.approx(committed_solution['objective_value'], abs=VALUE_TOLERANCE)
+
+    # Let the policies differ only where the actions tie since policy iteration and the LP solver break ties differently
+    state_values = np.array([solution['values'].get(state, 0) for state in memory_mdp_container.states])
+    action_values = native_task_process_solver.get_action_values(memory_mdp_container, GAMMA, state_values)
+    for state, action in solution['policy'].items():
+        if action != committed_solution['policy'][state]:
+            state_action_values = action_values[memory_mdp_container.state_indices[state]]
+            assert abs(state_action_values[memory_mdp_container.actions.index(action)] - state_action_values[memory_mdp_container.actions.index(committed_solution['policy'][state])]) <= VALUE_TOLERANCE
+
+
+def test_native_solve_refuses_relaxation(memory_mdp_container):
+    with pytest.raises(AssertionError):
+        native_task_process_solver.solve(PlanetaryRoverTaskProcess(GRID_WORLD, POINTS_OF_INTERESTS, SHADY_LOCATIONS), GAMMA, relax_infeasible=True, memory_mdp_container=memory_mdp_container)
@@ -1,18 +1,36 @@
 import copy
+import hashlib
+import importlib
 import json
 import logging
 import os
 import random
-from itertools import chain, combinations
 
-from solvers import safety_process_solver, task_process_solver
+import decision_table
+import policy_store
+from solvers import safety_process_solver
+from solvers.functional_mdp_container import FunctionalMdpContainer
+from solvers.memory_mdp_container import MemoryMdpContainer
 
 GAMMA = 0.99
 POLICY_DIRECTORY = 'policies'
 DATA_DIRECTORY = 'data'
+CACHE_DIRECTORY = 'cache'
 EXTENSION = '.json'
+MODEL_EXTENSION = '.npz'
+TABLE_EXTENSION = '.npy'
+HASH_LENGTH = 16
+# Bump the cache version whenever the processes or the solvers change in a way that their definitions do not capture
+CACHE_VERSION = 1
 DELIMITER = ','
 
+# Import the task process solvers on demand so that CPLEX is only needed on the nodes that select its solver
+TASK_PROCESS_SOLVERS = {
+    'cplex': 'solvers.task_process_solver',
+    'native': 'solvers.native_task_process_solver'
+}
+TASK_PROCESS_SOLVER = 'native'
+
 logging.basicConfig(format='[%(asctime)s|%(module)-25s|%(funcName)-15s|%(levelname)-5s] %(message)s', datefmt='%H:%M:%S', level=logging.INFO)
 
 
@@ -21,6 +39,21 @@ def get_successor_state(current_state, current_action, process):
 
     total_probability = 0
 
+    # Follow a state given as its index through the indexed successors so that the hot loop of a simulation never builds or parses a state name
+    successors = None
+    if hasattr(process, 'indexed_successors') and not isinstance(current_state, str):
+        successors = process.indexed_successors(current_state, current_action)
+    elif hasattr(process, 'successors'):
+        successors = process.successors(current_state, current_action)
+
+    if successors is not None:
+        for successor_state, probability in successors:
+            total_probability += probability
+            if total_probability >= probability_threshold:
+                return successor_state
+
+        return None
+
     for successor_state in process.states():
         total_probability += process.transition_function(current_state, current_action, successor_state)
         if total_probability >= probability_threshold:
@@ -29,18 +62,78 @@ def get_successor_state(current_state, current_action, process):
     return None
 
 
+def get_definition_hash(process, **parameters):
+    definition = {'version': CACHE_VERSION, 'kind': process.kind, 'definition': process.get_definition(), 'parameters': parameters}
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()[:HASH_LENGTH]
+
+
+def get_memory_mdp_container(mdp, name, is_pruned=False):
+    file_path = os.path.join(CACHE_DIRECTORY, name + MODEL_EXTENSION)
+
+    if os.path.exists(file_path):
+        logging.debug("Loading the model: [model=%s, file=%s]", name, file_path)
+        return MemoryMdpContainer.load(file_path)
+
+    memory_mdp_container = MemoryMdpContainer(mdp, is_pruned=is_pruned)
+
+    logging.debug("Saving the model: [model=%s, file=%s]", name, file_path)
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    memory_mdp_container.save(file_path)
+
+    return memory_mdp_container
+
+
+def load_solution(name):
+    # Prefer the memory-mapped policy and fall back to a JSON policy, converting it once so that later loads are memory-mapped
+    directory = os.path.join(POLICY_DIRECTORY, name)
+    file_path = directory + EXTENSION
+
+    if not policy_store.has_solution(directory) and os.path.exists(file_path):
+        logging.debug("Converting the policy: [policy=%s, file=%s]", name, file_path)
+        policy_store.convert_json_solution(file_path, directory)
+
+    if not policy_store.has_solution(directory):
+        return None
+
+    logging.debug("Loading the policy: [policy=%s, directory=%s]", name, directory)
+    return policy_store.load_solution(directory)
+
+
+def save_solution(name, solution):
+    directory = os.path.join(POLICY_DIRECTORY, name)
+    logging.debug("Saving the policy: [policy=%s, directory=%s]", name, directory)
+    policy_store.save_solution(solution, directory)
+
+
 def get_safety_process_solution(safety_process, epsilon):
-    file_path = os.path.join(POLICY_DIRECTORY, safety_process.kind + EXTENSION)
+    # Key the policy by the definition of the safety process and the parameters of the solver so that a changed safety process is never served a stale policy
+    name = f'{safety_process.kind}-{get_definition_hash(safety_process, gamma=GAMMA, epsilon=epsilon)}'
+
+    solution = load_solution(name)
+    if solution is None:
+        model_hash = get_definition_hash(safety_process)
+        memory_mdp_containers = {objective: get_memory_mdp_container(FunctionalMdpContainer(safety_process, objective), f'{safety_process.kind}-{objective}-{model_hash}') for objective in ['severity', 'interference']}
+        save_solution(name, safety_process_solver.solve(safety_process, GAMMA, epsilon, memory_mdp_containers=memory_mdp_containers))
+        solution = load_solution(name)
+
+    return solution
+
+
+def get_decision_table(selector, safety_processes, no_parameter, is_baseline, epsilon):
+    # Key the table by the policies of its safety processes, in order, along with the parameters that its entries index
+    mode = 'baseline' if is_baseline else 'proposed'
+    definition = {'version': CACHE_VERSION, 'mode': mode, 'parameters': selector.parameters, 'safety_processes': [get_definition_hash(safety_process, gamma=GAMMA, epsilon=epsilon) for safety_process in safety_processes]}
+    table_hash = hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()[:HASH_LENGTH]
+    file_path = os.path.join(CACHE_DIRECTORY, f'decision-table-{mode}-{table_hash}{TABLE_EXTENSION}')
 
     if not os.path.exists(file_path):
-        solution = safety_process_solver.solve(safety_process, GAMMA, epsilon)
-        logging.debug("Saving the policy: [safety_process=%s, file=%s]", safety_process.kind, file_path)
-        with open(file_path, 'w') as file:
-            json.dump(solution, file, indent=4)
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        severity_tables = [selector.severity_parameter_value_tables[safety_process.name] for safety_process in safety_processes]
+        interference_tables = [selector.interference_parameter_value_tables[safety_process.name] for safety_process in safety_processes]
+        decision_table.build_decision_table(severity_tables, interference_tables, selector.parameters.index(no_parameter), is_baseline, file_path)
 
-    logging.debug("Loading the policy: [safety_process=%s, file=%s]", safety_process.kind, file_path)
-    with open(file_path) as file:
-        return json.load(file)
+    logging.debug("Loading the decision table: [mode=%s, file=%s]", mode, file_path)
+    return decision_table.load_decision_table(file_path)
 
 
 def save_plot_data(name, experiment_results):
@@ -55,18 +148,23 @@ def load_plot_data(name):
         return json.load(file)
 
 
-def get_task_process_solution(task_process):
-    file_path = os.path.join(POLICY_DIRECTORY, task_process.kind + EXTENSION)
+def get_task_process_solver(solver):
+    assert solver in TASK_PROCESS_SOLVERS
+    return importlib.import_module(TASK_PROCESS_SOLVERS[solver])
 
-    if not os.path.exists(file_path):
-        solution = task_process_solver.solve(task_process, GAMMA)
-        logging.debug("Saving the policy: [task_process=%s, file=%s]", task_process.kind, file_path)
-        with open(file_path, 'w') as file:
-            json.dump(solution, file, indent=4)
 
-    logging.debug("Loading the policy: [task_process=%s, file=%s]", task_process.kind, file_path)
-    with open(file_path) as file:
-        return json.load(file)
+def get_task_process_solution(task_process, solver=TASK_PROCESS_SOLVER, warm_start=None):
+    # Key the policy by the definition of the task process, including its grid world and shady locations, so that a changed map is never served a stale policy
+    # but not by the solver since every solver returns the same optimal values
+    name = f'{task_process.kind}-{get_definition_hash(task_process, gamma=GAMMA)}'
+
+    solution = load_solution(name)
+    if solution is None:
+        memory_mdp_container = get_memory_mdp_container(task_process, f'{task_process.kind}-{get_definition_hash(task_process, is_pruned=True)}', is_pruned=True)
+        save_solution(name, get_task_process_solver(solver).solve(task_process, GAMMA, memory_mdp_container=memory_mdp_container, warm_start=warm_start))
+        solution = load_solution(name)
+
+    return solution
 
 
 def get_plot_specification(experiment_results_container, safety_process_count):
@@ -142,7 +240,11 @@ def get_safety_concern_event(entry):
     return DELIMITER.join(entry) if entry else 'none'
 
 
-def get_safety_concern_events(safety_concerns):
-    keys = list(safety_concerns.keys())
-    entries = chain.from_iterable(combinations(keys, r) for r in range(len(keys) + 1))
-    return [get_safety_concern_event(entry) for entry in entries]
\ No newline at end of file
+def get_safety_concern_event_from_mask(mask, safety_concerns):
+    return get_safety_concern_event([safety_concern for position, safety_concern in enumerate(safety_concerns) if mask >> position & 1])
+
+
+def get_safety_concern_event_order(mask):
+    # Order the safety concern events like the powerset of the safety concerns by their size and then by the positions of their safety concerns
+    positions = [position for position in range(mask.bit_length()) if mask >> position & 1]
+    return len(positions), positions
\ No newline at end of file